@@ -0,0 +1,124 @@
+"""
+Benchmark of building the market cap dominance chart: the previous
+implementation (per-day Python loops, row-by-row normalization and one
+invisible hover trace per date) against generate_dominance_history and
+create_dominance_chart. Reports build time, trace count and the size of
+the figure JSON sent to the browser.
+
+Run from the repository root:
+
+    python benchmarks/bench_dominance_chart.py [--days 1461] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import data_fetcher
+import exchange_metrics
+import utils
+
+# The dashboard's coins, bottom to top, and the hover order from the screenshot
+TOP_CRYPTOS = [
+    {"id": "btc", "name": "BTC", "color": "#F7931A"},
+    {"id": "eth", "name": "ETH", "color": "#627EEA"},
+    {"id": "usdt", "name": "USDT", "color": "#26A17B"},
+    {"id": "bnb", "name": "BNB", "color": "#F3BA2F"},
+    {"id": "sol", "name": "SOL", "color": "#00FFA3"},
+    {"id": "xrp", "name": "XRP", "color": "#23292F"},
+    {"id": "usdc", "name": "USDC", "color": "#2775CA"},
+    {"id": "ada", "name": "ADA", "color": "#0033AD"},
+    {"id": "doge", "name": "DOGE", "color": "#C3A634"},
+]
+HOVER_ORDER = ["Others", "ADA", "DOGE", "USDC", "BNB", "XRP", "USDT", "ETH", "BTC"]
+
+def legacy_dominance_chart(dates, current_percentages):
+    """The previous implementation, as it was inlined in app.py."""
+    dominance_data = {"Date": dates}
+    for crypto in TOP_CRYPTOS:
+        crypto_id = crypto["id"]
+        current_value = current_percentages.get(crypto_id, 1.0)
+        values = []
+        base_value = max(0.5, current_value * 0.9)
+        for i in range(len(dates)):
+            if crypto_id == "btc":
+                random_factor = np.random.uniform(-2.0, 2.0)
+                trend = 0.03 * (i / len(dates)) * 10
+            elif crypto_id in ["eth", "bnb", "sol"]:
+                random_factor = np.random.uniform(-1.0, 1.0)
+                trend = 0.02 * (i / len(dates)) * 5
+            else:
+                random_factor = np.random.uniform(-0.5, 0.5)
+                trend = 0.01 * (i / len(dates)) * 3
+            values.append(max(0.1, base_value + trend + random_factor))
+        dominance_data[crypto["name"]] = values
+
+    others_values = []
+    for i in range(len(dates)):
+        day_sum = sum(dominance_data[crypto["name"]][i] for crypto in TOP_CRYPTOS)
+        others_values.append(max(0.1, 100 - day_sum))
+    dominance_data["Others"] = others_values
+
+    df = pd.DataFrame(dominance_data)
+    for i in range(len(dates)):
+        row_sum = sum(df.iloc[i, 1:])
+        if row_sum != 100:
+            scale_factor = 100 / row_sum
+            for col in df.columns[1:]:
+                df.at[i, col] = df.at[i, col] * scale_factor
+
+    fig = go.Figure()
+    all_categories = [crypto["name"] for crypto in TOP_CRYPTOS] + ["Others"]
+    all_colors = [crypto["color"] for crypto in TOP_CRYPTOS] + ["#CCCCCC"]
+    cumulative = np.zeros(len(dates))
+    for i, category in enumerate(all_categories):
+        values = df[category].values
+        fig.add_trace(go.Scatter(x=dates, y=cumulative + values, mode='lines',
+                                 line=dict(width=0, color=all_colors[i]), fill='tonexty', name=category))
+        cumulative += values
+
+    hover_data = []
+    for i, date in enumerate(dates):
+        hover_text = f"<b>{date.strftime('%b %d, %Y, %H:%M:%S GMT+5:30')}</b><br><br>"
+        day_data = {crypto["id"]: df.iloc[i][crypto["name"]] for crypto in TOP_CRYPTOS}
+        hover_text += f"Others: {df.iloc[i]['Others']:.2f}%<br>"
+        for coin in ["ada", "doge", "usdc", "bnb", "xrp", "usdt", "eth", "btc"]:
+            hover_text += f"{coin.upper()}: {day_data[coin]:.2f}%<br>"
+        hover_data.append(hover_text)
+
+    for i, date in enumerate(dates):
+        fig.add_trace(go.Scatter(x=[date], y=[100], mode='markers', marker=dict(opacity=0),
+                                 hoverinfo='text', hovertext=hover_data[i], showlegend=False))
+    return fig
+
+def dominance_chart(dates, current_percentages):
+    """The current implementation, as called from app.py."""
+    categories = [crypto["name"] for crypto in TOP_CRYPTOS] + ["Others"]
+    colors = [crypto["color"] for crypto in TOP_CRYPTOS] + ["#CCCCCC"]
+    shares = exchange_metrics.generate_dominance_history(current_percentages, [crypto["id"] for crypto in TOP_CRYPTOS], len(dates))
+    return utils.create_dominance_chart(dates, shares, categories, colors, HOVER_ORDER)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark building the dominance chart.")
+    parser.add_argument("--days", type=int, default=365 * 4 + 1, help="daily points in the chart")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repetitions")
+    args = parser.parse_args(argv)
+
+    dates = pd.date_range(end=pd.Timestamp.now(), periods=args.days, freq="D")
+    current_percentages = data_fetcher.get_sample_global_data()["market_cap_percentage"]
+
+    print(f"{'implementation':>15} {'traces':>7} {'build (ms)':>11} {'to_json (ms)':>13} {'JSON (KiB)':>11}")
+    for name, build in (("loops", legacy_dominance_chart), ("vectorized", dominance_chart)):
+        fig = build(dates, current_percentages)
+        build_time = min(timeit.repeat(lambda: build(dates, current_percentages), number=1, repeat=args.repeat))
+        json_time = min(timeit.repeat(fig.to_json, number=1, repeat=args.repeat))
+        print(f"{name:>15} {len(fig.data):>7} {build_time * 1000:>11.1f} {json_time * 1000:>13.1f} {len(fig.to_json()) / 1024:>11.1f}")
+
+if __name__ == "__main__":
+    main()
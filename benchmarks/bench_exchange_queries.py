@@ -0,0 +1,88 @@
+"""
+Benchmark of reading all exchange data: the previous per-exchange ORM
+queries (3N+1 round trips) against database.get_all_exchange_data.
+
+Run from the repository root:
+
+    python benchmarks/bench_exchange_queries.py [--sizes 9 100 1000] [--repeat 5]
+"""
+import argparse
+import datetime as dt
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from sqlalchemy import create_engine, event
+
+import database
+import data_generator
+
+def legacy_get_all_exchange_data():
+    """The previous implementation: three ORM queries per exchange."""
+    session = database.get_session()
+    result = {}
+    try:
+        for exchange in session.query(database.Exchange).all():
+            monthly_data = session.query(database.MonthlyData).filter_by(exchange_id=exchange.id).order_by(database.MonthlyData.month_date).all()
+            yearly_data = session.query(database.YearlyData).filter_by(exchange_id=exchange.id).order_by(database.YearlyData.year).all()
+            fee_data = session.query(database.FeeStructure).filter_by(exchange_id=exchange.id).order_by(database.FeeStructure.id).all()
+            result[exchange.name] = {
+                'monthly_dates': [item.month_date for item in monthly_data],
+                'monthly_volume': [item.volume for item in monthly_data],
+                'monthly_commission': [item.commission for item in monthly_data],
+                'yearly_dates': [item.year for item in yearly_data],
+                'yearly_volume': [item.volume for item in yearly_data],
+                'yearly_commission': [item.commission for item in yearly_data],
+                'vip_tiers': [item.vip_tier for item in fee_data],
+                'maker_fees': [item.maker_fee for item in fee_data],
+                'taker_fees': [item.taker_fee for item in fee_data]
+            }
+    finally:
+        session.close()
+    return result
+
+def count_queries(engine, fn):
+    """Number of SQL statements fn executes on the engine."""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(statements)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark reading all exchange data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[9, 100, 1000], help="exchange counts to time")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions per size")
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp()
+    print(f"{'exchanges':>10} {'queries':>15} {'3N+1 (ms)':>11} {'bulk (ms)':>11} {'per exch. (us)':>15} {'speedup':>9}")
+    try:
+        for size in args.sizes:
+            engine = create_engine(f"sqlite:///{os.path.join(tmpdir, f'{size}.db')}")
+            dataset = data_generator.SyntheticDataset(exchanges=size, end_date=dt.date(2024, 12, 31), seed=0)
+            data_generator.write_database(dataset, engine)
+            original_engine = database.set_engine(engine)
+
+            assert legacy_get_all_exchange_data() == database.get_all_exchange_data()
+            legacy_queries = count_queries(engine, legacy_get_all_exchange_data)
+            bulk_queries = count_queries(engine, database.get_all_exchange_data)
+
+            legacy = min(timeit.repeat(legacy_get_all_exchange_data, number=1, repeat=args.repeat))
+            bulk = min(timeit.repeat(database.get_all_exchange_data, number=1, repeat=args.repeat))
+            print(f"{size:>10} {f'{legacy_queries} -> {bulk_queries}':>15} {legacy * 1000:>11.1f} {bulk * 1000:>11.1f} "
+                  f"{bulk / size * 1e6:>15.1f} {legacy / bulk:>8.1f}x")
+            database.set_engine(original_engine).dispose()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark of refreshing exchange data: a full reload (clear and
+init_db_with_exchange_data) against database.refresh_exchange_data with
+the whole dataset, and with only the latest month and year.
+
+Run from the repository root:
+
+    python benchmarks/bench_exchange_refresh.py [--exchanges 1000] [--changed 0.01]
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import database
+import exchange_metrics
+
+def change(exchange_data, fraction, rng):
+    """Copy of exchange_data with the latest monthly volume of a fraction of the exchanges changed."""
+    changed = {name: dict(data) for name, data in exchange_data.items()}
+    names = list(changed)
+    for index in rng.choice(len(names), int(len(names) * fraction), replace=False):
+        data = changed[names[index]]
+        data["monthly_volume"] = data["monthly_volume"][:-1] + [data["monthly_volume"][-1] + 1.0]
+    return changed
+
+def latest(exchange_data):
+    """Only the latest month and year of every exchange, with all fee tiers."""
+    keys = ("monthly_dates", "monthly_volume", "monthly_commission", "yearly_dates", "yearly_volume", "yearly_commission")
+    return {
+        name: dict(data, **{key: data[key][-1:] for key in keys})
+        for name, data in exchange_data.items()
+    }
+
+def timed(fn, *args):
+    """(result, seconds) of fn(*args), with its output discarded."""
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark incremental refresh of exchange data.")
+    parser.add_argument("--exchanges", type=int, default=1000, help="number of exchanges")
+    parser.add_argument("--changed", type=float, default=0.01, help="fraction of exchanges with a changed month")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    names = [f"Exchange {i:05d}" for i in range(args.exchanges)]
+    exchange_data = exchange_metrics.generate_synthetic_exchange_data(names, rng=rng)
+    changed = change(exchange_data, args.changed, rng)
+
+    tmpdir = tempfile.mkdtemp()
+    original_engine = database.set_engine(database.create_database_engine(f"sqlite:///{os.path.join(tmpdir, 'refresh.db')}"))
+    try:
+        database.create_tables()
+        timed(database.init_db_with_exchange_data, exchange_data)
+
+        def reload(data):
+            database.clear_exchange_data()
+            return database.init_db_with_exchange_data(data)
+
+        print(f"{'method':>24} {'rows written':>13} {'time (ms)':>10}")
+        for method, fn, data in (
+            ("full reload", reload, changed),
+            ("refresh, unchanged", database.refresh_exchange_data, changed),
+            ("refresh, all periods", database.refresh_exchange_data, change(exchange_data, args.changed, rng)),
+            ("refresh, latest periods", database.refresh_exchange_data, latest(change(exchange_data, args.changed, rng)))
+        ):
+            rows, elapsed = timed(fn, data)
+            print(f"{method:>24} {rows:>13,} {elapsed * 1000:>10.1f}")
+    finally:
+        database.set_engine(original_engine).dispose()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
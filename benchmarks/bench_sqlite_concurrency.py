@@ -0,0 +1,121 @@
+"""
+Reader latency under write load on SQLite: the default rollback journal
+against the SQLITE_PRAGMAS profile (WAL, synchronous=NORMAL, mmap, ...).
+
+A writer process (like the ingestion service) keeps storing price
+batches while reader threads (like dashboard sessions) keep loading the
+latest prices.
+
+Run from the repository root:
+
+    python benchmarks/bench_sqlite_concurrency.py [--readers 8] [--seconds 3]
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from sqlalchemy import event, insert, select, func
+
+import database
+
+# Rows per write transaction
+WRITE_BATCH = 2000
+
+def make_engine(path, pragmas, pool_size=5):
+    """SQLite engine on path with the given pragmas applied to every connection."""
+    engine = database.create_engine(f"sqlite:///{path}", pool_size=pool_size)
+    event.listen(engine, "connect", lambda conn, record: database.apply_sqlite_pragmas(conn, record, pragmas))
+    return engine
+
+def write(path, pragmas, stop, writes, errors):
+    """Writer process: store batches of prices until stopped, like the ingestion service."""
+    engine = make_engine(path, pragmas)
+    prices = database.CryptoPrice.__table__
+    rows = [{"crypto_id": f"coin-{i}", "name": f"Coin {i}", "symbol": f"c{i}", "price_usd": 1.0, "change_24h": 0.0} for i in range(WRITE_BATCH)]
+    while not stop.is_set():
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(prices), rows)
+            writes.value += 1
+        except Exception:
+            errors.value += 1
+    engine.dispose()
+
+def run_load(path, pragmas, readers, seconds):
+    """
+    Run a writer process and `readers` reader threads against the database for `seconds`.
+    Returns (read latencies in seconds, writes done, errors).
+    """
+    engine = make_engine(path, pragmas, pool_size=readers)
+    database.Base.metadata.create_all(engine)
+    prices = database.CryptoPrice.__table__
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def read():
+        local = []
+        query = select(prices.c.symbol, prices.c.price_usd).order_by(prices.c.id.desc()).limit(10)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(query).all()
+                    conn.execute(select(func.count()).select_from(prices)).scalar()
+                local.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(e)
+            time.sleep(0.001)
+        with lock:
+            latencies.extend(local)
+
+    process_stop = multiprocessing.Event()
+    writes = multiprocessing.Value("i", 0)
+    write_errors = multiprocessing.Value("i", 0)
+    writer = multiprocessing.Process(target=write, args=(path, pragmas, process_stop, writes, write_errors))
+    writer.start()
+
+    threads = [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    process_stop.set()
+    for thread in threads:
+        thread.join()
+    writer.join()
+    engine.dispose()
+
+    return np.array(latencies), writes.value, len(errors) + write_errors.value
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SQLite reader latency under write load.")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent reader threads")
+    parser.add_argument("--seconds", type=float, default=3, help="duration of each run")
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp()
+    print(f"{'profile':>8} {'reads/s':>9} {'writes/s':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'max (ms)':>9} {'errors':>7}")
+    try:
+        for profile, pragmas in (("default", {}), ("tuned", database.SQLITE_PRAGMAS)):
+            path = os.path.join(tmpdir, f"{profile}.db")
+            latencies, writes, errors = run_load(path, pragmas, args.readers, args.seconds)
+            p50, p95 = np.percentile(latencies, [50, 95]) * 1000 if len(latencies) else (float("nan"),) * 2
+            peak = latencies.max() * 1000 if len(latencies) else float("nan")
+            print(f"{profile:>8} {len(latencies) / args.seconds:>9.0f} {writes / args.seconds:>9.0f} "
+                  f"{p50:>9.2f} {p95:>9.2f} {peak:>9.2f} {errors:>7}")
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
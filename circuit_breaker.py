@@ -0,0 +1,82 @@
+import threading
+import time
+
+# Circuit breaker states
+CLOSED = "closed"        # Calls go through normally
+OPEN = "open"            # Calls fail fast until the recovery timeout has passed
+HALF_OPEN = "half_open"  # One trial call decides whether to close or reopen
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast with CircuitOpenError. Once recovery_timeout seconds have passed
+    a single trial call is let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=3, recovery_timeout=30, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def before_call(self):
+        """
+        Check that a call may go ahead, raising CircuitOpenError if not.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return
+
+            if self._state == OPEN:
+                remaining = self.recovery_timeout - (self._clock() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(f"Circuit for {self.name} is open, retrying in {remaining:.0f}s")
+                self._state = HALF_OPEN
+
+            # Half-open: only one trial call at a time
+            if self._trial_in_flight:
+                raise CircuitOpenError(f"Circuit for {self.name} is half-open with a trial call in flight")
+            self._trial_in_flight = True
+
+    def record_success(self):
+        """
+        Record a successful call, closing the circuit.
+        """
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """
+        Record a failed call, opening the circuit once the threshold is reached.
+        """
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
+
+    def release(self):
+        """
+        Give up a call slot without recording an outcome (e.g. the call never reached the upstream).
+        """
+        with self._lock:
+            self._trial_in_flight = False
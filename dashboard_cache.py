@@ -0,0 +1,126 @@
+import os
+
+import streamlit as st
+
+import http_client
+from data_fetcher import fetch_real_time_data, load_dashboard_data
+from database import get_all_exchange_data, get_exchange_aggregates
+from exchange_snapshot import EXCHANGE_SNAPSHOT_PATH, get_snapshot_version, open_snapshot_version
+
+# Datasets the dashboard caches, with the labels shown in the refresh control
+DATASETS = {
+    "exchange_data": "Exchange data",
+    "global_data": "Global market stats",
+    "chart_history": "Market history",
+    "prices": "Prices",
+    "news": "News"
+}
+
+# API endpoint each dataset is fetched from; exchange data is generated locally
+DATASET_ENDPOINTS = {
+    "global_data": "global",
+    "chart_history": "chart_history",
+    "prices": "prices",
+    "news": "news"
+}
+
+# Seconds each dataset stays cached (override with DASHBOARD_TTL_<DATASET>).
+# Separate from http_client.ENDPOINT_TTLS (CACHE_TTL_<ENDPOINT>), which caches API responses.
+# Data read from the database is also reloaded as soon as it is written,
+# since its data version is part of the cache key
+DASHBOARD_TTLS = {
+    name: float(os.environ.get(f"DASHBOARD_TTL_{name.upper()}", default))
+    for name, default in (
+        ("exchange_data", 3600),
+        ("global_data", 300),
+        ("chart_history", 3600),
+        ("prices", 60),
+        ("news", 900)
+    )
+}
+
+@st.cache_resource
+def open_exchange_snapshot(version):
+    """
+    Memory-map a snapshot version once per process; every session shares it.
+    """
+    return open_snapshot_version(version)
+
+@st.cache_data(ttl=DASHBOARD_TTLS["exchange_data"], show_spinner=False)
+def load_exchange_data(version):
+    """
+    Exchange data and its aggregates from the database, or real-time data if
+    the database is empty (with no aggregates). version only keys the cache.
+    """
+    exchange_data = get_all_exchange_data()
+    if exchange_data:
+        return exchange_data, get_exchange_aggregates()
+    return fetch_real_time_data(), None
+
+@st.cache_data(ttl=DASHBOARD_TTLS["global_data"], show_spinner=False)
+def load_global_data(version):
+    """Dashboard bundle of global market stats. version only keys the cache."""
+    return load_dashboard_data(["global_data"])
+
+@st.cache_data(ttl=DASHBOARD_TTLS["chart_history"], show_spinner=False)
+def load_chart_history(version):
+    """Dashboard bundle of market history. version only keys the cache."""
+    return load_dashboard_data(["chart_history"])
+
+@st.cache_data(ttl=DASHBOARD_TTLS["prices"], show_spinner=False)
+def load_prices(version):
+    """Dashboard bundle of current prices. version only keys the cache."""
+    return load_dashboard_data(["prices"])
+
+@st.cache_data(ttl=DASHBOARD_TTLS["news"], show_spinner=False)
+def load_news(version):
+    """Dashboard bundle of news. version only keys the cache."""
+    return load_dashboard_data(["news"])
+
+# Cached loaders of the datasets in the dashboard bundle
+DASHBOARD_LOADERS = {
+    "global_data": load_global_data,
+    "chart_history": load_chart_history,
+    "prices": load_prices,
+    "news": load_news
+}
+
+def get_exchange_data(versions):
+    """
+    Get (exchange_data, aggregates): from the memory-mapped snapshot when one
+    is configured, otherwise through the cache. Snapshot arrays are not copied
+    into the cache; the open snapshot is shared as a resource instead.
+    """
+    snapshot_version = get_snapshot_version(EXCHANGE_SNAPSHOT_PATH)
+    snapshot = open_exchange_snapshot(snapshot_version) if snapshot_version else None
+    if snapshot is not None:
+        return snapshot.exchange_data, snapshot.aggregates
+    return load_exchange_data(versions.get("exchange_data"))
+
+def get_dashboard_data(versions):
+    """
+    Get the dashboard bundle, each source through its own cache entry.
+    Sources that fell back to stored or sample data are dropped from the
+    cache once read, so the next rerun tries to load them again.
+    """
+    bundle = {"status": {}, "errors": {}}
+    for name, loader in DASHBOARD_LOADERS.items():
+        data = loader(versions.get(name))
+        bundle[name] = data[name]
+        bundle["status"][name] = data["status"][name]
+        if name in data["errors"]:
+            bundle["errors"][name] = data["errors"][name]
+        if data["status"][name] != "ok":
+            loader.clear(versions.get(name))
+    return bundle
+
+def clear_datasets(names):
+    """
+    Drop every cached entry of the named datasets so they are loaded again,
+    including their cached API responses, so live data is fetched anew.
+    """
+    loaders = dict(DASHBOARD_LOADERS, exchange_data=load_exchange_data)
+    for name in names:
+        loaders[name].clear()
+        if name in DATASET_ENDPOINTS:
+            http_client.invalidate_endpoint(DATASET_ENDPOINTS[name])
@@ -1,103 +1,286 @@
-import numpy as np
-import pandas as pd
+import argparse
 import datetime as dt
+import json
+import os
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, delete, insert
+
+import database
+import exchange_metrics
+
+# Number of exchanges in the standard fixtures, as multiples of the dashboard's 9
+SCALE_PRESETS = {"1x": 9, "10x": 90, "100x": 900, "1000x": 9000}
+
+# Exchanges generated per chunk; bounds the memory used while streaming
+DEFAULT_CHUNK_SIZE = 100
+
+# Rows per INSERT statement when streaming into the database
+DEFAULT_BATCH_SIZE = 10000
 
-def generate_exchange_data():
+# Tables in the order they are written (parents before children)
+TABLES = ["exchanges", "daily_data", "monthly_data", "yearly_data", "fee_structures", "trade_ticks"]
+
+def generate_exchange_data(rng=None):
     """
     Generate structured data for cryptocurrency exchanges.
     Generates realistic patterns but does not use real data.
+    Pass a seed or np.random.Generator as rng for reproducible data.
+    """
+    return exchange_metrics.generate_synthetic_exchange_data(rng=rng)
+
+class SyntheticDataset:
     """
-    # List of exchanges
-    exchanges = [
-        "Binance", "Coinbase", "Bybit", "Upbit", "Kraken", 
-        "Kucoin", "CoinDCX", "Bitget", "OKX"
-    ]
-    
-    # Generate data for each exchange
-    exchange_data = {}
-    
-    # Current year and month
-    current_date = dt.datetime.now()
-    current_year = current_date.year
-    
-    for exchange in exchanges:
-        # Determine exchange scale factor (some exchanges have higher volume than others)
-        if exchange in ["Binance", "Coinbase"]:
-            scale = np.random.uniform(8, 12)  # Larger exchanges
-        elif exchange in ["Bybit", "Kraken", "Upbit"]:
-            scale = np.random.uniform(4, 8)   # Medium exchanges
-        else:
-            scale = np.random.uniform(1, 4)   # Smaller exchanges
-        
-        # Monthly data - last 12 months
-        months = 12
-        month_dates = [(current_date - dt.timedelta(days=30*i)).strftime("%Y-%m") for i in range(months)]
-        month_dates.reverse()  # Oldest first
-        
-        # Generate monthly volume data with realistic patterns
-        base_volume = np.random.uniform(500, 2000) * scale
-        monthly_volume = []
-        
-        for i in range(months):
-            # Add some seasonality and trend
-            season_factor = 1 + 0.2 * np.sin(i/6 * np.pi)
-            trend_factor = 1 + (i/24)  # Slight upward trend
-            
-            # Add some randomness
-            random_factor = np.random.uniform(0.8, 1.2)
-            
-            volume = base_volume * season_factor * trend_factor * random_factor
-            monthly_volume.append(round(volume, 2))
-        
-        # Commission is typically a percentage of volume
-        commission_rate = np.random.uniform(0.001, 0.003)  # 0.1% to 0.3%
-        monthly_commission = [round(vol * commission_rate, 2) for vol in monthly_volume]
-        
-        # Yearly data - last 8 years
-        years = 8
-        year_list = [str(current_year - i) for i in range(years)]
-        year_list.reverse()  # Oldest first
-        
-        # Generate yearly data
-        yearly_volume = []
-        yearly_commission = []
-        
-        for i in range(years):
-            # Exchanges grow over time
-            growth_factor = (1 + i/5) ** 2  # Exponential growth
-            
-            # Add some randomness
-            random_factor = np.random.uniform(0.9, 1.1)
-            
-            year_volume = base_volume * 12 * growth_factor * random_factor
-            yearly_volume.append(round(year_volume, 2))
-            yearly_commission.append(round(year_volume * commission_rate, 2))
-        
-        # VIP tiers and fees
-        vip_tiers = ["Regular", "VIP 1", "VIP 2", "VIP 3", "VIP 4", "VIP 5"]
-        maker_fees = []
-        taker_fees = []
-        
-        # Generate descending fee structure based on VIP level
-        base_maker = np.random.uniform(0.075, 0.15)
-        base_taker = base_maker * 1.5
-        
-        for tier in range(len(vip_tiers)):
-            reduction = tier * 0.02
-            maker_fees.append(round(max(0.01, base_maker - reduction), 3))
-            taker_fees.append(round(max(0.02, base_taker - reduction), 3))
-        
-        # Store data for this exchange
-        exchange_data[exchange] = {
-            "monthly_dates": month_dates,
-            "monthly_volume": monthly_volume,
-            "monthly_commission": monthly_commission,
-            "yearly_dates": year_list,
-            "yearly_volume": yearly_volume,
-            "yearly_commission": yearly_commission,
-            "vip_tiers": vip_tiers,
-            "maker_fees": maker_fees,
-            "taker_fees": taker_fees
+    Seeded synthetic exchange dataset of any size, generated in chunks.
+    Covers `exchanges` exchanges with daily data for the last `months` calendar
+    months up to end_date (rolled up into monthly rows), `years` yearly rows,
+    `tiers` fee tiers and optionally `ticks_per_day` trades per exchange and day.
+    The same parameters and seed always produce the same data.
+    """
+
+    def __init__(self, exchanges=9, months=12, years=8, tiers=6, ticks_per_day=0,
+                 seed=0, end_date=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.exchanges = exchanges
+        self.years = years
+        self.tiers = tiers
+        self.ticks_per_day = ticks_per_day
+        self.seed = seed
+        self.end_date = end_date or dt.date.today()
+        self.chunk_size = chunk_size
+
+        # Every day from the first day of the first month through end_date
+        first_month = np.datetime64(self.end_date, "M") - (months - 1)
+        self.dates = np.arange(first_month.astype("datetime64[D]"), np.datetime64(self.end_date, "D") + 1)
+        months_of_days, self.month_starts = np.unique(self.dates.astype("datetime64[M]"), return_index=True)
+
+        self.date_labels = np.datetime_as_string(self.dates).astype("U10")
+        self.month_labels = np.datetime_as_string(months_of_days).astype("U7")
+        self.year_labels = np.array([str(self.end_date.year - i) for i in reversed(range(years))], dtype="U4")
+        self.tier_labels = np.array(["Regular"] + [f"VIP {i}" for i in range(1, tiers)], dtype="U16")
+
+    def exchange_names(self, start, stop):
+        """Names of the exchanges in [start, stop): the dashboard's exchanges first."""
+        names = list(exchange_metrics.DEFAULT_EXCHANGES[start:stop])
+        names += [f"Exchange {i + 1:05d}" for i in range(start + len(names), stop)]
+        return np.array(names, dtype="U64")
+
+    def table_sizes(self):
+        """Number of rows the dataset has in each table."""
+        days = len(self.dates)
+        return {
+            "exchanges": self.exchanges,
+            "daily_data": self.exchanges * days,
+            "monthly_data": self.exchanges * len(self.month_labels),
+            "yearly_data": self.exchanges * self.years,
+            "fee_structures": self.exchanges * self.tiers,
+            "trade_ticks": self.exchanges * days * self.ticks_per_day
         }
-    
-    return exchange_data
+
+    def iter_chunks(self):
+        """
+        Yield (table, columns) pairs, where columns maps column names to equal-length
+        arrays. At most chunk_size exchanges (and one month of ticks) are held at a time.
+        """
+        rng = np.random.default_rng(self.seed)
+        days = len(self.dates)
+
+        for start in range(0, self.exchanges, self.chunk_size):
+            stop = min(start + self.chunk_size, self.exchanges)
+            count = stop - start
+            ids = np.arange(start + 1, stop + 1)
+
+            # Size each exchange by its volume class
+            low, high = exchange_metrics.get_scale_ranges(self.exchange_names(start, stop))
+            scale = rng.uniform(low, high)
+            base_monthly_volume = rng.uniform(500, 2000, count) * scale
+            commission_rate = rng.uniform(0.001, 0.003, count)
+
+            yield "exchanges", {"id": ids, "name": self.exchange_names(start, stop), "scale_factor": scale}
+
+            volume, commission = exchange_metrics.generate_daily_volume_matrix(
+                base_monthly_volume / 30, commission_rate, days, rng
+            )
+            yield "daily_data", {
+                "exchange_id": np.repeat(ids, days),
+                "date": np.tile(self.date_labels, count),
+                "volume": volume.ravel(),
+                "commission": commission.ravel()
+            }
+
+            # Monthly rows are the sums of their days
+            months = len(self.month_labels)
+            yield "monthly_data", {
+                "exchange_id": np.repeat(ids, months),
+                "month_date": np.tile(self.month_labels, count),
+                "volume": np.round(np.add.reduceat(volume, self.month_starts, axis=1), 2).ravel(),
+                "commission": np.round(np.add.reduceat(commission, self.month_starts, axis=1), 2).ravel()
+            }
+
+            yearly = exchange_metrics.generate_volume_matrix(
+                base_monthly_volume, commission_rate, months=0, years=self.years, rng=rng
+            )
+            yield "yearly_data", {
+                "exchange_id": np.repeat(ids, self.years),
+                "year": np.tile(self.year_labels, count),
+                "volume": yearly["yearly_volume"].ravel(),
+                "commission": yearly["yearly_commission"].ravel()
+            }
+
+            maker_fees, taker_fees = exchange_metrics.generate_fee_tiers(count, self.tiers, rng)
+            yield "fee_structures", {
+                "exchange_id": np.repeat(ids, self.tiers),
+                "vip_tier": np.tile(self.tier_labels, count),
+                "maker_fee": maker_fees.ravel(),
+                "taker_fee": taker_fees.ravel()
+            }
+
+            if self.ticks_per_day:
+                for exchange_id in ids:
+                    yield from self._iter_ticks(exchange_id, rng)
+
+    def _iter_ticks(self, exchange_id, rng):
+        # One month of trades at a time, continuing the price walk across months
+        price = rng.uniform(20000, 70000, 1)
+        bounds = list(self.month_starts) + [len(self.dates)]
+
+        for first_day, end_day in zip(bounds[:-1], bounds[1:]):
+            days = self.dates[first_day:end_day]
+            ticks = len(days) * self.ticks_per_day
+
+            prices, amounts = exchange_metrics.generate_ticks(price, ticks, rng)
+            price = prices[:, -1]
+
+            # Random, ordered trade times within each day
+            offsets = np.sort(rng.integers(0, 86400000, (len(days), self.ticks_per_day)), axis=1)
+            timestamps = days.astype("datetime64[ms]")[:, np.newaxis] + offsets.astype("timedelta64[ms]")
+
+            yield "trade_ticks", {
+                "exchange_id": np.full(ticks, exchange_id),
+                "timestamp": timestamps.ravel(),
+                "price": prices.ravel(),
+                "amount": amounts.ravel()
+            }
+
+def write_database(dataset, engine=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Stream a synthetic dataset into the database with bulk inserts, replacing
+    any existing exchange data and refreshing the exchange aggregates.
+    Everything is written in one transaction. Returns the number of rows
+    written to each table.
+    """
+    engine = engine or database.engine
+    database.Base.metadata.create_all(engine)
+    tables = {name: database.Base.metadata.tables[name] for name in TABLES}
+    counts = dict.fromkeys(TABLES, 0)
+
+    with engine.begin() as conn:
+        conn.execute(delete(database.ExchangeAggregate.__table__))
+        for name in reversed(TABLES):
+            conn.execute(delete(tables[name]))
+
+        for name, columns in dataset.iter_chunks():
+            keys = list(columns)
+            size = len(columns[keys[0]])
+            for start in range(0, size, batch_size):
+                values = [columns[key][start:start + batch_size].tolist() for key in keys]
+                conn.execute(insert(tables[name]), [dict(zip(keys, row)) for row in zip(*values)])
+            counts[name] += size
+
+        database.refresh_exchange_aggregates(conn)
+
+    return counts
+
+def write_columnar(dataset, path):
+    """
+    Stream a synthetic dataset into a directory of .npy column files, one
+    subdirectory per table (e.g. daily_data/volume.npy), plus a manifest.json.
+    Files are preallocated and filled chunk by chunk through memory maps, and
+    can be loaded with np.load(..., mmap_mode="r").
+    Returns the number of rows written to each table.
+    """
+    sizes = dataset.table_sizes()
+    counts = dict.fromkeys(TABLES, 0)
+    columns_by_table = {name: [] for name in TABLES}
+    files = {}
+
+    for name, columns in dataset.iter_chunks():
+        start = counts[name]
+        size = 0
+        for column, values in columns.items():
+            key = (name, column)
+            if key not in files:
+                os.makedirs(os.path.join(path, name), exist_ok=True)
+                files[key] = np.lib.format.open_memmap(
+                    os.path.join(path, name, f"{column}.npy"), mode="w+", dtype=values.dtype, shape=(sizes[name],)
+                )
+                columns_by_table[name].append(column)
+            files[key][start:start + len(values)] = values
+            size = len(values)
+        counts[name] += size
+
+    for array in files.values():
+        array.flush()
+    files.clear()
+
+    manifest = {
+        "tables": {name: {"rows": counts[name], "columns": columns_by_table[name]} for name in TABLES},
+        "exchanges": dataset.exchanges,
+        "months": len(dataset.month_labels),
+        "years": dataset.years,
+        "tiers": dataset.tiers,
+        "ticks_per_day": dataset.ticks_per_day,
+        "seed": dataset.seed,
+        "end_date": dataset.end_date.isoformat()
+    }
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return counts
+
+def main(argv=None):
+    """Generate a synthetic fixture into a SQLite database or a columnar directory."""
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic exchange dataset for load testing.")
+    parser.add_argument("--scale", choices=sorted(SCALE_PRESETS, key=lambda s: SCALE_PRESETS[s]), default="1x",
+                        help="standard fixture size, in multiples of the dashboard's 9 exchanges (default: 1x)")
+    parser.add_argument("--exchanges", type=int, help="number of exchanges (overrides --scale)")
+    parser.add_argument("--months", type=int, default=12, help="months of daily data (default: 12)")
+    parser.add_argument("--years", type=int, default=8, help="years of yearly data (default: 8)")
+    parser.add_argument("--tiers", type=int, default=6, help="fee tiers per exchange (default: 6)")
+    parser.add_argument("--ticks-per-day", type=int, default=0, help="trades per exchange and day (default: 0, no ticks)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--end-date", type=dt.date.fromisoformat, help="last day of data, YYYY-MM-DD (default: today)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="exchanges generated per chunk")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per INSERT statement")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--db", metavar="PATH", help="write into this SQLite database file")
+    output.add_argument("--columnar", metavar="DIR", help="write .npy column files into this directory")
+    args = parser.parse_args(argv)
+
+    dataset = SyntheticDataset(
+        exchanges=args.exchanges or SCALE_PRESETS[args.scale],
+        months=args.months,
+        years=args.years,
+        tiers=args.tiers,
+        ticks_per_day=args.ticks_per_day,
+        seed=args.seed,
+        end_date=args.end_date,
+        chunk_size=args.chunk_size
+    )
+
+    start = time.perf_counter()
+    if args.db:
+        engine = create_engine(f"sqlite:///{args.db}")
+        counts = write_database(dataset, engine, args.batch_size)
+        engine.dispose()
+    else:
+        counts = write_columnar(dataset, args.columnar)
+    elapsed = time.perf_counter() - start
+
+    total = sum(counts.values())
+    for name in TABLES:
+        print(f"{name:>15}: {counts[name]:,} rows")
+    print(f"Wrote {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import os
+import signal
+import threading
+import time
+import init_db
+from data_fetcher import fetch_current_prices, fetch_global_charts_data, backfill_chart_history, fetch_crypto_news
+from data_fetcher import get_stored_dashboard_data, write_dashboard_snapshot, iter_market_data
+from database import create_tables, store_crypto_prices, store_global_stats, store_news_items
+from database import store_coin_markets, rollup_price_history
+from exchange_snapshot import EXCHANGE_SNAPSHOT_PATH, write_snapshot_from_database
+
+# Seconds between polls of each source (override with INGEST_<SOURCE>_INTERVAL)
+DEFAULT_INTERVALS = {
+    "prices": 60,
+    "global": 300,
+    "chart_history": 3600,
+    "news": 900,
+    "markets": 3600,
+    "price_rollups": 60,
+    "exchange_snapshot": 300
+}
+
+def get_intervals():
+    """
+    Get the polling interval of each source, applying any environment overrides.
+    """
+    return {
+        source: float(os.environ.get(f"INGEST_{source.upper()}_INTERVAL", interval))
+        for source, interval in DEFAULT_INTERVALS.items()
+    }
+
+def fetch_market_universe_rows(fallback=False):
+    """
+    Stream the coin market universe page by page. There is no sample
+    fallback for it, so the flag is ignored.
+    """
+    return iter_market_data()
+
+def backfill_market_history(fallback=False):
+    """
+    Fetch the market history ranges not stored yet. Chunks are written as
+    they arrive, so there is nothing left to store afterwards.
+    """
+    return backfill_chart_history()
+
+def rollup_prices(fallback=False):
+    """
+    Roll new price points up into the OHLC tiers and apply retention.
+    Only stored data is read, so the flag is ignored.
+    """
+    return rollup_price_history()
+
+def export_exchange_snapshot(fallback=False):
+    """
+    Write the stored exchange data to the columnar snapshot the dashboard
+    memory-maps. Only stored data is read, so the flag is ignored.
+    """
+    return write_snapshot_from_database()
+
+def get_ingest_jobs():
+    """
+    Get the sources to poll, mapped to (fetcher, store) pairs.
+    Fetchers are called with fallback=False so sample data never reaches the database.
+    A store of None means the fetcher writes its own results.
+    The exchange snapshot is only exported when EXCHANGE_SNAPSHOT_PATH is set.
+    """
+    jobs = {
+        "prices": (fetch_current_prices, store_crypto_prices),
+        "global": (fetch_global_charts_data, store_global_stats),
+        "chart_history": (backfill_market_history, None),
+        "news": (fetch_crypto_news, store_news_items),
+        "markets": (fetch_market_universe_rows, store_coin_markets),
+        "price_rollups": (rollup_prices, None)
+    }
+    if EXCHANGE_SNAPSHOT_PATH:
+        jobs["exchange_snapshot"] = (export_exchange_snapshot, None)
+    return jobs
+
+def ingest_source(name, jobs=None):
+    """
+    Fetch one source and write it to the database. Returns True on success,
+    False if the fetch raised or the store function reported a failure.
+    """
+    jobs = jobs or get_ingest_jobs()
+    fetcher, store = jobs[name]
+
+    try:
+        data = fetcher(fallback=False)
+        if store is not None and store(data) is False:
+            return False
+        return True
+    except Exception as e:
+        print(f"Error ingesting {name}: {str(e)}")
+        return False
+
+def run_once(jobs=None):
+    """
+    Ingest every source once.
+    """
+    jobs = jobs or get_ingest_jobs()
+    return {name: ingest_source(name, jobs) for name in jobs}
+
+def run(intervals=None, stop_event=None, bootstrap=True, jobs=None):
+    """
+    Poll each source on its own interval until stop_event is set.
+    With bootstrap=True the database is first initialized through init_db.main.
+    """
+    intervals = intervals or get_intervals()
+    stop_event = stop_event or threading.Event()
+    jobs = jobs or get_ingest_jobs()
+
+    if bootstrap:
+        init_db.main()
+    else:
+        create_tables()
+
+    # After bootstrapping, every source is next due one interval from now
+    now = time.monotonic()
+    next_run = {name: (now + intervals[name]) if bootstrap else now for name in jobs}
+
+    while not stop_event.is_set():
+        now = time.monotonic()
+        for name in jobs:
+            if next_run[name] <= now:
+                ingest_source(name, jobs)
+                next_run[name] = time.monotonic() + intervals[name]
+
+        stop_event.wait(max(0.0, min(next_run.values()) - time.monotonic()))
+
+def main(argv=None):
+    """Run the ingestion service."""
+    parser = argparse.ArgumentParser(description="Poll market data APIs and store the results in the database.")
+    parser.add_argument("--once", action="store_true", help="ingest every source once and exit")
+    parser.add_argument("--no-bootstrap", action="store_true", help="skip the init_db bootstrap on start")
+    parser.add_argument("--snapshot", metavar="PATH", help="with --once, also write a dashboard snapshot for offline mode")
+    for source, interval in get_intervals().items():
+        parser.add_argument(
+            f"--{source.replace('_', '-')}-interval",
+            type=float,
+            default=interval,
+            help=f"seconds between {source.replace('_', ' ')} polls (default: {interval:g})"
+        )
+    args = parser.parse_args(argv)
+
+    if args.once:
+        create_tables()
+        run_once()
+        if args.snapshot:
+            write_dashboard_snapshot(get_stored_dashboard_data(), args.snapshot)
+            print(f"Wrote dashboard snapshot to {args.snapshot}")
+        return
+
+    intervals = {source: getattr(args, f"{source}_interval") for source in DEFAULT_INTERVALS}
+
+    # Stop cleanly on Ctrl+C or a service manager's SIGTERM
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+
+    print(f"Starting ingestion service with intervals {intervals}")
+    run(intervals, stop_event=stop_event, bootstrap=not args.no_bootstrap)
+    print("Ingestion service stopped.")
+
+if __name__ == "__main__":
+    main()
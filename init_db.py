@@ -1,6 +1,20 @@
 import sys
-from data_fetcher import fetch_real_time_data, fetch_crypto_news, fetch_current_prices
-from database import create_tables, init_db_with_exchange_data, store_crypto_prices, store_news_items
+from data_fetcher import fetch_real_time_data, fetch_crypto_news, fetch_current_prices, fetch_global_charts_data
+from data_fetcher import backfill_chart_history
+from database import create_tables, init_db_with_exchange_data, store_crypto_prices, store_news_items, store_global_stats
+from exchange_snapshot import EXCHANGE_SNAPSHOT_PATH, write_snapshot_from_database
+
+def fetch_and_store(name, fetcher, store):
+    """
+    Fetch a source without the sample fallback and store it.
+    Nothing is stored if the fetch fails. Returns True on success.
+    """
+    try:
+        data = fetcher(fallback=False)
+    except Exception as e:
+        print(f"Error fetching {name}: {str(e)}")
+        return False
+    return store(data) is not False
 
 def main():
     """Initialize the database with exchange data, crypto prices, and news."""
@@ -14,12 +28,23 @@ def main():
     init_db_with_exchange_data(exchange_data)
     
     print("Fetching and storing cryptocurrency prices...")
-    crypto_prices = fetch_current_prices()
-    store_crypto_prices(crypto_prices)
+    fetch_and_store("cryptocurrency prices", fetch_current_prices, store_crypto_prices)
     
+    print("Fetching and storing global market stats...")
+    fetch_and_store("global market stats", fetch_global_charts_data, store_global_stats)
+
+    print("Backfilling market history...")
+    try:
+        backfill_chart_history()
+    except Exception as e:
+        print(f"Error backfilling market history: {str(e)}")
+
     print("Fetching and storing news items...")
-    news_data = fetch_crypto_news()
-    store_news_items(news_data)
+    fetch_and_store("news items", fetch_crypto_news, store_news_items)
+
+    if EXCHANGE_SNAPSHOT_PATH:
+        print("Writing exchange snapshot...")
+        write_snapshot_from_database()
     
     print("Database initialization complete!")
 
@@ -4,6 +4,11 @@
 import os
 import sys
 
+# Offline mode: serve data from the database or a local snapshot and never touch the
+# network (python main.py --offline, or streamlit run main.py -- --offline)
+if "--offline" in sys.argv[1:]:
+    os.environ["OFFLINE_MODE"] = "1"
+
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Bucket that holds an upstream-wide block set from a 429 Retry-After
+UPSTREAM_BUCKET = "__upstream__"
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait longer than allowed for a token."""
+
+class TokenBucketLimiter:
+    """
+    Token-bucket rate limiter whose state lives in a SQLite file, so every
+    Streamlit worker process and the init_db job draw from the same budgets.
+    Each bucket refills at its calls-per-minute budget and holds at most one
+    minute's worth of tokens. Callers wait for a token for up to max_wait seconds.
+    """
+
+    def __init__(self, path, budgets, default_budget=30, max_wait=5, clock=time.time, sleep=time.sleep):
+        self.path = path
+        self.budgets = dict(budgets)
+        self.default_budget = default_budget
+        self.max_wait = max_wait
+        self._clock = clock
+        self._sleep = sleep
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                bucket TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                blocked_until REAL NOT NULL DEFAULT 0
+            )
+        """)
+
+    def _connection(self):
+        # One connection per thread; sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, bucket, max_wait=None):
+        """
+        Take one token from the bucket, waiting while the budget refills.
+        Returns the number of seconds waited. Raises RateLimitExceeded if a
+        token is not available within max_wait seconds.
+        """
+        if max_wait is None:
+            max_wait = self.max_wait
+
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(bucket)
+            if wait <= 0:
+                return waited
+            if waited + wait > max_wait:
+                raise RateLimitExceeded(f"Rate limit for {bucket} needs a {wait:.1f}s wait")
+            self._sleep(wait)
+            waited += wait
+
+    def block(self, seconds, bucket=UPSTREAM_BUCKET):
+        """
+        Stop handing out tokens for the bucket (by default all buckets) for the given time.
+        """
+        until = self._clock() + seconds
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO rate_limits (bucket, tokens, updated_at, blocked_until) VALUES (?, 0, ?, ?) "
+                "ON CONFLICT(bucket) DO UPDATE SET blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                (bucket, self._clock(), until)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def budget(self, bucket):
+        """
+        Get the calls-per-minute budget for a bucket.
+        """
+        return self.budgets.get(bucket, self.default_budget)
+
+    def _try_acquire(self, bucket):
+        # Returns 0 if a token was taken, otherwise the seconds until one may be available
+        now = self._clock()
+        per_minute = self.budget(bucket)
+        rate = per_minute / 60.0
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            upstream = conn.execute(
+                "SELECT blocked_until FROM rate_limits WHERE bucket = ?", (UPSTREAM_BUCKET,)
+            ).fetchone()
+            row = conn.execute(
+                "SELECT tokens, updated_at, blocked_until FROM rate_limits WHERE bucket = ?", (bucket,)
+            ).fetchone()
+
+            if row is None:
+                tokens, blocked_until = float(per_minute), 0.0
+            else:
+                tokens = min(per_minute, row[0] + (now - row[1]) * rate)
+                blocked_until = row[2]
+            if upstream is not None:
+                blocked_until = max(blocked_until, upstream[0])
+
+            if now < blocked_until:
+                wait = blocked_until - now
+            elif tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+
+            conn.execute(
+                "INSERT INTO rate_limits (bucket, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(bucket) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (bucket, tokens, now, 0.0 if row is None else row[2])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return wait
@@ -14,13 +14,7 @@ import os
 # Add the current directory to the path so we can import modules
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from data_fetcher import (
-    fetch_real_time_data,
-    fetch_crypto_news,
-    fetch_current_prices,
-    fetch_global_charts_data,
-    fetch_global_chart_history
-)
+from data_fetcher import fetch_real_time_data
 from utils import (
     create_monthly_bar_chart,
     create_yearly_bar_chart,
@@ -28,9 +22,13 @@ from utils import (
     create_volume_pie_chart,
     create_fees_table,
     create_fee_comparison_chart,
+    create_dominance_chart,
     format_large_number
 )
-from database import get_all_exchange_data, get_latest_crypto_prices, get_latest_news
+from database import get_latest_crypto_prices, get_latest_news
+from database import get_data_versions, start_query_stats, stop_query_stats
+from exchange_metrics import compute_exchange_aggregates, generate_dominance_history, get_exchange_totals
+from dashboard_cache import DATASETS, clear_datasets, get_dashboard_data, get_exchange_data
 
 def run_app():
     """Main function to run the Streamlit application"""
@@ -42,6 +40,9 @@ def run_app():
         initial_sidebar_state="expanded"
     )
 
+    # Collect the database statements of this rerun for the debug panel
+    start_query_stats()
+
     # Initialize session state for theme
     if 'theme' not in st.session_state:
         st.session_state.theme = 'light'
@@ -260,17 +261,27 @@ def run_app():
     st.title("Crypto Exchange Profits Dashboard")
     st.markdown("*Analysis of commissions earned, volume traded, and fee structures across major cryptocurrency exchanges*")
 
-    # Fetch data from database
+    # Fetch data through the cache; each dataset's stored data version is part
+    # of its cache key, so data written since the last rerun is picked up
+    data_versions = get_data_versions()
     try:
-        exchange_data = get_all_exchange_data()
-        if not exchange_data:
-            # If database is empty, fetch real-time data
-            exchange_data = fetch_real_time_data()
-        exchanges = list(exchange_data.keys())
+        exchange_data, aggregates = get_exchange_data(data_versions)
     except Exception as e:
         st.error(f"Error retrieving data: {str(e)}")
-        exchange_data = fetch_real_time_data()
-        exchanges = list(exchange_data.keys())
+        exchange_data, aggregates = fetch_real_time_data(), None
+    exchanges = list(exchange_data.keys())
+
+    # Totals, averages, shares and ranks per exchange, maintained by the
+    # database at ingestion time; computed here for data not read from it
+    if aggregates is None or set(aggregates["exchange"]) != set(exchanges):
+        aggregates = compute_exchange_aggregates(get_exchange_totals(exchange_data))
+    aggregates = aggregates.set_index(["timeframe", "exchange"])
+    monthly_aggregates = aggregates.loc["Monthly"]
+    yearly_aggregates = aggregates.loc["Yearly"]
+
+    # Global stats, chart history, prices and news, either fetched live
+    # or read from what the ingestion service stored
+    dashboard_data = get_dashboard_data(data_versions)
 
     # Sidebar for filters and controls
     st.sidebar.header("Dashboard Controls")
@@ -297,8 +308,15 @@ def run_app():
         index=0
     )
 
-    # Add a refresh button
+    # Add a refresh button; only the selected datasets are reloaded
+    refresh_datasets = st.sidebar.multiselect(
+        "Datasets to Refresh",
+        options=list(DATASETS),
+        default=list(DATASETS),
+        format_func=DATASETS.get
+    )
     if st.sidebar.button("🔄 Refresh Data"):
+        clear_datasets(refresh_datasets)
         st.rerun()
 
     # Date range selector for data
@@ -319,8 +337,8 @@ def run_app():
     # Show a note about the data source
     st.sidebar.info(
         "ℹ️ This dashboard fetches real-time cryptocurrency exchange data "
-        "from public APIs and exchange documentation. Data is refreshed "
-        "each time the dashboard is loaded or the refresh button is clicked."
+        "from public APIs and exchange documentation. Data is cached, "
+        "refreshed when it changes or expires, or when the refresh button is clicked."
     )
 
     # Add data source information
@@ -353,9 +371,23 @@ def run_app():
     with tabs[0]:
         st.header("Crypto Exchange Performance Overview")
 
-        # Fetch global market data
-        global_data = fetch_global_charts_data()
-        global_chart_history = fetch_global_chart_history()
+        # Flag sources that could not be fetched live
+        source_labels = {
+            "global_data": "global market stats",
+            "chart_history": "market history",
+            "prices": "prices",
+            "news": "news"
+        }
+        stale_sources = [source_labels[name] for name, status in dashboard_data["status"].items() if status == "stale"]
+        sample_sources = [source_labels[name] for name, status in dashboard_data["status"].items() if status == "sample"]
+        if stale_sources:
+            st.warning(f"⚠️ Live data is unavailable for {', '.join(stale_sources)}. Showing the last stored values, which may be out of date.")
+        if sample_sources:
+            st.warning(f"⚠️ No data is available for {', '.join(sample_sources)}. Showing sample data.")
+
+        # Global market data
+        global_data = dashboard_data["global_data"]
+        global_chart_history = dashboard_data["chart_history"]
 
         # Global Market Overview
         st.subheader("Global Cryptocurrency Market")
@@ -437,128 +469,16 @@ def run_app():
             {"id": "doge", "name": "DOGE", "color": "#C3A634"},  # Dogecoin gold
         ]
 
-        # Create a dataframe to store historical dominance data
-        dominance_data = {"Date": dates}
-
-        # Generate realistic historical data for each cryptocurrency
-        for crypto in top_cryptos:
-            crypto_id = crypto["id"]
-            current_value = current_percentages.get(crypto_id, 1.0)  # Default to 1% if not found
-
-            # Generate historical values with realistic fluctuations
-            values = []
-            base_value = max(0.5, current_value * 0.9)  # Start slightly lower than current
-
-            for i in range(len(dates)):
-                # Add realistic fluctuations based on the cryptocurrency
-                if crypto_id == "btc":  # Bitcoin has larger swings
-                    random_factor = np.random.uniform(-2.0, 2.0)
-                    trend = 0.03 * (i / len(dates)) * 10  # Slight upward trend
-                elif crypto_id in ["eth", "bnb", "sol"]:  # Major altcoins
-                    random_factor = np.random.uniform(-1.0, 1.0)
-                    trend = 0.02 * (i / len(dates)) * 5
-                else:  # Stablecoins and smaller altcoins
-                    random_factor = np.random.uniform(-0.5, 0.5)
-                    trend = 0.01 * (i / len(dates)) * 3
-
-                value = base_value + trend + random_factor
-                value = max(0.1, value)  # Ensure minimum value
-                values.append(value)
-
-            dominance_data[crypto["name"]] = values
-
-        # Add "Others" category
-        others_values = []
-        for i in range(len(dates)):
-            # Calculate "Others" as the remaining percentage to reach 100%
-            day_sum = sum(dominance_data[crypto["name"]][i] for crypto in top_cryptos)
-            others_values.append(max(0.1, 100 - day_sum))
-
-        dominance_data["Others"] = others_values
-
-        # Create dataframe
-        df = pd.DataFrame(dominance_data)
-
-        # Normalize to ensure each day sums to 100%
-        for i in range(len(dates)):
-            row_sum = sum(df.iloc[i, 1:])  # Sum all columns except Date
-            if row_sum != 100:
-                scale_factor = 100 / row_sum
-                for col in df.columns[1:]:  # Skip Date column
-                    df.at[i, col] = df.at[i, col] * scale_factor
-
-        # Create the stacked area chart
-        fig = go.Figure()
-
-        # Add traces for each cryptocurrency in reverse order (bottom to top)
+        # Generate historical dominance for each cryptocurrency plus "Others",
+        # normalized so each day sums to 100%
         all_categories = [crypto["name"] for crypto in top_cryptos] + ["Others"]
         all_colors = [crypto["color"] for crypto in top_cryptos] + ["#CCCCCC"]  # Gray for Others
+        shares = generate_dominance_history(current_percentages, [crypto["id"] for crypto in top_cryptos], len(dates))
 
-        # Calculate cumulative sums for stacked areas
-        cumulative = np.zeros(len(dates))
-
-        for i, category in enumerate(all_categories):
-            values = df[category].values
-            fig.add_trace(go.Scatter(
-                x=dates,
-                y=cumulative + values,
-                mode='lines',
-                line=dict(width=0, color=all_colors[i]),
-                fill='tonexty',
-                name=category
-            ))
-            cumulative += values
-
-        # Create hover data for each date point
-        hover_data = []
-        for i, date in enumerate(dates):
-            # Format date like in the screenshot: "Jun 15, 2019, 05:30:00 GMT+5:30"
-            formatted_date = date.strftime("%b %d, %Y, %H:%M:%S GMT+5:30")
-
-            # Start with the date
-            hover_text = f"<b>{formatted_date}</b><br><br>"
-
-            # Get the data for this date
-            day_data = {}
-            for crypto in top_cryptos:
-                day_data[crypto["id"]] = df.iloc[i][crypto["name"]]
-
-            # Calculate Others percentage
-            others_pct = df.iloc[i]["Others"]
-
-            # Add Others first (at the top)
-            hover_text += f"Others: {others_pct:.2f}%<br>"
-
-            # Add all cryptocurrencies in the exact order from the screenshot
-            # Order: Others, ADA, DOGE, USDC, BNB, XRP, USDT, ETH, BTC
-            coin_order = [
-                {"id": "ada", "display": "ADA"},
-                {"id": "doge", "display": "DOGE"},
-                {"id": "usdc", "display": "USDC"},
-                {"id": "bnb", "display": "BNB"},
-                {"id": "xrp", "display": "XRP"},
-                {"id": "usdt", "display": "USDT"},
-                {"id": "eth", "display": "ETH"},
-                {"id": "btc", "display": "BTC"}
-            ]
-
-            for coin in coin_order:
-                if coin["id"] in day_data:
-                    hover_text += f"{coin['display']}: {day_data[coin['id']]:.2f}%<br>"
-
-            hover_data.append(hover_text)
-
-        # Add a trace for each date with custom hover data
-        for i, date in enumerate(dates):
-            fig.add_trace(go.Scatter(
-                x=[date],
-                y=[100],  # Position at the top of the chart
-                mode='markers',
-                marker=dict(opacity=0),  # Make the marker invisible
-                hoverinfo='text',
-                hovertext=hover_data[i],
-                showlegend=False
-            ))
+        # Create the stacked area chart, with one hover trace listing every coin
+        # in the order from the screenshot: Others, ADA, DOGE, USDC, BNB, XRP, USDT, ETH, BTC
+        hover_order = ["Others", "ADA", "DOGE", "USDC", "BNB", "XRP", "USDT", "ETH", "BTC"]
+        fig = create_dominance_chart(dates, shares, all_categories, all_colors, hover_order)
 
         # Update layout
         fig.update_layout(
@@ -854,8 +774,8 @@ def run_app():
 
             st.plotly_chart(fig, use_container_width=True)
 
-        # Fetch current cryptocurrency prices
-        current_prices = fetch_current_prices()
+        # Current cryptocurrency prices
+        current_prices = dashboard_data["prices"]
 
         # Display current crypto prices
         st.subheader("Live Cryptocurrency Prices")
@@ -897,10 +817,10 @@ def run_app():
         col1, col2, col3, col4 = st.columns(4)
 
         # Calculate summary metrics
-        total_commissions = sum([sum(exchange_data[ex]['monthly_commission']) for ex in exchanges])
-        total_volume = sum([sum(exchange_data[ex]['monthly_volume']) for ex in exchanges])
+        total_commissions = monthly_aggregates['total_commission'].sum()
+        total_volume = monthly_aggregates['total_volume'].sum()
         avg_commission_rate = (total_commissions / total_volume) * 100 if total_volume > 0 else 0
-        total_yearly_commission = sum([sum(exchange_data[ex]['yearly_commission']) for ex in exchanges])
+        total_yearly_commission = yearly_aggregates['total_commission'].sum()
 
         with col1:
             st.metric("Total Monthly Commissions", f"${format_large_number(total_commissions)}")
@@ -916,7 +836,7 @@ def run_app():
 
         # Display crypto news headlines
         st.subheader("Latest Crypto News")
-        news_data = fetch_crypto_news()
+        news_data = dashboard_data["news"]
 
         with st.expander("View Latest News", expanded=True):
             for i, news_item in enumerate(news_data[:5]):  # Display top 5 news items
@@ -1063,11 +983,11 @@ def run_app():
 
         for i, exchange in enumerate(selected_exchanges):
             with metric_cols[i]:
-                # Calculate metrics for this exchange
-                total_monthly_comm = sum(exchange_data[exchange]['monthly_commission'])
-                total_monthly_vol = sum(exchange_data[exchange]['monthly_volume'])
-                total_yearly_comm = sum(exchange_data[exchange]['yearly_commission'])
-                total_yearly_vol = sum(exchange_data[exchange]['yearly_volume'])
+                # Metrics for this exchange
+                total_monthly_comm = monthly_aggregates.loc[exchange, 'total_commission']
+                total_monthly_vol = monthly_aggregates.loc[exchange, 'total_volume']
+                total_yearly_comm = yearly_aggregates.loc[exchange, 'total_commission']
+                total_yearly_vol = yearly_aggregates.loc[exchange, 'total_volume']
 
                 st.markdown(f"**{exchange}**")
                 if timeframe == "Monthly":
@@ -1077,10 +997,8 @@ def run_app():
                     st.metric("Yearly Commission", f"${format_large_number(total_yearly_comm)}")
                     st.metric("Yearly Volume", f"${format_large_number(total_yearly_vol)}")
 
-                # Calculate commission rate
-                comm_rate = ((total_monthly_comm / total_monthly_vol) * 100
-                             if timeframe == "Monthly"
-                             else (total_yearly_comm / total_yearly_vol) * 100)
+                # Commission rate
+                comm_rate = aggregates.loc[(timeframe, exchange), 'commission_rate']
                 st.metric("Avg Commission Rate", f"{comm_rate:.3f}%")
 
         # Commission and volume comparison charts
@@ -1182,12 +1100,8 @@ def run_app():
         # Prepare data for pie charts (sum of all months/years)
         pie_data = []
         for exchange in selected_exchanges:
-            if timeframe == "Monthly":
-                commission_sum = sum(exchange_data[exchange]['monthly_commission'])
-                volume_sum = sum(exchange_data[exchange]['monthly_volume'])
-            else:
-                commission_sum = sum(exchange_data[exchange]['yearly_commission'])
-                volume_sum = sum(exchange_data[exchange]['yearly_volume'])
+            commission_sum = aggregates.loc[(timeframe, exchange), 'total_commission']
+            volume_sum = aggregates.loc[(timeframe, exchange), 'total_volume']
 
             pie_data.append({
                 'Exchange': exchange,
@@ -1417,15 +1331,11 @@ def run_app():
         efficiency_data = []
 
         for exchange in selected_exchanges:
-            if timeframe == "Monthly":
-                total_vol = sum(exchange_data[exchange]['monthly_volume'])
-                total_comm = sum(exchange_data[exchange]['monthly_commission'])
-            else:
-                total_vol = sum(exchange_data[exchange]['yearly_volume'])
-                total_comm = sum(exchange_data[exchange]['yearly_commission'])
+            total_vol = aggregates.loc[(timeframe, exchange), 'total_volume']
+            total_comm = aggregates.loc[(timeframe, exchange), 'total_commission']
 
-            # Calculate efficiency ratio (commission per unit volume)
-            efficiency = (total_comm / total_vol) * 100 if total_vol > 0 else 0
+            # Efficiency ratio (commission per unit volume)
+            efficiency = aggregates.loc[(timeframe, exchange), 'commission_rate']
 
             efficiency_data.append({
                 'Exchange': exchange,
@@ -1488,11 +1398,11 @@ def run_app():
         # Key metrics in columns
         col1, col2, col3, col4 = st.columns(4)
 
-        # Calculate metrics for this exchange
-        total_monthly_comm = sum(exchange_data[exchange]['monthly_commission'])
-        total_monthly_vol = sum(exchange_data[exchange]['monthly_volume'])
-        total_yearly_comm = sum(exchange_data[exchange]['yearly_commission'])
-        total_yearly_vol = sum(exchange_data[exchange]['yearly_volume'])
+        # Metrics for this exchange
+        total_monthly_comm = monthly_aggregates.loc[exchange, 'total_commission']
+        total_monthly_vol = monthly_aggregates.loc[exchange, 'total_volume']
+        total_yearly_comm = yearly_aggregates.loc[exchange, 'total_commission']
+        total_yearly_vol = yearly_aggregates.loc[exchange, 'total_volume']
 
         with col1:
             st.metric(
@@ -1631,13 +1541,9 @@ def run_app():
         # Market comparison section
         st.subheader("Market Comparison")
 
-        # Calculate averages for all exchanges
-        avg_monthly_comm = sum([sum(exchange_data[ex]['monthly_commission']) for ex in exchanges]) / len(exchanges)
-        avg_monthly_vol = sum([sum(exchange_data[ex]['monthly_volume']) for ex in exchanges]) / len(exchanges)
-
-        # Calculate the current exchange's metrics relative to average
-        monthly_comm_vs_avg = ((total_monthly_comm / avg_monthly_comm) - 1) * 100
-        monthly_vol_vs_avg = ((total_monthly_vol / avg_monthly_vol) - 1) * 100
+        # The current exchange's metrics relative to the market average
+        monthly_comm_vs_avg = monthly_aggregates.loc[exchange, 'commission_vs_market']
+        monthly_vol_vs_avg = monthly_aggregates.loc[exchange, 'volume_vs_market']
 
         # Display comparison metrics
         comp_col1, comp_col2 = st.columns(2)
@@ -1652,7 +1558,7 @@ def run_app():
             # Create a comparison chart for commissions
             market_position_data = []
             for ex in exchanges:
-                ex_monthly_comm = sum(exchange_data[ex]['monthly_commission'])
+                ex_monthly_comm = monthly_aggregates.loc[ex, 'total_commission']
                 if ex == exchange:
                     highlight = "Current Exchange"
                 else:
@@ -1691,7 +1597,7 @@ def run_app():
             # Create a comparison chart for volume
             vol_position_data = []
             for ex in exchanges:
-                ex_monthly_vol = sum(exchange_data[ex]['monthly_volume'])
+                ex_monthly_vol = monthly_aggregates.loc[ex, 'total_volume']
                 if ex == exchange:
                     highlight = "Current Exchange"
                 else:
@@ -1726,6 +1632,21 @@ def run_app():
     theme_emoji = "🌙" if st.session_state.theme == 'dark' else "☀️"
     st.markdown(f"*Real-time Crypto Exchange Profits Dashboard | {theme_emoji} {st.session_state.theme.capitalize()} Mode | Data as of {current_date} | Created with Streamlit and Plotly*")
 
+    # Hidden debug panel (open the dashboard with ?debug=1): the database
+    # statements this rerun executed, slowest first
+    query_stats = stop_query_stats()
+    if st.query_params.get("debug") == "1":
+        summary = query_stats.summary()
+        with st.sidebar.expander("🐞 Query Stats", expanded=True):
+            st.markdown(f"**{summary['queries']} queries** in **{summary['total_ms']:.1f} ms**")
+            st.caption("rows_written counts rows changed by writes; reads are not counted.")
+            if summary["top"]:
+                st.dataframe(
+                    pd.DataFrame(summary["top"], columns=["statement", "count", "total_ms", "max_ms", "rows_written"]),
+                    use_container_width=True,
+                    hide_index=True
+                )
+
 # If this file is run directly, execute the app
 if __name__ == "__main__":
     run_app()
@@ -4,10 +4,51 @@ import numpy as np
 import datetime as dt
 import json
 import re
-import requests
 from io import StringIO
 import random
 import time
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+import http_client
+import database
+import exchange_metrics
+
+# Base URL for the CoinGecko API (can be pointed at a mirror or a local stub)
+API_BASE_URL = os.environ.get("COINGECKO_API_URL", "https://api.coingecko.com/api/v3")
+
+# Total time in seconds the dashboard waits for all sources before using fallbacks
+DASHBOARD_FETCH_DEADLINE = float(os.environ.get("DASHBOARD_FETCH_DEADLINE", "8"))
+
+# Where the dashboard gets its data: "live" fetches from the APIs, "database" only
+# reads what the ingestion service has stored
+DASHBOARD_DATA_SOURCE = os.environ.get("DASHBOARD_DATA_SOURCE", "live")
+
+# Optional local snapshot of the dashboard data, preferred over the database in offline mode
+DASHBOARD_SNAPSHOT_PATH = os.environ.get("DASHBOARD_SNAPSHOT_PATH", "")
+
+# Number of coins fetched when pulling the full market universe
+MARKET_UNIVERSE_SIZE = int(os.environ.get("MARKET_UNIVERSE_SIZE", "5000"))
+
+# Coins per /coins/markets page (250 is the CoinGecko maximum)
+MARKET_PAGE_SIZE = 250
+
+# Pages of the market universe requested at the same time
+MARKET_PAGE_CONCURRENCY = int(os.environ.get("MARKET_PAGE_CONCURRENCY", "3"))
+
+# Seconds a page request may wait for a rate limit token; bulk pulls are not
+# interactive, so they queue behind the budget instead of failing fast
+MARKET_PAGE_MAX_WAIT = float(os.environ.get("MARKET_PAGE_MAX_WAIT", "60"))
+
+# Days of market history shown on the dashboard charts
+CHART_HISTORY_DAYS = int(os.environ.get("CHART_HISTORY_DAYS", "90"))
+
+# Longest range requested from market_chart/range at once (up to 90 days keeps hourly points)
+CHART_BACKFILL_CHUNK_DAYS = 90
+
+# Resolution, in seconds, of the stored market history; finer upstream points are collapsed
+CHART_HISTORY_RESOLUTION = 3600
 
 def fetch_real_time_data():
     """
@@ -16,10 +57,7 @@ def fetch_real_time_data():
     """
     try:
         # List of exchanges
-        exchanges = [
-            "Binance", "Coinbase", "Bybit", "Upbit", "Kraken",
-            "Kucoin", "CoinDCX", "Bitget", "OKX"
-        ]
+        exchanges = exchange_metrics.DEFAULT_EXCHANGES
 
         # Fetch real market data to use as a base for volume
         market_data = fetch_market_data()
@@ -27,23 +65,14 @@ def fetch_real_time_data():
         # Create data structure
         exchange_data = {}
 
-        # Current year and month
-        current_date = dt.datetime.now()
-        current_year = current_date.year
-
-        for exchange in exchanges:
-            # Fetch exchange-specific data
-            exchange_info = fetch_exchange_info(exchange, market_data)
+        # Month labels for the last 12 months and year labels for the last 8 years, oldest first
+        month_dates, year_list = exchange_metrics.get_period_labels()
 
-            # Monthly data - last 12 months
-            months = 12
-            month_dates = [(current_date - dt.timedelta(days=30*i)).strftime("%Y-%m") for i in range(months)]
-            month_dates.reverse()  # Oldest first
+        # Generate the series of all exchanges in one batch
+        exchange_infos = fetch_exchange_infos(exchanges, market_data)
 
-            # Yearly data - last 8 years
-            years = 8
-            year_list = [str(current_year - i) for i in range(years)]
-            year_list.reverse()  # Oldest first
+        for exchange in exchanges:
+            exchange_info = exchange_infos[exchange]
 
             # Store data for this exchange
             exchange_data[exchange] = {
@@ -71,18 +100,80 @@ def fetch_market_data():
     """
     try:
         # CoinGecko API endpoint for top 100 cryptocurrencies
-        url = "https://api.coingecko.com/api/v3/coins/markets?vs_currency=usd&order=market_cap_desc&per_page=100&page=1"
-        response = requests.get(url, timeout=10)
-
-        if response.status_code == 200:
-            return response.json()
-        else:
-            # If rate limited or other error, return sample data
-            return create_sample_market_data()
+        url = f"{API_BASE_URL}/coins/markets?vs_currency=usd&order=market_cap_desc&per_page=100&page=1"
+        return http_client.get_json(url, endpoint="markets")
     except:
         # If any error occurs, return sample data
         return create_sample_market_data()
 
+def fetch_market_page(page, per_page=MARKET_PAGE_SIZE):
+    """
+    Fetch one page of /coins/markets ordered by market cap.
+    Pages are not kept in the memory cache, and raise on errors.
+    """
+    url = f"{API_BASE_URL}/coins/markets?vs_currency=usd&order=market_cap_desc&per_page={per_page}&page={page}"
+    return http_client.get_json(url, endpoint="markets", cache=False, max_wait=MARKET_PAGE_MAX_WAIT)
+
+def iter_market_data(total_coins=None, per_page=MARKET_PAGE_SIZE, concurrency=None):
+    """
+    Yield coin market rows for the top total_coins coins, page by page.
+    Up to `concurrency` pages are requested at once (all under the shared
+    rate limiter), and rows are yielded as soon as their page arrives, so at
+    most that many pages are held in memory. Rows therefore come out in page
+    completion order, not strictly by rank. Stops early at a short or empty
+    page; raises if a page fails.
+    """
+    if total_coins is None:
+        total_coins = MARKET_UNIVERSE_SIZE
+    if concurrency is None:
+        concurrency = MARKET_PAGE_CONCURRENCY
+
+    pages = -(-total_coins // per_page)
+    next_page = 1
+    last_page = pages
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            while pending or next_page <= last_page:
+                # Keep the window of in-flight pages full
+                while next_page <= last_page and len(pending) < concurrency:
+                    future = executor.submit(fetch_market_page, next_page, per_page)
+                    pending[future] = next_page
+                    next_page += 1
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = pending.pop(future)
+                    rows = future.result()
+                    if page > last_page:
+                        continue
+
+                    # The universe ended before total_coins
+                    if len(rows) < per_page:
+                        last_page = min(last_page, page)
+
+                    # The last page may hold more coins than were asked for
+                    if page == pages:
+                        rows = rows[:total_coins - (pages - 1) * per_page]
+
+                    for row in rows:
+                        yield row
+        finally:
+            # Don't wait on pages nobody will read
+            for future in pending:
+                future.cancel()
+
+def fetch_market_universe(total_coins=None):
+    """
+    Fetch the top total_coins coins and store them as the coin market snapshot.
+    Rows are streamed from the API into a staging table in batches, then
+    swapped in as the new snapshot in one short transaction.
+    Returns the number of rows stored, or False if any page fails, in which
+    case the previous snapshot is kept.
+    """
+    return database.store_coin_markets(iter_market_data(total_coins))
+
 def create_sample_market_data():
     """Create sample market data if API fails"""
     return [
@@ -93,71 +184,59 @@ def create_sample_market_data():
         {"id": "solana", "symbol": "sol", "name": "Solana", "current_price": 150, "market_cap": 70000000000}
     ]
 
-def fetch_exchange_info(exchange, market_data):
+def fetch_exchange_info(exchange, market_data, rng=None):
     """
     Fetch exchange-specific information including fee structures and historical data.
     Uses real fee data when available and calculates volumes based on market share.
     """
-    # Get actual fee structure for the exchange if available
-    fee_structure = get_exchange_fee_structure(exchange)
+    return fetch_exchange_infos([exchange], market_data, rng)[exchange]
+
+def fetch_exchange_infos(exchanges, market_data, rng=None):
+    """
+    Fetch exchange information for many exchanges at once.
+    The volume and commission series of all exchanges are generated in one
+    batch; rng seeds the random variation (a seed or np.random.Generator).
+    """
+    rng = exchange_metrics.get_rng(rng)
+
+    # Get actual fee structures for the exchanges if available
+    fee_structures = [get_exchange_fee_structure(exchange, rng) for exchange in exchanges]
 
     # Calculate market share and volumes based on exchange reputation
-    market_share = calculate_exchange_market_share(exchange)
+    market_share = np.array([calculate_exchange_market_share(exchange) for exchange in exchanges])
     total_market_cap = sum(coin["market_cap"] for coin in market_data[:10])
 
     # Scale factor based on market share
     scale = market_share * 10
 
-    # Monthly data
-    base_monthly_volume = total_market_cap * 0.01 * scale / 1000000  # Normalize to millions
-
-    # Generate monthly volumes with realistic patterns
-    monthly_volume = []
-    months = 12
+    # Monthly volume baseline, normalized to millions
+    base_monthly_volume = total_market_cap * 0.01 * scale / 1000000
 
-    for i in range(months):
-        # Add seasonality, trend, and randomness
-        season_factor = 1 + 0.2 * np.sin(i/6 * np.pi)
-        trend_factor = 1 + (i/24)  # Slight upward trend
-        random_factor = np.random.uniform(0.8, 1.2)
+    # Commission based on the average taker fee, scaled for better visualization
+    commission_rate = np.array([np.mean(fees["taker_fees"]) for fees in fee_structures]) * 100
 
-        volume = base_monthly_volume * season_factor * trend_factor * random_factor
-        monthly_volume.append(round(volume, 2))
+    # Older years start from a lower growth factor than the synthetic data
+    metrics = exchange_metrics.generate_volume_matrix(base_monthly_volume, commission_rate, growth_offset=0.2, rng=rng)
 
-    # Commission based on fee structure
-    commission_rate = np.mean(fee_structure["taker_fees"])  # Average commission rate
-    monthly_commission = [round(vol * commission_rate * 100, 2) for vol in monthly_volume]  # Scale for better visualization
-
-    # Yearly data with growth trend
-    yearly_volume = []
-    yearly_commission = []
-    years = 8
-
-    base_yearly_volume = base_monthly_volume * 12
-    for i in range(years):
-        # Exchanges grow over time, with newer years having higher volumes
-        growth_factor = (0.2 + i/5) ** 2  # Exponential growth for older years
-        random_factor = np.random.uniform(0.9, 1.1)
-
-        year_volume = base_yearly_volume * growth_factor * random_factor
-        yearly_volume.append(round(year_volume, 2))
-        yearly_commission.append(round(year_volume * commission_rate * 100, 2))
-
-    # Return data structure
+    # Return data structures
     return {
-        "monthly_volume": monthly_volume,
-        "monthly_commission": monthly_commission,
-        "yearly_volume": yearly_volume,
-        "yearly_commission": yearly_commission,
-        "vip_tiers": fee_structure["vip_tiers"],
-        "maker_fees": fee_structure["maker_fees"],
-        "taker_fees": fee_structure["taker_fees"]
+        exchange: {
+            "monthly_volume": metrics["monthly_volume"][i].tolist(),
+            "monthly_commission": metrics["monthly_commission"][i].tolist(),
+            "yearly_volume": metrics["yearly_volume"][i].tolist(),
+            "yearly_commission": metrics["yearly_commission"][i].tolist(),
+            "vip_tiers": fee_structures[i]["vip_tiers"],
+            "maker_fees": fee_structures[i]["maker_fees"],
+            "taker_fees": fee_structures[i]["taker_fees"]
+        }
+        for i, exchange in enumerate(exchanges)
     }
 
-def get_exchange_fee_structure(exchange):
+def get_exchange_fee_structure(exchange, rng=None):
     """
     Get the actual fee structure for a specific exchange.
     Data sourced from public exchange documentation.
+    Unknown exchanges get a generated structure drawn from rng.
     """
     # Default tiers
     default_tiers = ["Regular", "VIP 1", "VIP 2", "VIP 3", "VIP 4", "VIP 5"]
@@ -195,21 +274,12 @@ def get_exchange_fee_structure(exchange):
         }
     else:
         # Generic fee structure for other exchanges
-        base_maker = np.random.uniform(0.075, 0.15)
-        base_taker = base_maker * 1.5
-
-        maker_fees = []
-        taker_fees = []
-
-        for tier in range(len(default_tiers)):
-            reduction = tier * 0.02
-            maker_fees.append(round(max(0.01, base_maker - reduction), 3))
-            taker_fees.append(round(max(0.02, base_taker - reduction), 3))
+        maker_fees, taker_fees = exchange_metrics.generate_fee_tiers(1, len(default_tiers), rng)
 
         return {
             "vip_tiers": default_tiers,
-            "maker_fees": maker_fees,
-            "taker_fees": taker_fees
+            "maker_fees": maker_fees[0].tolist(),
+            "taker_fees": taker_fees[0].tolist()
         }
 
 def calculate_exchange_market_share(exchange):
@@ -235,6 +305,9 @@ def get_website_text_content(url):
     """
     Get text content from website using trafilatura.
     """
+    if http_client.is_offline():
+        return "Unable to fetch website content"
+
     try:
         downloaded = trafilatura.fetch_url(url)
         text = trafilatura.extract(downloaded)
@@ -242,22 +315,19 @@ def get_website_text_content(url):
     except:
         return "Unable to fetch website content"
 
-def fetch_crypto_news():
+def fetch_crypto_news(fallback=True):
     """
     Fetch the latest cryptocurrency news headlines.
+    With fallback=False, errors are raised instead of returning sample news.
     """
     try:
         # Use CoinGecko's news API
-        url = "https://api.coingecko.com/api/v3/news"
-        response = requests.get(url, timeout=10)
-
-        if response.status_code == 200:
-            news_data = response.json()
-            return news_data[:10]  # Return top 10 news items
-        else:
-            # If API fails, return sample news
-            return get_sample_news()
+        url = f"{API_BASE_URL}/news"
+        news_data = http_client.get_json(url, endpoint="news")
+        return news_data[:10]  # Return top 10 news items
     except:
+        if not fallback:
+            raise
         # If any error occurs, return sample data
         return get_sample_news()
 
@@ -297,79 +367,178 @@ def get_sample_news():
         }
     ]
 
-def fetch_current_prices():
+def fetch_current_prices(fallback=True):
     """
     Fetch current prices for top cryptocurrencies.
+    With fallback=False, errors are raised instead of returning sample prices.
     """
     try:
-        url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin,ethereum,ripple,cardano,solana,polkadot,dogecoin&vs_currencies=usd&include_24hr_change=true"
-        response = requests.get(url, timeout=10)
-
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return get_sample_prices()
+        url = f"{API_BASE_URL}/simple/price?ids=bitcoin,ethereum,ripple,cardano,solana,polkadot,dogecoin&vs_currencies=usd&include_24hr_change=true"
+        return http_client.get_json(url, endpoint="prices")
     except:
+        if not fallback:
+            raise
         return get_sample_prices()
 
-def fetch_global_charts_data():
+def fetch_global_charts_data(fallback=True):
     """
     Fetch global cryptocurrency market data from CoinGecko.
     Returns data for market cap, volume, and BTC dominance.
+    With fallback=False, errors are raised instead of returning sample data.
     """
     try:
-        url = "https://api.coingecko.com/api/v3/global"
-        response = requests.get(url, timeout=10)
-
-        if response.status_code == 200:
-            data = response.json()["data"]
-            return {
-                "total_market_cap": data["total_market_cap"]["usd"],
-                "total_volume": data["total_volume"]["usd"],
-                "market_cap_percentage": data["market_cap_percentage"],
-                "market_cap_change_percentage_24h_usd": data["market_cap_change_percentage_24h_usd"]
-            }
-        else:
-            return get_sample_global_data()
+        url = f"{API_BASE_URL}/global"
+        data = http_client.get_json(url, endpoint="global")["data"]
+        return {
+            "total_market_cap": data["total_market_cap"]["usd"],
+            "total_volume": data["total_volume"]["usd"],
+            "market_cap_percentage": data["market_cap_percentage"],
+            "market_cap_change_percentage_24h_usd": data["market_cap_change_percentage_24h_usd"]
+        }
     except Exception as e:
+        if not fallback:
+            raise
         print(f"Error fetching global data: {str(e)}")
         return get_sample_global_data()
 
-def fetch_global_chart_history():
+def fetch_global_chart_history(fallback=True, days=None):
     """
-    Fetch historical global market cap and volume data.
+    Fetch historical global market cap and volume data for the last `days` days.
+    Only the ranges not yet stored are downloaded (see backfill_chart_history);
+    the window is then read from the database.
+    With fallback=False, errors are raised instead of returning sample history.
     """
-    try:
-        # Market cap history (last 90 days)
-        market_cap_url = "https://api.coingecko.com/api/v3/coins/bitcoin/market_chart?vs_currency=usd&days=90"
-        market_cap_response = requests.get(market_cap_url, timeout=10)
+    if days is None:
+        days = CHART_HISTORY_DAYS
 
-        # Total volume history (last 90 days)
-        volume_url = "https://api.coingecko.com/api/v3/coins/bitcoin/market_chart?vs_currency=usd&days=90"
-        volume_response = requests.get(volume_url, timeout=10)
+    try:
+        now = utc_now()
+        backfill_chart_history(days, now=now)
+        history = database.get_chart_history(start=now - dt.timedelta(days=days))
+        if not history:
+            raise ValueError("No market history stored")
+        return history
+    except Exception as e:
+        if not fallback:
+            raise
+        print(f"Error fetching chart history: {str(e)}")
+        return get_sample_chart_history()
 
-        if market_cap_response.status_code == 200 and volume_response.status_code == 200:
-            market_cap_data = market_cap_response.json()["market_caps"]
-            volume_data = volume_response.json()["total_volumes"]
+def get_stored_chart_history(days=None):
+    """
+    Get the stored market history for the last `days` days without fetching.
+    """
+    if days is None:
+        days = CHART_HISTORY_DAYS
+    return database.get_chart_history(start=utc_now() - dt.timedelta(days=days))
 
-            # Convert to dataframe format
-            market_cap_df = pd.DataFrame(market_cap_data, columns=["timestamp", "value"])
-            market_cap_df["timestamp"] = pd.to_datetime(market_cap_df["timestamp"], unit="ms")
-            market_cap_df["date"] = market_cap_df["timestamp"].dt.date
+def utc_now():
+    """Current UTC time as a naive datetime, matching the stored timestamps."""
+    return dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
 
-            volume_df = pd.DataFrame(volume_data, columns=["timestamp", "value"])
-            volume_df["timestamp"] = pd.to_datetime(volume_df["timestamp"], unit="ms")
-            volume_df["date"] = volume_df["timestamp"].dt.date
+def find_history_gaps(coverage, start, end, min_gap=None):
+    """
+    Find the parts of [start, end] not inside any covered (start, end) range.
+    Gaps shorter than min_gap (default one history resolution step) are ignored,
+    so the newest few minutes are not re-fetched on every call.
+    """
+    if min_gap is None:
+        min_gap = dt.timedelta(seconds=CHART_HISTORY_RESOLUTION)
+
+    gaps = []
+    cursor = start
+    for range_start, range_end in sorted(coverage):
+        if range_end <= cursor:
+            continue
+        if range_start > cursor:
+            gaps.append((cursor, min(range_start, end)))
+        cursor = max(cursor, range_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+
+    return [(gap_start, gap_end) for gap_start, gap_end in gaps if gap_end - gap_start >= min_gap]
+
+def fetch_chart_range(start, end):
+    """
+    Fetch market cap and volume points between two UTC datetimes from
+    market_chart/range. Returns (timestamp, market_cap, volume) rows collapsed to
+    CHART_HISTORY_RESOLUTION, keeping the latest point in each step.
+    """
+    start_s = int(pd.Timestamp(start).value // 1_000_000_000)
+    end_s = int(pd.Timestamp(end).value // 1_000_000_000)
+    url = f"{API_BASE_URL}/coins/bitcoin/market_chart/range?vs_currency=usd&from={start_s}&to={end_s}"
+    chart_data = http_client.get_json(url, endpoint="chart_history", cache=False)
+
+    market_caps = pd.DataFrame(chart_data["market_caps"], columns=["timestamp", "market_cap"]).set_index("timestamp")
+    volumes = pd.DataFrame(chart_data["total_volumes"], columns=["timestamp", "volume"]).set_index("timestamp")
+    points = market_caps.join(volumes, how="outer")
+    if points.empty:
+        return []
+
+    points.index = pd.to_datetime(points.index, unit="ms").floor(f"{CHART_HISTORY_RESOLUTION}s")
+    points = points[~points.index.duplicated(keep="last")]
+    return [
+        (timestamp.to_pydatetime(),
+         None if pd.isna(market_cap) else float(market_cap),
+         None if pd.isna(volume) else float(volume))
+        for timestamp, market_cap, volume in points.itertuples()
+    ]
 
-            return {
-                "market_cap_history": market_cap_df,
-                "volume_history": volume_df
-            }
-        else:
-            return get_sample_chart_history()
-    except Exception as e:
-        print(f"Error fetching chart history: {str(e)}")
-        return get_sample_chart_history()
+def backfill_chart_history(days=None, now=None, chunk_days=None):
+    """
+    Make sure the last `days` days of market history are stored locally.
+    Ranges already covered are skipped; missing ones are fetched newest first
+    in chunks of at most chunk_days, and each chunk is committed together with
+    its coverage record. After a crash the next run resumes from the chunks
+    already stored. Returns the number of chunks fetched; raises on the first
+    failed chunk.
+    """
+    if days is None:
+        days = CHART_HISTORY_DAYS
+    if now is None:
+        now = utc_now()
+    if chunk_days is None:
+        chunk_days = CHART_BACKFILL_CHUNK_DAYS
+
+    chunk = dt.timedelta(days=chunk_days)
+    gaps = find_history_gaps(database.get_history_coverage(), now - dt.timedelta(days=days), now)
+
+    fetched = 0
+    for gap_start, gap_end in reversed(gaps):
+        chunk_end = gap_end
+        while chunk_end > gap_start:
+            chunk_start = max(gap_start, chunk_end - chunk)
+            database.store_history_range(chunk_start, chunk_end, fetch_chart_range(chunk_start, chunk_end))
+            fetched += 1
+            chunk_end = chunk_start
+
+    return fetched
+
+def chart_history_from_points(market_cap_points, volume_points):
+    """
+    Convert [timestamp_ms, value] pairs, as returned by market_chart, into history dataframes.
+    """
+    history = {}
+    for name, points in (("market_cap_history", market_cap_points), ("volume_history", volume_points)):
+        df = pd.DataFrame(points, columns=["timestamp", "value"])
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        df["date"] = df["timestamp"].dt.date
+        history[name] = df
+    return history
+
+def chart_history_to_points(chart_history):
+    """
+    Convert history dataframes back into [timestamp_ms, value] pairs.
+    """
+    return {
+        name: [
+            [int(pd.Timestamp(timestamp).value // 1_000_000), float(value)]
+            for timestamp, value in zip(df["timestamp"], df["value"])
+        ]
+        for name, df in chart_history.items()
+    }
 
 def get_sample_global_data():
     """Get sample global cryptocurrency market data."""
@@ -469,102 +638,186 @@ def get_sample_prices():
         }
     }
 
-def generate_fallback_data():
+def generate_fallback_data(rng=None):
     """
     Generate fallback data if real data fetching fails.
-    Same as the original generate_exchange_data function.
+    Same as data_generator.generate_exchange_data; rng seeds the generated values.
     """
-    # List of exchanges
-    exchanges = [
-        "Binance", "Coinbase", "Bybit", "Upbit", "Kraken",
-        "Kucoin", "CoinDCX", "Bitget", "OKX"
-    ]
+    return exchange_metrics.generate_synthetic_exchange_data(rng=rng)
+
+def get_dashboard_sources():
+    """
+    Get the sources shown on the dashboard, mapped to (fetcher, stored, sample) functions.
+    Fetchers raise on errors, stored returns the last values persisted in the
+    database and sample returns the hard-coded sample data.
+    """
+    return {
+        "global_data": (partial(fetch_global_charts_data, fallback=False), database.get_latest_global_stats, get_sample_global_data),
+        "chart_history": (partial(fetch_global_chart_history, fallback=False), get_stored_chart_history, get_sample_chart_history),
+        "prices": (partial(fetch_current_prices, fallback=False), database.get_latest_crypto_prices, get_sample_prices),
+        "news": (partial(fetch_crypto_news, fallback=False), database.get_latest_news, get_sample_news)
+    }
+
+def is_sample_data(data, sample):
+    """
+    Whether stored data is a copy of the sample data rather than the result of
+    a live fetch; older versions stored sample data when a fetch failed.
+    News is compared without its order or dates, since the sample news is
+    always dated today. Market history is never matched, as the sample
+    history is random.
+    """
+    expected = sample()
+    if isinstance(data, list) and isinstance(expected, list):
+        undated = lambda items: sorted(sorted((key, value) for key, value in item.items() if key != "published_at") for item in items)
+        return undated(data) == undated(expected)
+    if isinstance(data, dict) and not any(isinstance(value, pd.DataFrame) for value in data.values()):
+        return data == expected
+    return False
+
+def get_fallback_data(stored, sample, status="stale"):
+    """
+    Get the last known good data from the database, or sample data if nothing
+    fetched live is stored or the database cannot be read.
+    Returns the data together with its status: status (default "stale") for
+    stored data, otherwise "sample".
+    """
+    try:
+        data = stored()
+    except Exception as e:
+        print(f"Error reading stored data: {str(e)}")
+        data = None
+
+    if data and not is_sample_data(data, sample):
+        return data, status
+    return sample(), "sample"
 
-    # Generate data for each exchange
-    exchange_data = {}
-
-    # Current year and month
-    current_date = dt.datetime.now()
-    current_year = current_date.year
-
-    for exchange in exchanges:
-        # Determine exchange scale factor (some exchanges have higher volume than others)
-        if exchange in ["Binance", "Coinbase"]:
-            scale = np.random.uniform(8, 12)  # Larger exchanges
-        elif exchange in ["Bybit", "Kraken", "Upbit"]:
-            scale = np.random.uniform(4, 8)   # Medium exchanges
-        else:
-            scale = np.random.uniform(1, 4)   # Smaller exchanges
-
-        # Monthly data - last 12 months
-        months = 12
-        month_dates = [(current_date - dt.timedelta(days=30*i)).strftime("%Y-%m") for i in range(months)]
-        month_dates.reverse()  # Oldest first
-
-        # Generate monthly volume data with realistic patterns
-        base_volume = np.random.uniform(500, 2000) * scale
-        monthly_volume = []
-
-        for i in range(months):
-            # Add some seasonality and trend
-            season_factor = 1 + 0.2 * np.sin(i/6 * np.pi)
-            trend_factor = 1 + (i/24)  # Slight upward trend
-
-            # Add some randomness
-            random_factor = np.random.uniform(0.8, 1.2)
-
-            volume = base_volume * season_factor * trend_factor * random_factor
-            monthly_volume.append(round(volume, 2))
-
-        # Commission is typically a percentage of volume
-        commission_rate = np.random.uniform(0.001, 0.003)  # 0.1% to 0.3%
-        monthly_commission = [round(vol * commission_rate, 2) for vol in monthly_volume]
-
-        # Yearly data - last 8 years
-        years = 8
-        year_list = [str(current_year - i) for i in range(years)]
-        year_list.reverse()  # Oldest first
-
-        # Generate yearly data
-        yearly_volume = []
-        yearly_commission = []
-
-        for i in range(years):
-            # Exchanges grow over time
-            growth_factor = (1 + i/5) ** 2  # Exponential growth
-
-            # Add some randomness
-            random_factor = np.random.uniform(0.9, 1.1)
-
-            year_volume = base_volume * 12 * growth_factor * random_factor
-            yearly_volume.append(round(year_volume, 2))
-            yearly_commission.append(round(year_volume * commission_rate, 2))
-
-        # VIP tiers and fees
-        vip_tiers = ["Regular", "VIP 1", "VIP 2", "VIP 3", "VIP 4", "VIP 5"]
-        maker_fees = []
-        taker_fees = []
-
-        # Generate descending fee structure based on VIP level
-        base_maker = np.random.uniform(0.075, 0.15)
-        base_taker = base_maker * 1.5
-
-        for tier in range(len(vip_tiers)):
-            reduction = tier * 0.02
-            maker_fees.append(round(max(0.01, base_maker - reduction), 3))
-            taker_fees.append(round(max(0.02, base_taker - reduction), 3))
-
-        # Store data for this exchange
-        exchange_data[exchange] = {
-            "monthly_dates": month_dates,
-            "monthly_volume": monthly_volume,
-            "monthly_commission": monthly_commission,
-            "yearly_dates": year_list,
-            "yearly_volume": yearly_volume,
-            "yearly_commission": yearly_commission,
-            "vip_tiers": vip_tiers,
-            "maker_fees": maker_fees,
-            "taker_fees": taker_fees
+def fetch_dashboard_data(deadline=None, sources=None):
+    """
+    Fetch all dashboard sources concurrently and return them as one bundle.
+    Sources that fail or do not finish before the total deadline are replaced
+    with the last values stored in the database, or sample data if there are none.
+    The bundle's "status" entry records, per source, whether the data is live
+    ("ok"), "stale" or "sample"; "errors" holds the reason for each fallback.
+    """
+    if deadline is None:
+        deadline = DASHBOARD_FETCH_DEADLINE
+    if sources is None:
+        sources = get_dashboard_sources()
+
+    bundle = {"status": {}, "errors": {}}
+    executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="dashboard-fetch")
+
+    try:
+        # Issue every request at once and wait for all of them up to the deadline.
+        # Each runs in a copy of this context, so its queries count towards the caller's stats
+        futures = {
+            name: executor.submit(contextvars.copy_context().run, fetcher)
+            for name, (fetcher, _, _) in sources.items()
         }
+        done, _ = wait(futures.values(), timeout=deadline)
+
+        for name, future in futures.items():
+            if future not in done:
+                error = f"timed out after {deadline}s"
+            else:
+                try:
+                    bundle[name] = future.result()
+                    bundle["status"][name] = "ok"
+                    continue
+                except Exception as e:
+                    error = str(e)
+
+            print(f"Error fetching {name}: {error}, using fallback data")
+            _, stored, sample = sources[name]
+            bundle[name], bundle["status"][name] = get_fallback_data(stored, sample)
+            bundle["errors"][name] = error
+
+    finally:
+        # Do not block on stragglers; they finish in the background and are discarded
+        executor.shutdown(wait=False)
+
+    return bundle
+
+def get_stored_dashboard_data(sources=None):
+    """
+    Build the dashboard bundle from the database only, without touching the network.
+    Stored data is marked "ok"; sources with nothing live stored yet, or whose
+    rows cannot be read, use sample data and are marked "sample".
+    """
+    if sources is None:
+        sources = get_dashboard_sources()
+
+    bundle = {"status": {}, "errors": {}}
+
+    for name, (_, stored, sample) in sources.items():
+        bundle[name], bundle["status"][name] = get_fallback_data(stored, sample, status="ok")
 
-    return exchange_data
\ No newline at end of file
+    return bundle
+
+def write_dashboard_snapshot(bundle, path):
+    """
+    Write the dashboard data to a JSON snapshot file for offline use.
+    The file is replaced atomically so readers never see a partial snapshot.
+    """
+    snapshot = {name: bundle[name] for name in get_dashboard_sources()}
+    snapshot["chart_history"] = chart_history_to_points(bundle["chart_history"])
+    snapshot["created_at"] = dt.datetime.now().isoformat()
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+def read_dashboard_snapshot(path):
+    """
+    Read a dashboard snapshot file, or return None if it is missing, unreadable
+    or lacks any of the dashboard sources.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+
+        bundle = {"status": {}, "errors": {}}
+        for name in get_dashboard_sources():
+            bundle[name] = snapshot[name]
+            bundle["status"][name] = "ok"
+        history = snapshot["chart_history"]
+        bundle["chart_history"] = chart_history_from_points(history["market_cap_history"], history["volume_history"])
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Error reading dashboard snapshot: {type(e).__name__}: {str(e)}")
+        return None
+
+    return bundle
+
+def get_offline_dashboard_data(sources=None):
+    """
+    Build the dashboard bundle without any network access: from the snapshot
+    file if one is configured, otherwise from the database.
+    """
+    if sources is None:
+        sources = get_dashboard_sources()
+
+    if DASHBOARD_SNAPSHOT_PATH and os.path.exists(DASHBOARD_SNAPSHOT_PATH):
+        bundle = read_dashboard_snapshot(DASHBOARD_SNAPSHOT_PATH)
+        if bundle is not None:
+            return {
+                "status": {name: bundle["status"][name] for name in sources},
+                "errors": {},
+                **{name: bundle[name] for name in sources}
+            }
+    return get_stored_dashboard_data(sources)
+
+def load_dashboard_data(names=None):
+    """
+    Load the dashboard bundle, or only the named sources, from the source
+    selected by offline mode and DASHBOARD_DATA_SOURCE.
+    """
+    sources = get_dashboard_sources()
+    if names is not None:
+        sources = {name: sources[name] for name in names}
+
+    if http_client.is_offline():
+        return get_offline_dashboard_data(sources)
+    if DASHBOARD_DATA_SOURCE == "database":
+        return get_stored_dashboard_data(sources)
+    return fetch_dashboard_data(sources=sources)
@@ -1,8 +1,14 @@
 import os
+import re
+import threading
+import contextvars
+import time
 import datetime as dt
 import json
+from functools import lru_cache
 import pandas as pd
 import numpy as np
+import exchange_metrics
 from sqlalchemy import (
     create_engine,
     MetaData,
@@ -15,21 +21,239 @@ from sqlalchemy import (
     Text,
     JSON,
     ForeignKey,
+    Index,
+    inspect,
     select,
     func,
+    literal,
     insert,
     delete,
     update,
-    desc
+    desc,
+    event,
+    or_
 )
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship
+from contextlib import contextmanager
+
+# Database to connect to; defaults to a local SQLite file for development
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///crypto_exchange.db")
+
+# Connection pool settings: connections kept open, extra connections allowed
+# under load, and whether connections are tested before being handed out
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1").lower() not in ("0", "false", "no", "off")
+
+# Pragmas applied to every SQLite connection (override with SQLITE_<PRAGMA>,
+# an empty value skips one). WAL lets readers run while a write is in progress;
+# busy_timeout makes writers wait for each other instead of failing with
+# "database is locked"
+SQLITE_PRAGMAS = {
+    name: os.environ.get(f"SQLITE_{name.upper()}", default)
+    for name, default in (
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("mmap_size", str(256 * 1024 * 1024)),
+        ("cache_size", "-65536"),  # Negative values are KiB, i.e. 64 MiB
+        ("temp_store", "MEMORY"),
+        ("busy_timeout", "5000")
+    )
+}
+
+# Rows per transaction when loading exchange data
+INIT_BATCH_SIZE = int(os.environ.get("INIT_BATCH_SIZE", "5000"))
+
+# Bound parameters per lookup query, kept under the 999 variable limit of
+# SQLite builds before 3.32
+LOOKUP_BATCH_SIZE = int(os.environ.get("LOOKUP_BATCH_SIZE", "900"))
+
+# INSERT constructs with ON CONFLICT support, by dialect
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# Exchange child tables refreshed by upsert: natural key column and the
+# exchange_data keys of the value columns
+EXCHANGE_ROW_COLUMNS = {
+    "monthly_data": ("month_date", {"month_date": "monthly_dates", "volume": "monthly_volume", "commission": "monthly_commission"}),
+    "yearly_data": ("year", {"year": "yearly_dates", "volume": "yearly_volume", "commission": "yearly_commission"}),
+    "fee_structures": ("vip_tier", {"vip_tier": "vip_tiers", "maker_fee": "maker_fees", "taker_fee": "taker_fees"})
+}
+
+# Price history rollup tiers: bucket size in seconds. Raw price points are
+# downsampled into 1-minute OHLC buckets, those into 1-hour buckets and so on
+PRICE_ROLLUPS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+# Seconds of raw points and of each rollup tier to keep (override with
+# PRICE_RETENTION_<TIER>, e.g. PRICE_RETENTION_1M; 0 keeps a tier forever)
+PRICE_RETENTION = {
+    tier: int(os.environ.get(f"PRICE_RETENTION_{tier.upper()}", default))
+    for tier, default in (
+        ("raw", 2 * 86400),
+        ("1m", 14 * 86400),
+        ("1h", 365 * 86400),
+        ("1d", 10 * 365 * 86400)
+    )
+}
+
+# Price charts use the coarsest tier with at least this many buckets in range
+PRICE_CHART_MIN_POINTS = int(os.environ.get("PRICE_CHART_MIN_POINTS", "100"))
+
+# Statements taking at least this many milliseconds are written to the slow
+# query log: appended to the SLOW_QUERY_LOG file if set, printed otherwise.
+# 0 logs every statement; a negative value turns the log off
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG", "")
+
+# Statements listed in a query summary, by total time
+QUERY_SUMMARY_TOP = int(os.environ.get("QUERY_SUMMARY_TOP", "10"))
+
+# Create a database engine with the configured pool
+def create_database_engine(url=None):
+    """
+    Creates an engine for url (default DATABASE_URL) using the pool settings above.
+    In-memory SQLite databases live in a single connection, so they keep
+    SQLAlchemy's default pool.
+    """
+    url = make_url(url or DATABASE_URL)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")):
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+    new_engine = create_engine(url, **options)
+
+    if url.get_backend_name() == "sqlite":
+        event.listen(new_engine, "connect", apply_sqlite_pragmas)
+    return instrument_engine(new_engine)
+
+# Tune each new SQLite connection
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None, pragmas=None):
+    """
+    Applies the SQLITE_PRAGMAS profile (or the given pragmas) to a new SQLite connection.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in (pragmas or SQLITE_PRAGMAS).items():
+            if value != "":
+                cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+# Group statements that differ only in their values
+@lru_cache(maxsize=1024)
+def get_statement_fingerprint(statement):
+    """
+    Normalizes a SQL statement so executions that differ only in literals,
+    IN list lengths or the number of multi-row VALUES tuples share one fingerprint.
+    """
+    fingerprint = re.sub(r"'(?:[^']|'')*'", "?", statement)
+    fingerprint = re.sub(r"%\(\w+\)s|:\w+|\$\d+|\b\d+(?:\.\d+)?\b", "?", fingerprint)
+    fingerprint = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(...)", fingerprint)
+    fingerprint = re.sub(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+", "(...)", fingerprint)
+    return " ".join(fingerprint.split())
 
-# Use SQLite database for local development
-DATABASE_URL = 'sqlite:///crypto_exchange.db'
+class QueryStats:
+    """
+    Count, time and rows written of the statements executed while collecting,
+    by statement fingerprint. Reads are not counted in rows_written: drivers
+    only report how many rows a statement changed.
+    """
+
+    def __init__(self):
+        self.statements = {}
+        self._lock = threading.Lock()
+
+    def record(self, fingerprint, duration_ms, rows_written):
+        with self._lock:
+            stats = self.statements.setdefault(fingerprint, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows_written": 0})
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["rows_written"] += rows_written
+
+    def summary(self, top=None):
+        """
+        Query count, total milliseconds and the top statements by total time.
+        """
+        statements = sorted(self.statements.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        return {
+            "queries": sum(stats["count"] for stats in self.statements.values()),
+            "total_ms": sum(stats["total_ms"] for stats in self.statements.values()),
+            "top": [dict(stats, statement=fingerprint) for fingerprint, stats in statements[:top or QUERY_SUMMARY_TOP]]
+        }
+
+# Query stats being collected in the current context, e.g. for one Streamlit
+# script run. Work submitted to other threads through contextvars.copy_context()
+# is collected into the same stats
+_query_stats = contextvars.ContextVar("query_stats", default=None)
+_slow_query_lock = threading.Lock()
+
+# Start collecting query stats in the current context
+def start_query_stats():
+    """
+    Starts collecting the statements executed in the current context into a new
+    QueryStats, replacing any collection in progress, and returns it.
+    """
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+# Stop collecting query stats in the current context
+def stop_query_stats():
+    """
+    Stops collecting in the current context and returns what was collected,
+    or an empty QueryStats if nothing was being collected.
+    """
+    stats = _query_stats.get() or QueryStats()
+    _query_stats.set(None)
+    return stats
+
+# Record one executed statement
+def record_query(statement, duration_ms, rows_written):
+    """
+    Adds a statement to the current context's query stats and writes it to the
+    slow query log if it took at least SLOW_QUERY_MS.
+    """
+    fingerprint = get_statement_fingerprint(statement)
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.record(fingerprint, duration_ms, rows_written)
+
+    if 0 <= SLOW_QUERY_MS <= duration_ms:
+        line = f"{dt.datetime.now().isoformat()} Slow query: {duration_ms:.1f} ms, {rows_written} rows written: {fingerprint}"
+        if SLOW_QUERY_LOG:
+            with _slow_query_lock, open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        else:
+            print(line)
+
+# Time each statement on an engine
+def instrument_engine(target):
+    """
+    Times every statement executed on target and passes its duration and the
+    rows it wrote, as reported by the driver, to record_query. Calling it again on the
+    same engine does nothing.
+    """
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    return target
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() - conn.info["query_start_times"].pop()) * 1000
+    # Drivers report the rows a statement wrote; reads report -1 and count as 0
+    record_query(statement, duration_ms, max(cursor.rowcount, 0))
 
 # Create database engine
-engine = create_engine(DATABASE_URL)
+engine = create_database_engine()
+
+# Thread-scoped sessions: each thread (e.g. each Streamlit script run) reuses
+# its own session, which borrows connections from the engine's pool
+Session = scoped_session(sessionmaker(bind=engine))
 
 # Create base class for declarative models
 Base = declarative_base()
@@ -56,6 +280,10 @@ class Exchange(Base):
 class MonthlyData(Base):
     """Model for monthly exchange data"""
     __tablename__ = 'monthly_data'
+    __table_args__ = (
+        # Natural key; also serves lookups by exchange ordered by month
+        Index('uq_monthly_data_exchange_month', 'exchange_id', 'month_date', unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     exchange_id = Column(Integer, ForeignKey('exchanges.id', ondelete='CASCADE'), nullable=False)
@@ -74,6 +302,9 @@ class MonthlyData(Base):
 class YearlyData(Base):
     """Model for yearly exchange data"""
     __tablename__ = 'yearly_data'
+    __table_args__ = (
+        Index('uq_yearly_data_exchange_year', 'exchange_id', 'year', unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     exchange_id = Column(Integer, ForeignKey('exchanges.id', ondelete='CASCADE'), nullable=False)
@@ -92,6 +323,11 @@ class YearlyData(Base):
 class FeeStructure(Base):
     """Model for exchange fee structures"""
     __tablename__ = 'fee_structures'
+    __table_args__ = (
+        # Tiers are read per exchange in insertion order
+        Index('ix_fee_structures_exchange_id', 'exchange_id', 'id'),
+        Index('uq_fee_structures_exchange_tier', 'exchange_id', 'vip_tier', unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     exchange_id = Column(Integer, ForeignKey('exchanges.id', ondelete='CASCADE'), nullable=False)
@@ -107,9 +343,71 @@ class FeeStructure(Base):
     def __repr__(self):
         return f"<FeeStructure(exchange='{self.exchange.name}', tier='{self.vip_tier}')>"
 
+class ExchangeAggregate(Base):
+    """Model for per-exchange totals, averages, shares and ranks of one timeframe"""
+    __tablename__ = 'exchange_aggregates'
+    __table_args__ = (
+        Index('uq_exchange_aggregates_exchange_timeframe', 'exchange_id', 'timeframe', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    exchange_id = Column(Integer, ForeignKey('exchanges.id', ondelete='CASCADE'), nullable=False)
+    timeframe = Column(String(10), nullable=False)  # Monthly or Yearly
+    periods = Column(Integer, nullable=False)
+    total_volume = Column(Float, nullable=False)
+    total_commission = Column(Float, nullable=False)
+    average_volume = Column(Float, nullable=False)
+    average_commission = Column(Float, nullable=False)
+    commission_rate = Column(Float, nullable=False)
+    volume_share = Column(Float, nullable=False)
+    commission_share = Column(Float, nullable=False)
+    volume_rank = Column(Integer, nullable=False)
+    commission_rank = Column(Integer, nullable=False)
+    volume_vs_market = Column(Float, nullable=False)
+    commission_vs_market = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=dt.datetime.now, onupdate=dt.datetime.now)
+
+    def __repr__(self):
+        return f"<ExchangeAggregate(exchange_id='{self.exchange_id}', timeframe='{self.timeframe}')>"
+
+class DailyData(Base):
+    """Model for daily exchange data"""
+    __tablename__ = 'daily_data'
+    __table_args__ = (
+        Index('uq_daily_data_exchange_date', 'exchange_id', 'date', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    exchange_id = Column(Integer, ForeignKey('exchanges.id', ondelete='CASCADE'), nullable=False)
+    date = Column(String(10), nullable=False)  # Format: YYYY-MM-DD
+    volume = Column(Float, nullable=False)
+    commission = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return f"<DailyData(exchange_id='{self.exchange_id}', date='{self.date}')>"
+
+class TradeTick(Base):
+    """Model for individual trades of an exchange"""
+    __tablename__ = 'trade_ticks'
+    __table_args__ = (
+        Index('ix_trade_ticks_exchange_timestamp', 'exchange_id', 'timestamp'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    exchange_id = Column(Integer, ForeignKey('exchanges.id', ondelete='CASCADE'), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    price = Column(Float, nullable=False)
+    amount = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return f"<TradeTick(exchange_id='{self.exchange_id}', timestamp='{self.timestamp}')>"
+
 class CryptoPrice(Base):
     """Model for storing cryptocurrency prices"""
     __tablename__ = 'crypto_prices'
+    __table_args__ = (
+        Index('ix_crypto_prices_crypto_timestamp', 'crypto_id', 'timestamp'),
+    )
 
     id = Column(Integer, primary_key=True)
     crypto_id = Column(String(50), nullable=False)
@@ -122,6 +420,43 @@ class CryptoPrice(Base):
     def __repr__(self):
         return f"<CryptoPrice(symbol='{self.symbol}', price='{self.price_usd}')>"
 
+class PriceHistory(Base):
+    """Model for the append-only history of cryptocurrency prices"""
+    __tablename__ = 'price_history'
+    __table_args__ = (
+        Index('ix_price_history_crypto_timestamp', 'crypto_id', 'timestamp'),
+        Index('ix_price_history_timestamp', 'timestamp'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    crypto_id = Column(String(50), nullable=False)
+    timestamp = Column(Integer, nullable=False)  # Unix epoch seconds
+    price_usd = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return f"<PriceHistory(crypto_id='{self.crypto_id}', timestamp='{self.timestamp}')>"
+
+class PriceRollup(Base):
+    """Model for OHLC buckets of the price history at one rollup resolution"""
+    __tablename__ = 'price_rollups'
+    __table_args__ = (
+        Index('uq_price_rollups_crypto_resolution_bucket', 'crypto_id', 'resolution', 'bucket', unique=True),
+        Index('ix_price_rollups_resolution_bucket', 'resolution', 'bucket'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    crypto_id = Column(String(50), nullable=False)
+    resolution = Column(Integer, nullable=False)  # Bucket size in seconds
+    bucket = Column(Integer, nullable=False)  # Unix epoch seconds of the bucket start
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<PriceRollup(crypto_id='{self.crypto_id}', resolution='{self.resolution}', bucket='{self.bucket}')>"
+
 class NewsItem(Base):
     """Model for storing crypto news"""
     __tablename__ = 'news_items'
@@ -136,105 +471,469 @@ class NewsItem(Base):
     def __repr__(self):
         return f"<NewsItem(title='{self.title[:30]}...')>"
 
-# Create all tables in the database
+class GlobalMarketStats(Base):
+    """Model for storing global cryptocurrency market statistics"""
+    __tablename__ = 'global_market_stats'
+
+    id = Column(Integer, primary_key=True)
+    total_market_cap = Column(Float, nullable=False)
+    total_volume = Column(Float, nullable=False)
+    market_cap_percentage = Column(JSON, nullable=False)
+    market_cap_change_24h = Column(Float, nullable=True)
+    timestamp = Column(DateTime, default=dt.datetime.now, nullable=False)
+
+    def __repr__(self):
+        return f"<GlobalMarketStats(total_market_cap='{self.total_market_cap}')>"
+
+class MarketHistory(Base):
+    """Model for storing historical market cap and volume data"""
+    __tablename__ = 'market_history'
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, nullable=False, index=True)
+    market_cap = Column(Float, nullable=True)
+    volume = Column(Float, nullable=True)
+
+    def __repr__(self):
+        return f"<MarketHistory(timestamp='{self.timestamp}')>"
+
+class MarketHistoryCoverage(Base):
+    """Model for storing the time ranges of market history already fetched"""
+    __tablename__ = 'market_history_coverage'
+
+    id = Column(Integer, primary_key=True)
+    range_start = Column(DateTime, nullable=False)
+    range_end = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<MarketHistoryCoverage(range_start='{self.range_start}', range_end='{self.range_end}')>"
+
+class CoinMarket(Base):
+    """Model for storing a snapshot of the coin market universe"""
+    __tablename__ = 'coin_markets'
+
+    id = Column(Integer, primary_key=True)
+    coin_id = Column(String(100), nullable=False)
+    symbol = Column(String(50), nullable=False)
+    name = Column(String(255), nullable=False)
+    market_cap_rank = Column(Integer, nullable=True)
+    current_price = Column(Float, nullable=True)
+    market_cap = Column(Float, nullable=True)
+    total_volume = Column(Float, nullable=True)
+    price_change_percentage_24h = Column(Float, nullable=True)
+    circulating_supply = Column(Float, nullable=True)
+    last_updated = Column(String(50), nullable=True)
+    timestamp = Column(DateTime, default=dt.datetime.now, nullable=False)
+
+    def __repr__(self):
+        return f"<CoinMarket(symbol='{self.symbol}', rank='{self.market_cap_rank}')>"
+
+class CoinMarketStaging(Base):
+    """Model for staging coin market rows until a fetched snapshot is complete"""
+    __tablename__ = 'coin_markets_staging'
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String(50), nullable=False, index=True)
+    coin_id = Column(String(100), nullable=False)
+    symbol = Column(String(50), nullable=False)
+    name = Column(String(255), nullable=False)
+    market_cap_rank = Column(Integer, nullable=True)
+    current_price = Column(Float, nullable=True)
+    market_cap = Column(Float, nullable=True)
+    total_volume = Column(Float, nullable=True)
+    price_change_percentage_24h = Column(Float, nullable=True)
+    circulating_supply = Column(Float, nullable=True)
+    last_updated = Column(String(50), nullable=True)
+    timestamp = Column(DateTime, default=dt.datetime.now, nullable=False)
+
+    def __repr__(self):
+        return f"<CoinMarketStaging(run='{self.run_id}', symbol='{self.symbol}')>"
+
+class SchemaVersion(Base):
+    """Model for recording the schema migrations applied to the database"""
+    __tablename__ = 'schema_version'
+
+    version = Column(Integer, primary_key=True)
+    description = Column(String(255), nullable=False)
+    applied_at = Column(DateTime, default=dt.datetime.now, nullable=False)
+
+    def __repr__(self):
+        return f"<SchemaVersion(version='{self.version}')>"
+
+# Schema changes for databases created by earlier versions, as
+# (version, description, SQL statements). Append new migrations with the next
+# version number; never edit one that has been released. Duplicate rows are
+# removed (keeping the newest) before a unique index is created on them, and
+# migrate_database prints how many were removed from each table.
+MIGRATIONS = [
+    (1, "Composite indexes and unique natural keys", [
+        "DELETE FROM monthly_data WHERE id NOT IN (SELECT MAX(id) FROM monthly_data GROUP BY exchange_id, month_date)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_monthly_data_exchange_month ON monthly_data (exchange_id, month_date)",
+        "DELETE FROM yearly_data WHERE id NOT IN (SELECT MAX(id) FROM yearly_data GROUP BY exchange_id, year)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_yearly_data_exchange_year ON yearly_data (exchange_id, year)",
+        "CREATE INDEX IF NOT EXISTS ix_fee_structures_exchange_id ON fee_structures (exchange_id, id)",
+        "DELETE FROM fee_structures WHERE id NOT IN (SELECT MAX(id) FROM fee_structures GROUP BY exchange_id, vip_tier)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_fee_structures_exchange_tier ON fee_structures (exchange_id, vip_tier)",
+        "DELETE FROM daily_data WHERE id NOT IN (SELECT MAX(id) FROM daily_data GROUP BY exchange_id, date)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_daily_data_exchange_date ON daily_data (exchange_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_trade_ticks_exchange_timestamp ON trade_ticks (exchange_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_crypto_prices_crypto_timestamp ON crypto_prices (crypto_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_market_history_timestamp ON market_history (timestamp)"
+    ])
+]
+
+# Create all tables in the database and upgrade existing ones in place
 def create_tables():
+    """
+    Creates missing tables, then applies any pending MIGRATIONS. A new database
+    already has the latest schema, so its migrations are only recorded.
+    """
+    migrate_database()
+
+# Apply pending schema migrations
+def migrate_database(target=None, stamp=False):
+    """
+    Applies the MIGRATIONS newer than the database's schema version, up to
+    target (default: the latest), each in its own transaction. Missing tables
+    are created from the models first, so a new database file can be migrated
+    directly; it already has the latest schema, so its migrations are only
+    recorded, as they are with stamp=True. Migrations that delete duplicate
+    rows print how many they removed from each table. Returns the versions applied.
+    """
+    versions = SchemaVersion.__table__
+    stamp = stamp or not inspect(engine).get_table_names()
     Base.metadata.create_all(engine)
+    current = get_schema_version()
+    applied = []
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current or (target is not None and version > target):
+            continue
+        removed = {}
+        with engine.begin() as conn:
+            if not stamp:
+                for statement in statements:
+                    result = conn.exec_driver_sql(statement)
+                    if statement.startswith("DELETE FROM") and result.rowcount > 0:
+                        removed[statement.split()[2]] = result.rowcount
+            conn.execute(insert(versions).values(version=version, description=description))
+        if not stamp:
+            print(f"Applied migration {version}: {description}")
+            for table, count in removed.items():
+                print(f"Migration {version} removed {count} duplicate rows from {table}")
+        applied.append(version)
+
+    return applied
+
+# Get the schema version of the database
+def get_schema_version():
+    """
+    Returns the latest migration applied to the database, or 0 if none.
+    """
+    versions = SchemaVersion.__table__
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(versions.c.version))).scalar() or 0
+    except Exception:
+        return 0
+
+# Point the module at another engine
+def set_engine(new_engine):
+    """
+    Makes new_engine the engine used by every database function, with query
+    instrumentation, and rebinds the session registry to it. Returns the previous engine.
+    """
+    global engine
+    instrument_engine(new_engine)
+    previous = engine
+    Session.remove()
+    Session.configure(bind=new_engine)
+    engine = new_engine
+    return previous
 
 # Get a database session
 def get_session():
-    Session = sessionmaker(bind=engine)
+    """
+    Returns the current thread's session. Closing it returns its connection
+    to the pool; the session itself is reused by the next call on this thread.
+    """
     return Session()
 
+# Run a block of work in one transaction
+@contextmanager
+def session_scope():
+    """
+    Context manager around the current thread's session: commits when the
+    block succeeds, rolls back and re-raises when it fails, and always closes
+    the session.
+    """
+    session = Session()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
 # Initialize database with exchange data
-def init_db_with_exchange_data(exchange_data):
+def init_db_with_exchange_data(exchange_data, batch_size=None):
     """
-    Initializes the database with exchange data.
+    Initializes the database with exchange data, or refreshes it with
+    refresh_exchange_data if exchanges are already stored.
+    Monthly, yearly and fee rows are loaded with Core executemany inserts,
+    batch_size rows (default INIT_BATCH_SIZE) per transaction. If loading
+    fails part way, the partially loaded exchange data is removed again.
+    Returns the number of rows inserted.
     """
-    session = get_session()
+    if batch_size is None:
+        batch_size = INIT_BATCH_SIZE
+
+    exchanges = Exchange.__table__
+    start = time.perf_counter()
+    count = 0
 
     try:
         # First, check if we already have data
-        existing_exchanges = session.query(Exchange).all()
-        if existing_exchanges:
-            print("Database already contains exchange data. Skipping initialization.")
-            return
-
-        # Add exchanges and their data
-        for exchange_name, data in exchange_data.items():
-            # Determine scale factor based on exchange size
-            if exchange_name in ["Binance", "Coinbase"]:
-                scale_factor = np.random.uniform(8, 12)  # Larger exchanges
-            elif exchange_name in ["Bybit", "Kraken", "Upbit"]:
-                scale_factor = np.random.uniform(4, 8)   # Medium exchanges
-            else:
-                scale_factor = np.random.uniform(1, 4)   # Smaller exchanges
-
-            # Create exchange
-            exchange = Exchange(name=exchange_name, scale_factor=scale_factor)
-            session.add(exchange)
-            session.flush()  # Get the exchange ID
-
-            # Add monthly data
-            for i, date in enumerate(data['monthly_dates']):
-                # Convert numpy types to native Python types
-                volume = float(data['monthly_volume'][i]) if hasattr(data['monthly_volume'][i], 'item') else data['monthly_volume'][i]
-                commission = float(data['monthly_commission'][i]) if hasattr(data['monthly_commission'][i], 'item') else data['monthly_commission'][i]
-
-                monthly = MonthlyData(
-                    exchange_id=exchange.id,
-                    month_date=date,
-                    volume=volume,
-                    commission=commission
-                )
-                session.add(monthly)
+        with engine.connect() as conn:
+            if conn.execute(select(exchanges.c.id).limit(1)).first() is not None:
+                print("Database already contains exchange data. Refreshing changed rows.")
+                return refresh_exchange_data(exchange_data, batch_size)
+
+        # Add exchanges, with a scale factor based on exchange size
+        names = list(exchange_data)
+        low, high = exchange_metrics.get_scale_ranges(names)
+        scale_factors = np.random.uniform(low, high)
+        with engine.begin() as conn:
+            conn.execute(insert(exchanges), [
+                {"name": name, "scale_factor": float(scale)} for name, scale in zip(names, scale_factors)
+            ])
+            exchange_ids = dict(conn.execute(select(exchanges.c.name, exchanges.c.id)).all())
+        count += len(names)
+
+        # Add monthly data, yearly data and fee structures in batches
+        for name, (key, columns) in EXCHANGE_ROW_COLUMNS.items():
+            table = Base.metadata.tables[name]
+            batch = []
+            for row in _iter_exchange_rows(exchange_data, exchange_ids, columns):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    count += _insert_batch(table, batch)
+                    batch = []
+            if batch:
+                count += _insert_batch(table, batch)
+
+        refresh_exchange_aggregates()
+
+        elapsed = time.perf_counter() - start
+        print(f"Successfully initialized database with exchange data: {count} rows in {elapsed:.2f}s ({count / max(elapsed, 1e-9):,.0f} rows/s).")
 
-            # Add yearly data
-            for i, year in enumerate(data['yearly_dates']):
-                # Convert numpy types to native Python types
-                volume = float(data['yearly_volume'][i]) if hasattr(data['yearly_volume'][i], 'item') else data['yearly_volume'][i]
-                commission = float(data['yearly_commission'][i]) if hasattr(data['yearly_commission'][i], 'item') else data['yearly_commission'][i]
-
-                yearly = YearlyData(
-                    exchange_id=exchange.id,
-                    year=year,
-                    volume=volume,
-                    commission=commission
-                )
-                session.add(yearly)
+    except Exception as e:
+        print(f"Error initializing database: {str(e)}")
+        clear_exchange_data()
+        count = 0
 
-            # Add fee structure
-            for i, tier in enumerate(data['vip_tiers']):
-                # Convert numpy types to native Python types
-                maker_fee = float(data['maker_fees'][i]) if hasattr(data['maker_fees'][i], 'item') else data['maker_fees'][i]
-                taker_fee = float(data['taker_fees'][i]) if hasattr(data['taker_fees'][i], 'item') else data['taker_fees'][i]
-
-                fee = FeeStructure(
-                    exchange_id=exchange.id,
-                    vip_tier=tier,
-                    maker_fee=maker_fee,
-                    taker_fee=taker_fee
-                )
-                session.add(fee)
+    return count
 
-        session.commit()
-        print("Successfully initialized database with exchange data.")
+# Upsert exchange data, writing only the rows that changed
+def refresh_exchange_data(exchange_data, batch_size=None):
+    """
+    Incrementally refreshes exchange data. New exchanges are added, and monthly,
+    yearly and fee rows are upserted on their natural keys (INSERT ... ON CONFLICT
+    DO UPDATE) in one transaction. Rows are compared with the stored ones first,
+    so only new and changed rows are written. Rows not in exchange_data are kept,
+    so exchange_data can hold just the latest periods. The exchange aggregates
+    are recomputed if anything changed. Stored rows are looked up in batches of
+    exchanges, with at most LOOKUP_BATCH_SIZE bound parameters per query.
+    Returns the number of rows inserted or updated.
+    """
+    if batch_size is None:
+        batch_size = INIT_BATCH_SIZE
+
+    upsert_insert = UPSERT_INSERTS.get(engine.dialect.name)
+    if upsert_insert is None:
+        print(f"Error refreshing exchange data: upserts are not supported on {engine.dialect.name}")
+        return 0
+
+    exchanges = Exchange.__table__
+    start = time.perf_counter()
+    count = 0
+
+    try:
+        with engine.begin() as conn:
+            # Add exchanges that are not stored yet
+            names = list(exchange_data)
+            exchange_ids = {}
+            for batch in _chunks(names, LOOKUP_BATCH_SIZE):
+                exchange_ids.update(conn.execute(select(exchanges.c.name, exchanges.c.id).where(exchanges.c.name.in_(batch))).all())
+            new_names = [name for name in names if name not in exchange_ids]
+            if new_names:
+                low, high = exchange_metrics.get_scale_ranges(new_names)
+                conn.execute(insert(exchanges), [
+                    {"name": name, "scale_factor": float(scale)} for name, scale in zip(new_names, np.random.uniform(low, high))
+                ])
+                for batch in _chunks(new_names, LOOKUP_BATCH_SIZE):
+                    exchange_ids.update(conn.execute(select(exchanges.c.name, exchanges.c.id).where(exchanges.c.name.in_(batch))).all())
+                count += len(new_names)
+
+            for name, (key, columns) in EXCHANGE_ROW_COLUMNS.items():
+                table = Base.metadata.tables[name]
+                values = [column for column in columns if column != key]
+                statement = upsert_insert(table)
+                statement = statement.on_conflict_do_update(
+                    index_elements=["exchange_id", key],
+                    set_=dict({column: statement.excluded[column] for column in values}, updated_at=dt.datetime.now()),
+                    where=or_(*(table.c[column] != statement.excluded[column] for column in values))
+                ).returning(table.c.id)
+
+                # Compare with the stored rows so only new and changed ones are sent,
+                # looking them up one batch of exchanges at a time
+                rows = list(_iter_exchange_rows(exchange_data, exchange_ids, columns))
+                keys_by_exchange = {}
+                for row in rows:
+                    keys_by_exchange.setdefault(row["exchange_id"], {})[row[key]] = None
+                stored = {}
+                for ids, keys in _lookup_batches(keys_by_exchange):
+                    stored.update(
+                        ((row[0], row[1]), tuple(row[2:]))
+                        for row in conn.execute(
+                            select(table.c.exchange_id, table.c[key], *(table.c[column] for column in values)).where(
+                                table.c.exchange_id.in_(ids), table.c[key].in_(keys)
+                            )
+                        )
+                    )
+                rows = [
+                    row for row in rows
+                    if stored.get((row["exchange_id"], row[key])) != tuple(row[column] for column in values)
+                ]
+                for offset in range(0, len(rows), batch_size):
+                    count += len(conn.execute(statement, rows[offset:offset + batch_size]).all())
+
+            if count:
+                refresh_exchange_aggregates(conn)
+
+        elapsed = time.perf_counter() - start
+        print(f"Successfully refreshed exchange data: {count} rows changed in {elapsed:.2f}s.")
 
     except Exception as e:
-        session.rollback()
-        print(f"Error initializing database: {str(e)}")
+        print(f"Error refreshing exchange data: {str(e)}")
+        count = 0
+
+    return count
+
+def _iter_exchange_rows(exchange_data, exchange_ids, columns):
+    # Yield one row per period of each exchange; columns maps table columns to exchange_data keys
+    for name, data in exchange_data.items():
+        exchange_id = exchange_ids[name]
+        for values in zip(*(data[key] for key in columns.values())):
+            row = {"exchange_id": exchange_id}
+            for column, value in zip(columns, values):
+                # Convert numpy types to native Python types
+                row[column] = value.item() if hasattr(value, "item") else value
+            yield row
+
+def _chunks(values, size):
+    # Split values into lists of at most size items
+    values = list(values)
+    for offset in range(0, len(values), size):
+        yield values[offset:offset + size]
+
+def _lookup_batches(keys_by_exchange):
+    # Yield (exchange ids, keys) pairs covering every exchange's keys, with at
+    # most LOOKUP_BATCH_SIZE values in each pair
+    for ids in _chunks(keys_by_exchange, max(LOOKUP_BATCH_SIZE // 2, 1)):
+        keys = dict.fromkeys(key for exchange_id in ids for key in keys_by_exchange[exchange_id])
+        yield from ((ids, batch) for batch in _chunks(keys, max(LOOKUP_BATCH_SIZE - len(ids), 1)))
+
+def _insert_batch(table, rows):
+    # Insert one batch of rows in its own transaction
+    with engine.begin() as conn:
+        conn.execute(insert(table), rows)
+    return len(rows)
+
+# Recompute the materialized per-exchange aggregates
+def refresh_exchange_aggregates(conn=None):
+    """
+    Recomputes the exchange_aggregates table from the monthly and yearly data:
+    one query per timeframe sums each exchange's periods, and
+    exchange_metrics.compute_exchange_aggregates derives averages, shares and
+    ranks. Called whenever exchange data is written; pass conn to run inside
+    the caller's transaction. Returns the number of aggregate rows.
+    """
+    if conn is None:
+        try:
+            with engine.begin() as conn:
+                return refresh_exchange_aggregates(conn)
+        except Exception as e:
+            print(f"Error refreshing exchange aggregates: {str(e)}")
+            return 0
+
+    exchanges = Exchange.__table__
+    aggregates = ExchangeAggregate.__table__
+    frames = []
+    for timeframe, model in (("Monthly", MonthlyData), ("Yearly", YearlyData)):
+        table = model.__table__
+        query = select(
+            exchanges.c.id, literal(timeframe), func.count(table.c.id),
+            func.coalesce(func.sum(table.c.volume), 0.0), func.coalesce(func.sum(table.c.commission), 0.0)
+        ).select_from(exchanges.outerjoin(table, table.c.exchange_id == exchanges.c.id)).group_by(exchanges.c.id)
+        frames.append(pd.DataFrame(conn.execute(query).all(), columns=exchange_metrics.AGGREGATE_COLUMNS[:5]))
+
+    totals = pd.concat(frames, ignore_index=True)
+    rows = exchange_metrics.compute_exchange_aggregates(totals).rename(columns={"exchange": "exchange_id"})
+
+    conn.execute(delete(aggregates))
+    if not rows.empty:
+        keys = list(rows.columns)
+        values = [rows[key].tolist() for key in keys]
+        conn.execute(insert(aggregates), [dict(zip(keys, row)) for row in zip(*values)])
+    return len(rows)
+
+# Get the materialized per-exchange aggregates
+def get_exchange_aggregates():
+    """
+    Retrieves the per-exchange aggregates of every timeframe in one query, as a
+    DataFrame with exchange_metrics.AGGREGATE_COLUMNS (exchange holds the name),
+    ordered by timeframe and then like get_all_exchange_data.
+    """
+    exchanges = Exchange.__table__
+    aggregates = ExchangeAggregate.__table__
+    columns = exchange_metrics.AGGREGATE_COLUMNS
 
-    finally:
-        session.close()
+    try:
+        query = select(exchanges.c.name, *(aggregates.c[column] for column in columns[1:])).join_from(
+            aggregates, exchanges, aggregates.c.exchange_id == exchanges.c.id
+        ).order_by(aggregates.c.timeframe, exchanges.c.id)
+        with engine.connect() as conn:
+            return pd.DataFrame(conn.execute(query).all(), columns=columns)
+    except Exception as e:
+        print(f"Error retrieving exchange aggregates: {str(e)}")
+        return pd.DataFrame(columns=columns)
+
+# Remove all exchange data from the database
+def clear_exchange_data():
+    """
+    Deletes all exchanges with their monthly, yearly, daily, tick, fee and aggregate data.
+    """
+    try:
+        with engine.begin() as conn:
+            for model in (ExchangeAggregate, TradeTick, DailyData, FeeStructure, YearlyData, MonthlyData, Exchange):
+                conn.execute(delete(model.__table__))
+    except Exception as e:
+        print(f"Error clearing exchange data: {str(e)}")
 
 # Store cryptocurrency prices in the database
 def store_crypto_prices(crypto_prices):
     """
-    Stores current cryptocurrency prices in the database.
+    Stores current cryptocurrency prices in the database and appends them to the price history.
+    Returns True on success, False if nothing was stored.
     """
     session = get_session()
+    now = int(time.time())
 
     try:
-        # Clear old price data
+        # Replace the latest prices; the history is only appended to
         session.query(CryptoPrice).delete()
 
         # Define the list of cryptocurrencies we track
@@ -263,21 +962,157 @@ def store_crypto_prices(crypto_prices):
                     change_24h=change_24h
                 )
                 session.add(price)
+                session.add(PriceHistory(crypto_id=crypto["id"], timestamp=now, price_usd=price_usd))
 
         session.commit()
         print("Successfully stored cryptocurrency prices.")
+        return True
 
     except Exception as e:
         session.rollback()
         print(f"Error storing crypto prices: {str(e)}")
+        return False
 
     finally:
         session.close()
 
+# Roll the price history up into OHLC buckets
+def rollup_price_history(now=None):
+    """
+    Downsamples the price history into the PRICE_ROLLUPS tiers, each built from
+    the next finer one (raw points into 1-minute buckets, those into 1-hour
+    buckets and so on), then drops data older than PRICE_RETENTION. Only buckets
+    from the latest one already stored onward are recomputed, so each run costs
+    time proportional to the new points. Returns the buckets written per tier.
+    """
+    now = int(time.time() if now is None else now)
+    raw = PriceHistory.__table__
+    rollups = PriceRollup.__table__
+    columns = ["crypto_id", "timestamp", "open", "high", "low", "close", "samples"]
+    written = {}
+
+    try:
+        with engine.begin() as conn:
+            source = None
+            for tier, resolution in PRICE_ROLLUPS.items():
+                # The latest bucket may have been partial when it was written
+                since = conn.execute(
+                    select(func.max(rollups.c.bucket)).where(rollups.c.resolution == resolution)
+                ).scalar() or 0
+
+                if source is None:
+                    price = raw.c.price_usd
+                    query = select(
+                        raw.c.crypto_id, raw.c.timestamp, price.label("open"), price.label("high"),
+                        price.label("low"), price.label("close"), literal(1).label("samples")
+                    )
+                    query = query.where(raw.c.timestamp >= since).order_by(raw.c.timestamp)
+                else:
+                    query = select(
+                        rollups.c.crypto_id, rollups.c.bucket, rollups.c.open, rollups.c.high,
+                        rollups.c.low, rollups.c.close, rollups.c.samples
+                    ).where(rollups.c.resolution == source, rollups.c.bucket >= since).order_by(rollups.c.bucket)
+                points = pd.DataFrame(conn.execute(query).all(), columns=columns)
+                source = resolution
+
+                if points.empty:
+                    written[tier] = 0
+                    continue
+
+                points["bucket"] = points["timestamp"] - points["timestamp"] % resolution
+                buckets = points.groupby(["crypto_id", "bucket"], sort=False).agg(
+                    open=("open", "first"),
+                    high=("high", "max"),
+                    low=("low", "min"),
+                    close=("close", "last"),
+                    samples=("samples", "sum")
+                ).reset_index()
+
+                conn.execute(delete(rollups).where(rollups.c.resolution == resolution, rollups.c.bucket >= since))
+                keys = list(buckets.columns)
+                values = [buckets[key].tolist() for key in keys]
+                conn.execute(insert(rollups), [dict(zip(keys, row), resolution=resolution) for row in zip(*values)])
+                written[tier] = len(buckets)
+
+            # Apply the retention of each tier
+            if PRICE_RETENTION["raw"]:
+                conn.execute(delete(raw).where(raw.c.timestamp < now - PRICE_RETENTION["raw"]))
+            for tier, resolution in PRICE_ROLLUPS.items():
+                if PRICE_RETENTION[tier]:
+                    conn.execute(delete(rollups).where(
+                        rollups.c.resolution == resolution, rollups.c.bucket < now - PRICE_RETENTION[tier]
+                    ))
+
+    except Exception as e:
+        print(f"Error rolling up price history: {str(e)}")
+        return {}
+
+    return written
+
+# Pick the price history tier for a chart range
+def choose_price_tier(start, end, now=None):
+    """
+    Returns the coarsest tier ("raw" or a PRICE_ROLLUPS key) with at least
+    PRICE_CHART_MIN_POINTS buckets between start and end (epoch seconds) that
+    still keeps data back to start.
+    """
+    now = int(time.time() if now is None else now)
+    kept = lambda tier: not PRICE_RETENTION[tier] or now - PRICE_RETENTION[tier] <= start
+
+    for tier, resolution in reversed(list(PRICE_ROLLUPS.items())):
+        if (end - start) / resolution >= PRICE_CHART_MIN_POINTS and kept(tier):
+            return tier
+
+    # Ranges too short for any rollup use the finest tier that still has them
+    for tier in ["raw"] + list(PRICE_ROLLUPS):
+        if kept(tier):
+            return tier
+    return list(PRICE_ROLLUPS)[-1]
+
+# Get price history for a chart
+def get_price_history(crypto_id, start, end=None, now=None):
+    """
+    Retrieves OHLC price history of one cryptocurrency between start and end
+    (epoch seconds, end defaults to now) from the tier picked by choose_price_tier.
+    Returns a DataFrame with timestamp, open, high, low and close columns; the
+    tier is in df.attrs["tier"].
+    """
+    now = int(time.time() if now is None else now)
+    end = now if end is None else end
+    tier = choose_price_tier(start, end, now)
+    columns = ["timestamp", "open", "high", "low", "close"]
+
+    if tier == "raw":
+        raw = PriceHistory.__table__
+        price = raw.c.price_usd
+        query = select(raw.c.timestamp, price.label("open"), price.label("high"), price.label("low"), price.label("close")).where(
+            raw.c.crypto_id == crypto_id, raw.c.timestamp >= start, raw.c.timestamp <= end
+        ).order_by(raw.c.timestamp)
+    else:
+        rollups = PriceRollup.__table__
+        query = select(rollups.c.bucket, rollups.c.open, rollups.c.high, rollups.c.low, rollups.c.close).where(
+            rollups.c.crypto_id == crypto_id,
+            rollups.c.resolution == PRICE_ROLLUPS[tier],
+            rollups.c.bucket >= start - start % PRICE_ROLLUPS[tier],
+            rollups.c.bucket <= end
+        ).order_by(rollups.c.bucket)
+
+    try:
+        with engine.connect() as conn:
+            history = pd.DataFrame(conn.execute(query).all(), columns=columns)
+    except Exception as e:
+        print(f"Error retrieving price history: {str(e)}")
+        history = pd.DataFrame(columns=columns)
+
+    history["timestamp"] = pd.to_datetime(history["timestamp"], unit="s")
+    history.attrs["tier"] = tier
+    return history
+
 # Store news items in the database
 def store_news_items(news_data):
     """
     Stores cryptocurrency news items in the database.
+    Returns True on success, False if nothing was stored.
     """
     session = get_session()
 
@@ -297,60 +1132,263 @@ def store_news_items(news_data):
 
         session.commit()
         print("Successfully stored news items.")
+        return True
 
     except Exception as e:
         session.rollback()
         print(f"Error storing news items: {str(e)}")
+        return False
+
+    finally:
+        session.close()
+
+# Store global market statistics in the database
+def store_global_stats(global_data):
+    """
+    Stores a snapshot of global market statistics in the database.
+    Returns True on success, False if nothing was stored.
+    """
+    session = get_session()
+
+    try:
+        stats = GlobalMarketStats(
+            total_market_cap=float(global_data["total_market_cap"]),
+            total_volume=float(global_data["total_volume"]),
+            market_cap_percentage={k: float(v) for k, v in global_data["market_cap_percentage"].items()},
+            market_cap_change_24h=float(global_data.get("market_cap_change_percentage_24h_usd", 0))
+        )
+        session.add(stats)
+
+        session.commit()
+        print("Successfully stored global market stats.")
+        return True
+
+    except Exception as e:
+        session.rollback()
+        print(f"Error storing global market stats: {str(e)}")
+        return False
 
     finally:
         session.close()
 
+# Store market cap and volume history in the database
+def store_chart_history(chart_history):
+    """
+    Stores market cap and volume history in the database, replacing the previous history.
+    Returns True on success, False if nothing was stored.
+    """
+    session = get_session()
+
+    try:
+        # Clear old history; it no longer covers any fetched range
+        session.query(MarketHistory).delete()
+        session.query(MarketHistoryCoverage).delete()
+
+        # Line up market cap and volume points by timestamp
+        market_cap_df = chart_history["market_cap_history"].set_index("timestamp")["value"]
+        volume_df = chart_history["volume_history"].set_index("timestamp")["value"]
+        history_df = pd.concat([market_cap_df.rename("market_cap"), volume_df.rename("volume")], axis=1)
+
+        for timestamp, row in history_df.iterrows():
+            point = MarketHistory(
+                timestamp=pd.Timestamp(timestamp).to_pydatetime(),
+                market_cap=None if pd.isna(row["market_cap"]) else float(row["market_cap"]),
+                volume=None if pd.isna(row["volume"]) else float(row["volume"])
+            )
+            session.add(point)
+
+        session.commit()
+        print("Successfully stored market history.")
+        return True
+
+    except Exception as e:
+        session.rollback()
+        print(f"Error storing market history: {str(e)}")
+        return False
+
+    finally:
+        session.close()
+
+# Store one fetched range of market history in the database
+def store_history_range(range_start, range_end, points):
+    """
+    Stores (timestamp, market_cap, volume) points fetched for a time range,
+    replacing any stored points inside that range, and records the range as
+    covered. Both happen in one transaction, so the coverage table doubles
+    as the backfill checkpoint: a range is either fully stored or not at all.
+    Overlapping and adjacent covered ranges are merged into one.
+    """
+    history = MarketHistory.__table__
+    coverage = MarketHistoryCoverage.__table__
+
+    # Points are bucketed, so the first one can sit slightly before range_start
+    delete_from = min([range_start] + [point[0] for point in points])
+
+    with engine.begin() as conn:
+        conn.execute(delete(history).where(history.c.timestamp.between(delete_from, range_end)))
+        if points:
+            conn.execute(insert(history), [
+                {"timestamp": timestamp, "market_cap": market_cap, "volume": volume}
+                for timestamp, market_cap, volume in points
+            ])
+
+        # Merge the new range with every covered range it touches
+        touching = conn.execute(
+            select(coverage.c.id, coverage.c.range_start, coverage.c.range_end)
+            .where(coverage.c.range_start <= range_end, coverage.c.range_end >= range_start)
+        ).all()
+        if touching:
+            range_start = min([range_start] + [row.range_start for row in touching])
+            range_end = max([range_end] + [row.range_end for row in touching])
+            conn.execute(delete(coverage).where(coverage.c.id.in_([row.id for row in touching])))
+        conn.execute(insert(coverage), [{"range_start": range_start, "range_end": range_end}])
+
+# Store a snapshot of the coin market universe in the database
+def store_coin_markets(rows, batch_size=1000):
+    """
+    Stores coin market rows in the database, replacing the previous snapshot.
+    Rows can be any iterable (e.g. a generator over API pages). Each batch of
+    batch_size rows is written to the staging table in its own short
+    transaction, so only one batch is held in memory and a slow paginated
+    fetch never holds the database write lock. Once every row is staged, the
+    snapshot is swapped in with one short transaction, so readers never see
+    a partial one. Concurrent writers stage under their own run id.
+    Returns the number of rows stored, or False if the snapshot was not replaced.
+    """
+    columns = [
+        "coin_id", "symbol", "name", "market_cap_rank", "current_price", "market_cap", "total_volume",
+        "price_change_percentage_24h", "circulating_supply", "last_updated", "timestamp"
+    ]
+    staging = CoinMarketStaging.__table__
+    run_id = f"{os.getpid()}-{time.time_ns()}"
+    timestamp = dt.datetime.now()
+    count = 0
+
+    def stage(batch):
+        with engine.begin() as conn:
+            conn.execute(insert(staging), batch)
+
+    try:
+        batch = []
+        for row in rows:
+            record = {column: row.get(column) for column in columns}
+            record.update(run_id=run_id, coin_id=row["id"], symbol=row["symbol"], name=row["name"], timestamp=timestamp)
+            batch.append(record)
+
+            if len(batch) >= batch_size:
+                stage(batch)
+                count += len(batch)
+                batch = []
+
+        if batch:
+            stage(batch)
+            count += len(batch)
+
+        with engine.begin() as conn:
+            # Swap the staged rows in for the previous snapshot
+            conn.execute(delete(CoinMarket.__table__))
+            conn.execute(insert(CoinMarket.__table__).from_select(
+                columns, select(*[staging.c[column] for column in columns]).where(staging.c.run_id == run_id).order_by(staging.c.id)
+            ))
+            conn.execute(delete(staging).where(staging.c.run_id == run_id))
+
+        print(f"Successfully stored {count} coin market rows.")
+
+    except Exception as e:
+        print(f"Error storing coin markets: {str(e)}")
+        try:
+            with engine.begin() as conn:
+                conn.execute(delete(staging).where(staging.c.run_id == run_id))
+        except Exception as cleanup_error:
+            print(f"Error clearing staged coin markets: {str(cleanup_error)}")
+        return False
+
+    return count
+
 # Retrieve all exchange data from the database
 def get_all_exchange_data():
     """
     Retrieves all exchange data from the database in the same format as the original exchange_data dictionary.
+    Each table is read with a single ordered query and the rows are grouped by
+    exchange in one pass, so the number of queries does not grow with the number of exchanges.
     """
-    session = get_session()
     result = {}
 
     try:
-        # Get all exchanges
-        exchanges = session.query(Exchange).all()
+        exchanges = Exchange.__table__
+        monthly = MonthlyData.__table__
+        yearly = YearlyData.__table__
+        fees = FeeStructure.__table__
+
+        with engine.connect() as conn:
+            # Get all exchanges
+            names = {}
+            for exchange_id, name in conn.execute(select(exchanges.c.id, exchanges.c.name).order_by(exchanges.c.id)):
+                names[exchange_id] = name
+                result[name] = {
+                    'monthly_dates': [], 'monthly_volume': [], 'monthly_commission': [],
+                    'yearly_dates': [], 'yearly_volume': [], 'yearly_commission': [],
+                    'vip_tiers': [], 'maker_fees': [], 'taker_fees': []
+                }
 
-        for exchange in exchanges:
             # Get monthly data
-            monthly_query = session.query(MonthlyData).filter_by(exchange_id=exchange.id).order_by(MonthlyData.month_date)
-            monthly_data = monthly_query.all()
+            query = select(monthly.c.exchange_id, monthly.c.month_date, monthly.c.volume, monthly.c.commission)
+            for exchange_id, month_date, volume, commission in conn.execute(query.order_by(monthly.c.exchange_id, monthly.c.month_date)):
+                data = result[names[exchange_id]]
+                data['monthly_dates'].append(month_date)
+                data['monthly_volume'].append(volume)
+                data['monthly_commission'].append(commission)
 
             # Get yearly data
-            yearly_query = session.query(YearlyData).filter_by(exchange_id=exchange.id).order_by(YearlyData.year)
-            yearly_data = yearly_query.all()
-
-            # Get fee structure
-            fee_query = session.query(FeeStructure).filter_by(exchange_id=exchange.id).order_by(FeeStructure.id)
-            fee_data = fee_query.all()
-
-            # Create result structure
-            result[exchange.name] = {
-                'monthly_dates': [item.month_date for item in monthly_data],
-                'monthly_volume': [item.volume for item in monthly_data],
-                'monthly_commission': [item.commission for item in monthly_data],
-                'yearly_dates': [item.year for item in yearly_data],
-                'yearly_volume': [item.volume for item in yearly_data],
-                'yearly_commission': [item.commission for item in yearly_data],
-                'vip_tiers': [item.vip_tier for item in fee_data],
-                'maker_fees': [item.maker_fee for item in fee_data],
-                'taker_fees': [item.taker_fee for item in fee_data]
-            }
+            query = select(yearly.c.exchange_id, yearly.c.year, yearly.c.volume, yearly.c.commission)
+            for exchange_id, year, volume, commission in conn.execute(query.order_by(yearly.c.exchange_id, yearly.c.year)):
+                data = result[names[exchange_id]]
+                data['yearly_dates'].append(year)
+                data['yearly_volume'].append(volume)
+                data['yearly_commission'].append(commission)
+
+            # Get fee structures
+            query = select(fees.c.exchange_id, fees.c.vip_tier, fees.c.maker_fee, fees.c.taker_fee)
+            for exchange_id, vip_tier, maker_fee, taker_fee in conn.execute(query.order_by(fees.c.exchange_id, fees.c.id)):
+                data = result[names[exchange_id]]
+                data['vip_tiers'].append(vip_tier)
+                data['maker_fees'].append(maker_fee)
+                data['taker_fees'].append(taker_fee)
 
     except Exception as e:
         print(f"Error retrieving exchange data: {str(e)}")
 
-    finally:
-        session.close()
-
     return result
 
+# Get a version marker of each dashboard dataset
+def get_data_versions():
+    """
+    Returns, per dashboard dataset, a marker that changes whenever its stored
+    rows are written, all read in one query: the latest id of append-only
+    tables, otherwise the row count and latest write time. Returns an empty
+    dict if the database cannot be read.
+    """
+    def count_and_latest(column):
+        return [select(func.count()).select_from(column.table), select(func.max(column))]
+
+    markers = {
+        "exchange_data": count_and_latest(ExchangeAggregate.__table__.c.updated_at),
+        "global_data": [select(func.max(GlobalMarketStats.__table__.c.id))],
+        "chart_history": count_and_latest(MarketHistory.__table__.c.timestamp),
+        "prices": count_and_latest(CryptoPrice.__table__.c.timestamp),
+        "news": count_and_latest(NewsItem.__table__.c.timestamp)
+    }
+    query = select(*[marker.scalar_subquery() for queries in markers.values() for marker in queries])
+
+    try:
+        with engine.connect() as conn:
+            values = iter(conn.execute(query).one())
+    except Exception as e:
+        print(f"Error retrieving data versions: {str(e)}")
+        return {}
+
+    return {name: ":".join(str(next(values)) for _ in queries) for name, queries in markers.items()}
+
 # Get latest cryptocurrency prices
 def get_latest_crypto_prices():
     """
@@ -403,4 +1441,112 @@ def get_latest_news():
     finally:
         session.close()
 
-    return result
\ No newline at end of file
+    return result
+
+# Get latest global market statistics
+def get_latest_global_stats():
+    """
+    Retrieves the most recent global market statistics from the database.
+    """
+    session = get_session()
+    result = {}
+
+    try:
+        stats = session.query(GlobalMarketStats).order_by(desc(GlobalMarketStats.timestamp)).first()
+
+        if stats is not None:
+            result = {
+                'total_market_cap': stats.total_market_cap,
+                'total_volume': stats.total_volume,
+                'market_cap_percentage': stats.market_cap_percentage,
+                'market_cap_change_percentage_24h_usd': stats.market_cap_change_24h
+            }
+
+    except Exception as e:
+        print(f"Error retrieving global market stats: {str(e)}")
+
+    finally:
+        session.close()
+
+    return result
+
+# Get market cap and volume history
+def get_chart_history(start=None, end=None):
+    """
+    Retrieves market cap and volume history from the database in the same format as fetch_global_chart_history.
+    start and end optionally limit the result to a time window; the range query
+    runs on the timestamp index and skips ORM objects, so multi-year windows stay fast.
+    """
+    history = MarketHistory.__table__
+    result = {}
+
+    try:
+        query = select(history.c.timestamp, history.c.market_cap, history.c.volume).order_by(history.c.timestamp)
+        if start is not None:
+            query = query.where(history.c.timestamp >= start)
+        if end is not None:
+            query = query.where(history.c.timestamp <= end)
+
+        with engine.connect() as conn:
+            points = pd.DataFrame(conn.execute(query).all(), columns=["timestamp", "market_cap", "volume"])
+
+        if not points.empty:
+            points["timestamp"] = pd.to_datetime(points["timestamp"])
+            for name, column in (("market_cap_history", "market_cap"), ("volume_history", "volume")):
+                df = points[["timestamp", column]].rename(columns={column: "value"}).dropna()
+                df["date"] = df["timestamp"].dt.date
+                result[name] = df.reset_index(drop=True)
+
+    except Exception as e:
+        print(f"Error retrieving market history: {str(e)}")
+
+    return result
+
+# Get the time ranges of market history already fetched
+def get_history_coverage():
+    """
+    Retrieves the covered market history ranges as (start, end) pairs, oldest first.
+    """
+    coverage = MarketHistoryCoverage.__table__
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(coverage.c.range_start, coverage.c.range_end).order_by(coverage.c.range_start)
+        ).all()
+
+    return [(row.range_start, row.range_end) for row in rows]
+
+# Get the coin market snapshot
+def get_coin_markets(limit=None):
+    """
+    Retrieves the stored coin market snapshot ordered by market cap rank.
+    """
+    session = get_session()
+    result = []
+
+    try:
+        query = session.query(CoinMarket).order_by(CoinMarket.market_cap_rank)
+        if limit is not None:
+            query = query.limit(limit)
+
+        for coin in query.all():
+            result.append({
+                'id': coin.coin_id,
+                'symbol': coin.symbol,
+                'name': coin.name,
+                'market_cap_rank': coin.market_cap_rank,
+                'current_price': coin.current_price,
+                'market_cap': coin.market_cap,
+                'total_volume': coin.total_volume,
+                'price_change_percentage_24h': coin.price_change_percentage_24h,
+                'circulating_supply': coin.circulating_supply,
+                'last_updated': coin.last_updated
+            })
+
+    except Exception as e:
+        print(f"Error retrieving coin markets: {str(e)}")
+
+    finally:
+        session.close()
+
+    return result
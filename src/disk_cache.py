@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# A cached response body together with the validators needed to revalidate it
+CachedResponse = namedtuple("CachedResponse", ["url", "body", "etag", "last_modified", "stored_at"])
+
+class DiskCache:
+    """
+    Persistent HTTP response cache stored in a SQLite file.
+    Bodies are kept with their ETag / Last-Modified validators so refreshes can
+    be sent as conditional requests. Every write runs in its own transaction,
+    which keeps entries consistent when several processes share the file.
+    Once the stored bodies exceed max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_http_cache_last_access ON http_cache (last_access)")
+
+    def _connection(self):
+        # One connection per thread; sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def get(self, key):
+        """
+        Look up a cached response, or None if there is no entry for the key.
+        """
+        row = self._connection().execute(
+            "SELECT url, body, etag, last_modified, stored_at FROM http_cache WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return CachedResponse(row[0], bytes(row[1]), row[2], row[3], row[4])
+
+    def set(self, key, url, body, etag=None, last_modified=None):
+        """
+        Store a response body with its validators, evicting old entries if over the size cap.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO http_cache "
+                "(key, url, body, etag, last_modified, size, stored_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, sqlite3.Binary(body), etag, last_modified, len(body), now, now)
+            )
+            self._evict(conn)
+
+    def touch(self, key):
+        """
+        Mark an entry as used after a successful revalidation.
+        """
+        with self._transaction() as conn:
+            conn.execute("UPDATE http_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+
+    def delete(self, key=None):
+        """
+        Delete one entry, or every entry when no key is given.
+        """
+        with self._transaction() as conn:
+            if key is None:
+                conn.execute("DELETE FROM http_cache")
+            else:
+                conn.execute("DELETE FROM http_cache WHERE key = ?", (key,))
+
+    def total_size(self):
+        """
+        Get the combined size in bytes of all cached bodies.
+        """
+        row = self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()
+        return row[0]
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop the least recently used entries until the cache fits again
+        rows = conn.execute("SELECT key, size FROM http_cache ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM http_cache WHERE key = ?", (key,))
+            total -= size
+
+class _Transaction:
+    """Context manager that wraps a block in a write transaction (BEGIN IMMEDIATE)."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.connection.execute("COMMIT")
+        else:
+            self.connection.execute("ROLLBACK")
+        return False
@@ -0,0 +1,249 @@
+import numpy as np
+import pandas as pd
+import datetime as dt
+
+# Exchanges covered by the dashboard
+DEFAULT_EXCHANGES = [
+    "Binance", "Coinbase", "Bybit", "Upbit", "Kraken",
+    "Kucoin", "CoinDCX", "Bitget", "OKX"
+]
+
+# Exchanges in each volume class, used to pick the scale range of generated data
+LARGE_EXCHANGES = {"Binance", "Coinbase"}
+MEDIUM_EXCHANGES = {"Bybit", "Kraken", "Upbit"}
+
+# Fee tiers of generated fee structures
+DEFAULT_VIP_TIERS = ["Regular", "VIP 1", "VIP 2", "VIP 3", "VIP 4", "VIP 5"]
+
+# Timeframes of the per-exchange aggregates, with the exchange data keys they sum
+AGGREGATE_TIMEFRAMES = {
+    "Monthly": ("monthly_volume", "monthly_commission"),
+    "Yearly": ("yearly_volume", "yearly_commission")
+}
+
+# Columns of the per-exchange aggregates
+AGGREGATE_COLUMNS = [
+    "exchange", "timeframe", "periods", "total_volume", "total_commission",
+    "average_volume", "average_commission", "commission_rate", "volume_share",
+    "commission_share", "volume_rank", "commission_rank", "volume_vs_market",
+    "commission_vs_market"
+]
+
+def get_rng(rng=None):
+    """
+    Get a np.random.Generator. Accepts an existing Generator, a seed, or None
+    for a randomly seeded one.
+    """
+    return np.random.default_rng(rng)
+
+def generate_volume_matrix(base_monthly_volume, commission_rate, months=12, years=8,
+                           growth_offset=1.0, rng=None):
+    """
+    Generate monthly and yearly volume and commission series for many exchanges at once.
+    base_monthly_volume and commission_rate hold one value per exchange; the
+    result maps monthly_volume, monthly_commission, yearly_volume and
+    yearly_commission to (exchanges x periods) arrays rounded to 2 decimals.
+
+    Monthly volumes follow a seasonal curve and a slight upward trend with
+    +/-20% noise. Yearly volumes grow as (growth_offset + year/5) ** 2 from a
+    base of twelve months, with +/-10% noise.
+    """
+    rng = get_rng(rng)
+    base = np.asarray(base_monthly_volume, dtype=float)[:, np.newaxis]
+    rate = np.asarray(commission_rate, dtype=float)[:, np.newaxis]
+    count = base.shape[0]
+
+    month = np.arange(months)
+    season_factor = 1 + 0.2 * np.sin(month / 6 * np.pi)
+    trend_factor = 1 + month / 24
+    monthly_volume = base * (season_factor * trend_factor) * rng.uniform(0.8, 1.2, (count, months))
+
+    growth_factor = (growth_offset + np.arange(years) / 5) ** 2
+    yearly_volume = base * 12 * growth_factor * rng.uniform(0.9, 1.1, (count, years))
+
+    return {
+        "monthly_volume": np.round(monthly_volume, 2),
+        "monthly_commission": np.round(np.round(monthly_volume, 2) * rate, 2),
+        "yearly_volume": np.round(yearly_volume, 2),
+        "yearly_commission": np.round(yearly_volume * rate, 2)
+    }
+
+def generate_daily_volume_matrix(base_daily_volume, commission_rate, days, rng=None):
+    """
+    Generate daily volume and commission series for many exchanges at once.
+    Uses the same yearly seasonality, slight upward trend and +/-20% noise as
+    the monthly series. Returns (volume, commission) as (exchanges x days)
+    arrays rounded to 2 decimals.
+    """
+    rng = get_rng(rng)
+    base = np.asarray(base_daily_volume, dtype=float)[:, np.newaxis]
+    rate = np.asarray(commission_rate, dtype=float)[:, np.newaxis]
+
+    day = np.arange(days)
+    season_factor = 1 + 0.2 * np.sin(day / 182.5 * np.pi)
+    trend_factor = 1 + day / 730
+    volume = np.round(base * (season_factor * trend_factor) * rng.uniform(0.8, 1.2, (base.shape[0], days)), 2)
+    return volume, np.round(volume * rate, 2)
+
+def generate_ticks(base_price, ticks, rng=None):
+    """
+    Generate a trade stream of `ticks` trades for each exchange.
+    Prices follow a random walk from base_price with 0.05% steps; amounts are
+    exponentially distributed around 0.5. Returns (price, amount) as
+    (exchanges x ticks) arrays.
+    """
+    rng = get_rng(rng)
+    base = np.asarray(base_price, dtype=float)[:, np.newaxis]
+    shape = (base.shape[0], ticks)
+
+    price = np.round(base * np.exp(np.cumsum(rng.normal(0, 0.0005, shape), axis=1)), 2)
+    amount = np.round(rng.exponential(0.5, shape), 6)
+    return price, amount
+
+def generate_fee_tiers(count, tiers=None, rng=None):
+    """
+    Generate descending maker and taker fees for `count` exchanges.
+    Returns (maker_fees, taker_fees) as (exchanges x tiers) arrays in percent.
+    """
+    rng = get_rng(rng)
+    if tiers is None:
+        tiers = len(DEFAULT_VIP_TIERS)
+
+    base_maker = rng.uniform(0.075, 0.15, (count, 1))
+    base_taker = base_maker * 1.5
+    reduction = np.arange(tiers) * 0.02
+
+    maker_fees = np.round(np.maximum(0.01, base_maker - reduction), 3)
+    taker_fees = np.round(np.maximum(0.02, base_taker - reduction), 3)
+    return maker_fees, taker_fees
+
+def get_scale_ranges(exchanges):
+    """
+    Get the (low, high) volume scale range of each exchange by its size class.
+    """
+    low = np.array([8.0 if name in LARGE_EXCHANGES else 4.0 if name in MEDIUM_EXCHANGES else 1.0 for name in exchanges])
+    high = np.array([12.0 if name in LARGE_EXCHANGES else 8.0 if name in MEDIUM_EXCHANGES else 4.0 for name in exchanges])
+    return low, high
+
+def generate_synthetic_metrics(exchanges, months=12, years=8, rng=None):
+    """
+    Generate synthetic volume, commission and fee data for a list of exchanges
+    in one batch. Returns a dict of (exchanges x periods) arrays: the volume
+    matrix fields plus maker_fees and taker_fees.
+    """
+    rng = get_rng(rng)
+    count = len(exchanges)
+
+    low, high = get_scale_ranges(exchanges)
+    scale = rng.uniform(low, high)
+    base_volume = rng.uniform(500, 2000, count) * scale
+    commission_rate = rng.uniform(0.001, 0.003, count)  # 0.1% to 0.3%
+
+    metrics = generate_volume_matrix(base_volume, commission_rate, months, years, rng=rng)
+    metrics["maker_fees"], metrics["taker_fees"] = generate_fee_tiers(count, rng=rng)
+    return metrics
+
+def get_period_labels(months=12, years=8, current_date=None):
+    """
+    Get the month ("YYYY-MM") and year labels of the generated series, oldest first.
+    """
+    if current_date is None:
+        current_date = dt.datetime.now()
+
+    month_dates = [(current_date - dt.timedelta(days=30*i)).strftime("%Y-%m") for i in range(months)]
+    month_dates.reverse()
+    year_list = [str(current_date.year - i) for i in range(years)]
+    year_list.reverse()
+    return month_dates, year_list
+
+def generate_synthetic_exchange_data(exchanges=None, rng=None):
+    """
+    Generate synthetic data for the given exchanges (DEFAULT_EXCHANGES by default)
+    in the dashboard's exchange data format.
+    """
+    if exchanges is None:
+        exchanges = DEFAULT_EXCHANGES
+
+    metrics = generate_synthetic_metrics(exchanges, rng=rng)
+    month_dates, year_list = get_period_labels()
+
+    exchange_data = {}
+    for i, exchange in enumerate(exchanges):
+        exchange_data[exchange] = {
+            "monthly_dates": month_dates,
+            "monthly_volume": metrics["monthly_volume"][i].tolist(),
+            "monthly_commission": metrics["monthly_commission"][i].tolist(),
+            "yearly_dates": year_list,
+            "yearly_volume": metrics["yearly_volume"][i].tolist(),
+            "yearly_commission": metrics["yearly_commission"][i].tolist(),
+            "vip_tiers": list(DEFAULT_VIP_TIERS),
+            "maker_fees": metrics["maker_fees"][i].tolist(),
+            "taker_fees": metrics["taker_fees"][i].tolist()
+        }
+
+    return exchange_data
+
+def generate_dominance_history(current_percentages, coins, periods, rng=None):
+    """
+    Generate a sample market cap dominance history for coins (ids as in
+    current_percentages) plus an "Others" row, starting slightly below each
+    coin's current share with a small upward trend and daily noise.
+    Returns a (len(coins) + 1, periods) array in percent; every period sums to 100.
+    """
+    rng = get_rng(rng)
+
+    # Bitcoin has larger swings, major altcoins less, stablecoins and smaller altcoins least
+    swing = np.array([2.0 if coin == "btc" else 1.0 if coin in ("eth", "bnb", "sol") else 0.5 for coin in coins])
+    trend = np.array([0.3 if coin == "btc" else 0.1 if coin in ("eth", "bnb", "sol") else 0.03 for coin in coins])
+    base = np.maximum(0.5, np.array([current_percentages.get(coin, 1.0) for coin in coins]) * 0.9)
+
+    progress = np.arange(periods) / periods
+    noise = rng.uniform(-swing[:, None], swing[:, None], (len(coins), periods))
+    shares = np.maximum(0.1, base[:, None] + trend[:, None] * progress + noise)
+
+    # "Others" is what is left to reach 100%, then every period is scaled to sum to 100%
+    others = np.maximum(0.1, 100 - shares.sum(axis=0))
+    shares = np.vstack([shares, others])
+    return shares * (100 / shares.sum(axis=0))
+
+def get_exchange_totals(exchange_data):
+    """
+    Sum the volume and commission of every exchange in each timeframe.
+    Returns a DataFrame with exchange, timeframe, periods, total_volume and
+    total_commission columns.
+    """
+    rows = []
+    for timeframe, (volume_key, commission_key) in AGGREGATE_TIMEFRAMES.items():
+        for exchange, data in exchange_data.items():
+            rows.append({
+                "exchange": exchange,
+                "timeframe": timeframe,
+                "periods": len(data[volume_key]),
+                "total_volume": float(np.sum(data[volume_key])),
+                "total_commission": float(np.sum(data[commission_key]))
+            })
+    return pd.DataFrame(rows, columns=AGGREGATE_COLUMNS[:5])
+
+def compute_exchange_aggregates(totals):
+    """
+    Derive the per-exchange aggregates from totals like those of get_exchange_totals:
+    averages per period, the commission rate (%), and for volume and commission the
+    share of the timeframe's market total (%), the rank (1 is the largest) and the
+    difference from the market average (%). Returns a DataFrame with AGGREGATE_COLUMNS.
+    """
+    aggregates = totals.copy()
+    grouped = aggregates.groupby("timeframe")
+    periods = aggregates["periods"].where(aggregates["periods"] > 0)
+
+    for measure in ("volume", "commission"):
+        total = aggregates[f"total_{measure}"]
+        market_total = grouped[f"total_{measure}"].transform("sum")
+        market_average = grouped[f"total_{measure}"].transform("mean")
+        aggregates[f"average_{measure}"] = (total / periods).fillna(0.0)
+        aggregates[f"{measure}_share"] = (total / market_total.where(market_total != 0) * 100).fillna(0.0)
+        aggregates[f"{measure}_rank"] = grouped[f"total_{measure}"].rank(method="min", ascending=False).astype(int)
+        aggregates[f"{measure}_vs_market"] = ((total / market_average.where(market_average != 0) - 1) * 100).fillna(0.0)
+
+    volume = aggregates["total_volume"]
+    aggregates["commission_rate"] = (aggregates["total_commission"] / volume.where(volume > 0) * 100).fillna(0.0)
+    return aggregates[AGGREGATE_COLUMNS]
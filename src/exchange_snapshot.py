@@ -0,0 +1,267 @@
+import datetime as dt
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import database
+import exchange_metrics
+
+# Optional columnar snapshot of the exchange dataset; when set, the dashboard
+# memory-maps it instead of reading exchange data from the database
+EXCHANGE_SNAPSHOT_PATH = os.environ.get("EXCHANGE_SNAPSHOT_PATH", "")
+
+# Layout version of the snapshot files
+SNAPSHOT_FORMAT = 1
+
+# Per-exchange series in the dashboard's exchange data format, by snapshot table:
+# exchange data key -> column. Each table also has an offsets column, where
+# rows offsets[i]:offsets[i + 1] belong to the i-th exchange
+SNAPSHOT_SERIES = {
+    "monthly": {"monthly_dates": "month_date", "monthly_volume": "volume", "monthly_commission": "commission"},
+    "yearly": {"yearly_dates": "year", "yearly_volume": "volume", "yearly_commission": "commission"},
+    "fees": {"vip_tiers": "vip_tier", "maker_fees": "maker_fee", "taker_fees": "taker_fee"}
+}
+
+class ExchangeSnapshot:
+    """
+    Read-only view of a snapshot directory. Every column is a memory-mapped
+    .npy file, so all sessions and processes reading the same snapshot share
+    one copy of its pages, and nothing is parsed on open.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"unsupported snapshot format {self.manifest.get('format')}")
+
+        self.tables = {}
+        for table, info in self.manifest["tables"].items():
+            # Empty arrays cannot be memory-mapped
+            mmap_mode = "r" if info["rows"] else None
+            self.tables[table] = {
+                column: np.load(os.path.join(path, table, f"{column}.npy"), mmap_mode=mmap_mode)
+                for column in info["columns"]
+            }
+
+        self.created_at = self.manifest["created_at"]
+        self.exchange_data = self._get_exchange_data()
+
+    def _get_exchange_data(self):
+        # Views into the mapped columns, in the dashboard's exchange data format
+        exchange_data = {}
+        for i, name in enumerate(self.tables["exchanges"]["name"].tolist()):
+            data = {}
+            for table, columns in SNAPSHOT_SERIES.items():
+                offsets = self.tables[table]["offsets"]
+                for key, column in columns.items():
+                    data[key] = self.tables[table][column][offsets[i]:offsets[i + 1]]
+            exchange_data[name] = data
+        return exchange_data
+
+    @property
+    def aggregates(self):
+        """Per-exchange aggregates with exchange_metrics.AGGREGATE_COLUMNS."""
+        return pd.DataFrame(self.tables["aggregates"], columns=exchange_metrics.AGGREGATE_COLUMNS)
+
+    @property
+    def prices(self):
+        """Latest prices in the format of fetch_current_prices."""
+        table = self.tables["prices"]
+        return {
+            crypto_id: {"usd": usd, "usd_24h_change": change}
+            for crypto_id, usd, change in zip(table["crypto_id"].tolist(), table["usd"].tolist(), table["usd_24h_change"].tolist())
+        }
+
+    @property
+    def chart_history(self):
+        """Market cap and volume history in the format of fetch_global_chart_history."""
+        history = {}
+        for name in ("market_cap_history", "volume_history"):
+            df = pd.DataFrame({"timestamp": self.tables[name]["timestamp"], "value": self.tables[name]["value"]})
+            if not df.empty:
+                df["date"] = df["timestamp"].dt.date
+                history[name] = df
+        return history
+
+def get_snapshot_tables(exchange_data, aggregates=None, prices=None, chart_history=None):
+    """
+    Lay out the exchange dataset as snapshot tables of equal-length column arrays.
+    Aggregates are computed from exchange_data when not given.
+    """
+    names = list(exchange_data)
+    tables = {"exchanges": {"name": np.array(names, dtype=str)}}
+
+    for table, columns in SNAPSHOT_SERIES.items():
+        lengths = [len(exchange_data[name][next(iter(columns))]) for name in names]
+        tables[table] = {"offsets": np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(np.int64)}
+        for key, column in columns.items():
+            values = [value for name in names for value in exchange_data[name][key]]
+            tables[table][column] = np.array(values, dtype=str if column in ("month_date", "year", "vip_tier") else float)
+
+    if aggregates is None:
+        aggregates = exchange_metrics.compute_exchange_aggregates(exchange_metrics.get_exchange_totals(exchange_data))
+    tables["aggregates"] = {
+        column: aggregates[column].to_numpy(dtype=str if column in ("exchange", "timeframe") else None)
+        for column in exchange_metrics.AGGREGATE_COLUMNS
+    }
+
+    prices = prices or {}
+    tables["prices"] = {
+        "crypto_id": np.array(list(prices), dtype=str),
+        "usd": np.array([float(price["usd"]) for price in prices.values()], dtype=float),
+        "usd_24h_change": np.array([float(price.get("usd_24h_change") or 0) for price in prices.values()], dtype=float)
+    }
+
+    chart_history = chart_history or {}
+    for name in ("market_cap_history", "volume_history"):
+        df = chart_history.get(name)
+        tables[name] = {
+            "timestamp": np.array([] if df is None else pd.to_datetime(df["timestamp"]).to_numpy(), dtype="datetime64[ns]"),
+            "value": np.array([] if df is None else df["value"].to_numpy(), dtype=float)
+        }
+
+    return tables
+
+def is_version_name(prefix, name):
+    """
+    Whether name is a finished version directory name of the snapshot whose
+    file name is prefix: "<prefix>.<time_ns>", without any .tmp suffix.
+    """
+    return re.fullmatch(re.escape(prefix) + r"\.\d+", name) is not None
+
+def write_exchange_snapshot(path, exchange_data, aggregates=None, prices=None, chart_history=None):
+    """
+    Write the exchange dataset to a columnar snapshot: a directory with one .npy
+    file per column and a manifest.json. The new version is written next to the
+    old one and published by atomically replacing the pointer file at path,
+    which holds the name of the current version, so readers see either the old
+    or the new snapshot, never a partial one. A plain file works everywhere,
+    unlike a symlink, which needs extra privileges on Windows.
+    Versions older than the previous one are removed.
+    Returns the directory of the new version.
+    """
+    path = os.path.abspath(path)
+    if os.path.exists(path) and read_snapshot_pointer(path) is None:
+        raise ValueError(f"{path} exists and is not a snapshot pointer")
+
+    version = f"{path}.{time.time_ns()}"
+    tmp_dir = f"{version}.tmp"
+    tables = get_snapshot_tables(exchange_data, aggregates, prices, chart_history)
+
+    try:
+        for table, columns in tables.items():
+            os.makedirs(os.path.join(tmp_dir, table))
+            for column, values in columns.items():
+                np.save(os.path.join(tmp_dir, table, f"{column}.npy"), values)
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "created_at": dt.datetime.now().isoformat(),
+            "tables": {
+                table: {"rows": len(list(columns.values())[-1]), "columns": list(columns)}
+                for table, columns in tables.items()
+            }
+        }
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(tmp_dir, version)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    previous = get_snapshot_version(path)
+    tmp_pointer = f"{version}.pointer.tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(version))
+    os.replace(tmp_pointer, path)
+
+    # Keep the previous version for readers that read the pointer just before the swap.
+    # Only finished versions are removed; .tmp directories may belong to another writer
+    directory, prefix = os.path.split(path)
+    for entry in os.listdir(directory):
+        old = os.path.join(directory, entry)
+        if is_version_name(prefix, entry) and os.path.isdir(old) and not os.path.islink(old) and old not in (version, previous):
+            shutil.rmtree(old, ignore_errors=True)
+
+    return version
+
+def read_snapshot_pointer(path):
+    """
+    Get the version directory named by the snapshot pointer at path, or None
+    if path is missing or is not a snapshot pointer. Snapshots published as a
+    symlink to the version directory are read too.
+    """
+    path = os.path.abspath(path)
+    if os.path.islink(path):
+        return os.path.realpath(path)
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            name = f.read(256).strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    directory, prefix = os.path.split(path)
+    if not is_version_name(prefix, name):
+        return None
+    return os.path.join(directory, name)
+
+def get_snapshot_version(path):
+    """
+    Get the version directory the snapshot pointer names, or None if there is
+    no snapshot. Changes whenever the snapshot is replaced.
+    """
+    version = read_snapshot_pointer(path)
+    if version is None or not os.path.isdir(version):
+        return None
+    return version
+
+def open_snapshot_version(version):
+    """
+    Memory-map one snapshot version directory, or return None if it is unreadable.
+    """
+    try:
+        return ExchangeSnapshot(version)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error reading exchange snapshot: {str(e)}")
+        return None
+
+def load_exchange_snapshot(path):
+    """
+    Memory-map the current version of a snapshot, or return None if there is none.
+    """
+    version = get_snapshot_version(path)
+    if version is None:
+        return None
+    return open_snapshot_version(version)
+
+def write_snapshot_from_database(path=None):
+    """
+    Export the exchange data, aggregates, latest prices and chart history stored
+    in the database to a snapshot at path (default EXCHANGE_SNAPSHOT_PATH).
+    Returns the directory of the new version, or None if there is no exchange data.
+    """
+    path = path or EXCHANGE_SNAPSHOT_PATH
+    exchange_data = database.get_all_exchange_data()
+    if not exchange_data:
+        print("No exchange data stored; exchange snapshot not written.")
+        return None
+
+    aggregates = database.get_exchange_aggregates()
+    if set(aggregates["exchange"]) != set(exchange_data):
+        aggregates = None
+
+    return write_exchange_snapshot(
+        path,
+        exchange_data,
+        aggregates=aggregates,
+        prices=database.get_latest_crypto_prices(),
+        chart_history=database.get_chart_history()
+    )
@@ -0,0 +1,429 @@
+import os
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from single_flight import SingleFlight, normalize_url
+from response_cache import ResponseCache
+from disk_cache import DiskCache
+from rate_limiter import TokenBucketLimiter, RateLimitExceeded
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+# Connection pool settings for the shared session
+POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", "10"))  # Number of hosts to keep pools for
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "20"))          # Connections kept alive per host
+
+# Separate connect and read timeouts in seconds
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+
+# Retry settings for rate limited (429) and server error (5xx) responses
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.environ.get("HTTP_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", "8"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+    "User-Agent": "TradeProfitAnalytics/0.1.0"
+}
+
+# Seconds a cached response stays fresh, per endpoint (override with CACHE_TTL_<ENDPOINT>)
+DEFAULT_ENDPOINT_TTLS = {
+    "prices": 60,
+    "global": 300,
+    "markets": 300,
+    "chart_history": 900,
+    "news": 900
+}
+ENDPOINT_TTLS = {
+    endpoint: float(os.environ.get(f"CACHE_TTL_{endpoint.upper()}", ttl))
+    for endpoint, ttl in DEFAULT_ENDPOINT_TTLS.items()
+}
+
+# Size of the response cache and how long expired entries may still be served
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "256"))
+CACHE_MAX_STALE = float(os.environ.get("CACHE_MAX_STALE", "3600"))
+
+# Persistent response cache used for conditional requests (empty path disables it)
+HTTP_CACHE_PATH = os.environ.get("HTTP_CACHE_PATH", "http_cache.db")
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("HTTP_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Calls per minute each endpoint may make, shared by all processes (override with RATE_LIMIT_<ENDPOINT>)
+DEFAULT_ENDPOINT_BUDGETS = {
+    "prices": 10,
+    "global": 5,
+    "markets": 10,
+    "chart_history": 5,
+    "news": 5,
+    "default": 5
+}
+ENDPOINT_BUDGETS = {
+    endpoint: float(os.environ.get(f"RATE_LIMIT_{endpoint.upper()}", budget))
+    for endpoint, budget in DEFAULT_ENDPOINT_BUDGETS.items()
+}
+
+# Shared rate limiter state (empty path disables it) and how long callers may queue for a token
+RATE_LIMIT_PATH = os.environ.get("RATE_LIMIT_PATH", "rate_limits.db")
+RATE_LIMIT_MAX_WAIT = float(os.environ.get("RATE_LIMIT_MAX_WAIT", "5"))
+
+# Consecutive failures that open an endpoint's circuit, and seconds before a trial call
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_RECOVERY_TIMEOUT = float(os.environ.get("CIRCUIT_RECOVERY_TIMEOUT", "30"))
+
+# Offline mode never opens a network connection (OFFLINE_MODE=1 or main.py --offline)
+OFFLINE_MODE = os.environ.get("OFFLINE_MODE", "").lower() in ("1", "true", "yes")
+
+_session = None
+_session_lock = threading.Lock()
+
+# Identical requests in flight at the same time share one upstream call
+_flight = SingleFlight()
+
+# Parsed responses, served stale while a background refresh runs
+_cache = ResponseCache(max_entries=CACHE_MAX_ENTRIES, max_stale=CACHE_MAX_STALE)
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+_disk_cache = None
+_disk_cache_configured = False
+
+_rate_limiter = None
+_rate_limiter_configured = False
+
+# One circuit breaker per endpoint
+_breakers = {}
+
+class OfflineError(Exception):
+    """Raised instead of sending a request while offline mode is on."""
+
+def is_offline():
+    """
+    Check whether offline mode is on.
+    """
+    return OFFLINE_MODE
+
+def set_offline_mode(enabled):
+    """
+    Turn offline mode on or off.
+    """
+    global OFFLINE_MODE
+    OFFLINE_MODE = bool(enabled)
+
+def create_http_session(pool_connections=None, pool_maxsize=None):
+    """
+    Create a requests session with a keep-alive connection pool.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections or POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize or POOL_MAXSIZE,
+        max_retries=0  # Retries are handled in get() so they can back off
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+def get_http_session():
+    """
+    Get the module-wide HTTP session, creating it on first use.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_http_session()
+    return _session
+
+def close_http_session():
+    """
+    Close the shared session and release its pooled connections.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def backoff_delay(attempt):
+    """
+    Exponential backoff with full jitter for the given retry attempt (0-based).
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header (seconds or an HTTP date) into seconds, or None.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+def get(url, headers=None, timeout=None, retries=None, endpoint=None, max_wait=None):
+    """
+    Send a GET request through the shared session.
+    Raises OfflineError without touching the network while offline mode is on.
+    Each attempt takes a token from the endpoint's rate limit budget, waiting
+    up to max_wait (default: the rate limiter's, RATE_LIMIT_MAX_WAIT) seconds
+    for one (RateLimitExceeded otherwise).
+    Responses with a retryable status and connection errors are retried with
+    jittered exponential backoff, or after the Retry-After time of a 429 if
+    that is within max_wait.
+    The last response is returned, so callers still check status_code; the
+    last exception is raised if no response came back.
+    """
+    if OFFLINE_MODE:
+        raise OfflineError(f"Offline mode is on, not fetching {url}")
+
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    if retries is None:
+        retries = MAX_RETRIES
+
+    session = get_http_session()
+    rate_limiter = get_rate_limiter()
+    bucket = endpoint or "default"
+    if max_wait is None:
+        max_wait = rate_limiter.max_wait if rate_limiter is not None else RATE_LIMIT_MAX_WAIT
+
+    for attempt in range(retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire(bucket, max_wait)
+
+        delay = backoff_delay(attempt)
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    # Hold back every process until the upstream accepts calls again
+                    if rate_limiter is not None:
+                        rate_limiter.block(retry_after)
+                    if retry_after > max_wait:
+                        return response
+                    delay = retry_after
+            response.close()
+
+        time.sleep(delay)
+
+def get_json(url, headers=None, endpoint=None, cache=True, max_wait=None):
+    """
+    Fetch a URL and return its parsed JSON body.
+    Concurrent calls for the same normalized URL share a single request and
+    its parsed result, which callers must not modify. Raises
+    requests.HTTPError if the final response is not 200.
+
+    Responses for endpoints listed in ENDPOINT_TTLS are cached. Once an entry
+    expires it is still returned immediately while it is refreshed in the background.
+    Pass cache=False for one-off bulk reads that should not fill the caches:
+    they skip the memory cache and are neither read from nor written to the disk cache.
+    """
+    key = normalize_url(url)
+    ttl = ENDPOINT_TTLS.get(endpoint) if cache else None
+
+    if ttl is None:
+        return _flight.do(key, lambda: _fetch_json(url, headers, endpoint=endpoint, max_wait=max_wait, cache=cache))
+
+    cached = _cache.get(key)
+    if cached is not None:
+        value, is_fresh = cached
+        if not is_fresh:
+            _schedule_refresh(key, url, headers, ttl, value, endpoint)
+        return value
+
+    return _flight.do(key, lambda: _fetch_and_cache(key, url, headers, ttl, endpoint=endpoint))
+
+def _fetch_json(url, headers=None, stale_value=None, endpoint=None, max_wait=None, cache=True):
+    if OFFLINE_MODE:
+        raise OfflineError(f"Offline mode is on, not fetching {url}")
+
+    key = normalize_url(url)
+    disk_cache = get_disk_cache() if cache else None
+    entry = disk_cache.get(key) if disk_cache is not None else None
+
+    # Revalidate a stored body instead of downloading it again
+    request_headers = dict(headers or {})
+    if entry is not None:
+        if entry.etag:
+            request_headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            request_headers["If-Modified-Since"] = entry.last_modified
+
+    # Fail fast while the endpoint's circuit is open
+    breaker = get_circuit_breaker(endpoint)
+    breaker.before_call()
+    try:
+        response = get(url, headers=request_headers, endpoint=endpoint, max_wait=max_wait)
+    except (requests.ConnectionError, requests.Timeout):
+        breaker.record_failure()
+        raise
+    except Exception:
+        breaker.release()
+        raise
+
+    if response.status_code >= 500 or response.status_code == 429:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+    if response.status_code == 304 and entry is not None:
+        disk_cache.touch(key)
+        # Reuse the already parsed value when refreshing a stale memory entry
+        if stale_value is not None:
+            return stale_value
+        return json.loads(entry.body)
+
+    if response.status_code != 200:
+        raise requests.HTTPError(f"{response.status_code} response for {url}", response=response)
+
+    value = response.json()
+    if disk_cache is not None:
+        try:
+            disk_cache.set(
+                key,
+                url,
+                response.content,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
+        except Exception as e:
+            print(f"Error writing {url} to the disk cache: {str(e)}")
+    return value
+
+def _fetch_and_cache(key, url, headers, ttl, stale_value=None, endpoint=None):
+    value = _fetch_json(url, headers, stale_value, endpoint)
+    _cache.set(key, value, ttl, tag=endpoint)
+    return value
+
+def _schedule_refresh(key, url, headers, ttl, stale_value, endpoint):
+    # Only one background refresh per key at a time
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def refresh():
+        try:
+            _flight.do(key, lambda: _fetch_and_cache(key, url, headers, ttl, stale_value, endpoint))
+        except Exception as e:
+            # Keep serving the stale value until a refresh succeeds
+            print(f"Error refreshing {url}: {str(e)}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    _refresh_executor.submit(refresh)
+
+def configure_disk_cache(path, max_bytes=None):
+    """
+    Use a disk cache at the given path, or disable it when path is empty.
+    """
+    global _disk_cache, _disk_cache_configured
+    with _session_lock:
+        _disk_cache = DiskCache(path, max_bytes or HTTP_CACHE_MAX_BYTES) if path else None
+        _disk_cache_configured = True
+    return _disk_cache
+
+def get_disk_cache():
+    """
+    Get the persistent response cache, opening HTTP_CACHE_PATH on first use.
+    """
+    if not _disk_cache_configured:
+        configure_disk_cache(HTTP_CACHE_PATH)
+    return _disk_cache
+
+def get_circuit_breaker(endpoint):
+    """
+    Get the circuit breaker for an endpoint, creating it on first use.
+    """
+    name = endpoint or "default"
+    with _session_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT)
+            _breakers[name] = breaker
+    return breaker
+
+def reset_circuit_breakers():
+    """
+    Forget every circuit breaker, closing all circuits.
+    """
+    with _session_lock:
+        _breakers.clear()
+
+def configure_rate_limiter(path, max_wait=None):
+    """
+    Use a rate limiter whose state is stored at the given path, or disable it when path is empty.
+    """
+    global _rate_limiter, _rate_limiter_configured
+    with _session_lock:
+        if path:
+            _rate_limiter = TokenBucketLimiter(
+                path,
+                ENDPOINT_BUDGETS,
+                default_budget=ENDPOINT_BUDGETS["default"],
+                max_wait=RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+            )
+        else:
+            _rate_limiter = None
+        _rate_limiter_configured = True
+    return _rate_limiter
+
+def get_rate_limiter():
+    """
+    Get the shared rate limiter, opening RATE_LIMIT_PATH on first use.
+    """
+    if not _rate_limiter_configured:
+        configure_rate_limiter(RATE_LIMIT_PATH)
+    return _rate_limiter
+
+def clear_cache():
+    """
+    Drop every cached response.
+    """
+    _cache.invalidate()
+
+def invalidate_endpoint(endpoint):
+    """
+    Drop an endpoint's cached responses from memory and from the disk cache,
+    so its next call downloads a fresh response.
+    """
+    keys = _cache.invalidate(tag=endpoint)
+    if _disk_cache is not None:
+        for key in keys:
+            _disk_cache.delete(key)
+
+def cache_stats():
+    """
+    Get the response cache size and hit counters.
+    """
+    return _cache.stats()
+
+def single_flight_stats():
+    """
+    Get how many upstream calls ran and how many were saved by sharing an in-flight call.
+    """
+    return _flight.stats()
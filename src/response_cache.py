@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache:
+    """
+    Bounded in-memory cache of parsed API responses.
+    Each entry expires after its own TTL. Expired entries are still handed out
+    as stale for up to max_stale seconds so callers can serve them while a
+    refresh runs. The least recently used entry is evicted once max_entries is reached.
+    Entries can carry a tag (e.g. their API endpoint) to invalidate them as a group.
+    """
+
+    def __init__(self, max_entries=256, max_stale=3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, tag)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Look up a key. Returns (value, is_fresh), or None on a miss.
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, _ = entry
+            if now >= expires_at + self.max_stale:
+                # Too old to serve even as stale
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if now < expires_at:
+                self.hits += 1
+                return value, True
+            self.stale_hits += 1
+            return value, False
+
+    def set(self, key, value, ttl, tag=None):
+        """
+        Store a value that stays fresh for ttl seconds.
+        """
+        with self._lock:
+            self._entries[key] = (value, self._clock() + ttl, tag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None, tag=None):
+        """
+        Drop one entry, every entry with the given tag, or every entry when
+        neither is given. Returns the keys dropped.
+        """
+        with self._lock:
+            if key is not None:
+                keys = [key] if key in self._entries else []
+            elif tag is not None:
+                keys = [key for key, (_, _, entry_tag) in self._entries.items() if entry_tag == tag]
+            else:
+                keys = list(self._entries)
+            for key in keys:
+                del self._entries[key]
+        return keys
+
+    def stats(self):
+        """
+        Get the cache size and hit counters.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,72 @@
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+class _Call:
+    """An in-flight call that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+    While a call for a key is running, later callers with that key wait for it
+    and receive the same result (or exception). Shared results must be treated
+    as read-only by callers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0  # Calls that actually ran
+        self.shared = 0    # Calls that reused an in-flight result
+
+    def do(self, key, fn):
+        """
+        Run fn() for the key, or wait for the call already in flight for it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def stats(self):
+        """
+        Get the number of executed and shared calls so far.
+        """
+        with self._lock:
+            return {"executed": self.executed, "shared": self.shared}
+
+def normalize_url(url):
+    """
+    Normalize a URL so equivalent requests share a key: lower-case scheme and host,
+    sorted query parameters and no fragment.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
@@ -0,0 +1,58 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from sqlalchemy import create_engine
+import data_fetcher
+import database
+import http_client
+from tests.stub_server import StubCoinGecko
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Runs each test against its own SQLite database in a temporary directory.
+    """
+    # Set to False to start from an empty database file
+    create_schema = True
+
+    def make_engine(self, url):
+        return create_engine(url)
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, 'crypto_exchange.db')
+        self._engine = database.set_engine(self.make_engine(f"sqlite:///{self.db_path}"))
+        if self.create_schema:
+            database.create_tables()
+
+    def tearDown(self):
+        database.stop_query_stats()
+        database.set_engine(self._engine).dispose()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+class StubApiTestCase(DatabaseTestCase):
+    """
+    DatabaseTestCase with data_fetcher pointed at a stub CoinGecko server and
+    the HTTP client's caches, rate limiter and circuit breakers reset.
+    """
+    def setUp(self):
+        super().setUp()
+        self.stub = StubCoinGecko().__enter__()
+        http_client.configure_disk_cache(None)
+        http_client.configure_rate_limiter(None)
+        http_client.reset_circuit_breakers()
+        self._base_url = data_fetcher.API_BASE_URL
+        data_fetcher.API_BASE_URL = self.stub.url
+        http_client.clear_cache()
+
+    def tearDown(self):
+        data_fetcher.API_BASE_URL = self._base_url
+        http_client.clear_cache()
+        http_client.reset_circuit_breakers()
+        self.stub.__exit__()
+        super().tearDown()
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Canned CoinGecko payloads served by the stub
+GLOBAL_PAYLOAD = {
+    "data": {
+        "total_market_cap": {"usd": 1000.0},
+        "total_volume": {"usd": 100.0},
+        "market_cap_percentage": {"btc": 60.0, "eth": 20.0},
+        "market_cap_change_percentage_24h_usd": 1.5
+    }
+}
+
+def market_chart_range(query):
+    """Hourly market_chart/range points between the from and to query times."""
+    first = -(-int(query["from"]) // 3600) * 3600
+    hours = range(first, int(query["to"]) + 1, 3600)
+    return {
+        "prices": [[hour * 1000, 1.0] for hour in hours],
+        "market_caps": [[hour * 1000, 10.0] for hour in hours],
+        "total_volumes": [[hour * 1000, 5.0] for hour in hours]
+    }
+
+PRICES_PAYLOAD = {"bitcoin": {"usd": 1.0, "usd_24h_change": 0.5}}
+
+MARKETS_PAYLOAD = [
+    {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin", "market_cap_rank": 1, "current_price": 1.0, "market_cap": 100.0},
+    {"id": "ethereum", "symbol": "eth", "name": "Ethereum", "market_cap_rank": 2, "current_price": 0.5, "market_cap": 50.0}
+]
+
+def markets_page(query):
+    """The two stub coins on page 1 of /coins/markets, nothing after it."""
+    return MARKETS_PAYLOAD if query.get("page", "1") == "1" else []
+
+NEWS_PAYLOAD = [{"title": "Stub headline", "description": "Stub", "url": "#", "published_at": "2024-01-01"}]
+
+
+class StubCoinGecko:
+    """
+    Local HTTP server that mimics the CoinGecko endpoints used by data_fetcher.
+    Each route can be given a status code and an artificial delay. A route's
+    payload may be a callable taking the query parameters, for paged endpoints.
+    """
+
+    def __init__(self):
+        self.routes = {
+            "/global": [200, GLOBAL_PAYLOAD, 0],
+            "/coins/bitcoin/market_chart/range": [200, market_chart_range, 0],
+            "/simple/price": [200, PRICES_PAYLOAD, 0],
+            "/coins/markets": [200, markets_page, 0],
+            "/news": [200, NEWS_PAYLOAD, 0]
+        }
+        self.requests = []
+        self.queued = {}
+        self.clients = []
+        self.statuses = {}
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                path = parts.path
+                with stub._lock:
+                    stub.requests.append((self.path, dict(self.headers)))
+                    stub.clients.append(self.client_address)
+                    queued = stub.queued.get(path)
+                    queued_status, extra_headers = queued.pop(0) if queued else (None, {})
+                route = stub.routes.get(path)
+                if queued_status is not None:
+                    status, payload, delay = queued_status, {"error": "queued"}, 0
+                elif route is None:
+                    status, payload, delay = 404, {"error": "not found"}, 0
+                else:
+                    status, payload, delay = route
+                if callable(payload):
+                    payload = payload({k: v[0] for k, v in parse_qs(parts.query).items()})
+                if delay:
+                    time.sleep(delay)
+                body = json.dumps(payload).encode("utf-8")
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+
+                # Answer conditional requests for unchanged bodies with 304
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    status, body = 304, b""
+
+                with stub._lock:
+                    stub.statuses[status] = stub.statuses.get(status, 0) + 1
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status in (200, 304):
+                    self.send_header("ETag", etag)
+                for name, value in extra_headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def set_route(self, path, status=200, payload=None, delay=0):
+        """Change the response for a route."""
+        if payload is None:
+            payload = self.routes[path][1]
+        self.routes[path] = [status, payload, delay]
+
+    def queue(self, path, *statuses, headers=None):
+        """Answer the next requests for a route with the given error statuses."""
+        with self._lock:
+            self.queued.setdefault(path, []).extend((status, headers or {}) for status in statuses)
+
+    def status_counts(self):
+        """Get the number of requests answered with each status code."""
+        with self._lock:
+            return dict(self.statuses)
+
+    def count(self, path):
+        """Count the requests received for a route."""
+        with self._lock:
+            return sum(1 for p, _ in self.requests if urlsplit(p).path == path)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
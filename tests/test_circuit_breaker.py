@@ -0,0 +1,77 @@
+import sys
+import os
+import unittest
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("prices", failure_threshold=2, recovery_timeout=30, clock=self.clock)
+
+    def _fail(self, times):
+        for _ in range(times):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        """The circuit opens once the failure threshold is reached"""
+        self._fail(1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self._fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_success_resets_the_failure_count(self):
+        """Only consecutive failures count"""
+        self._fail(1)
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self._fail(1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_allows_one_trial_call(self):
+        """After the recovery timeout a single trial call is let through"""
+        self._fail(2)
+        self.clock.now = 31
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_trial_reopens(self):
+        """A failing trial call opens the circuit for another recovery timeout"""
+        self._fail(2)
+        self.clock.now = 31
+        self._fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now = 60
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now = 62
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+    def test_release_frees_the_trial_slot(self):
+        """A trial call that never reached the upstream does not block the next one"""
+        self._fail(2)
+        self.clock.now = 31
+        self.breaker.before_call()
+        self.breaker.release()
+        self.breaker.before_call()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import sys
+import os
+import io
+import unittest
+from contextlib import redirect_stdout
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import streamlit as st
+import dashboard_cache
+import data_fetcher
+import database
+import exchange_metrics
+import http_client
+from tests.fixtures import DatabaseTestCase
+
+class TestDashboardCache(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        with redirect_stdout(io.StringIO()):
+            database.init_db_with_exchange_data(exchange_metrics.generate_synthetic_exchange_data(["Alpha", "Beta"], rng=0))
+            database.store_crypto_prices({"bitcoin": {"usd": 42.0, "usd_24h_change": 1.0}})
+            database.store_news_items([dict(item, title=f"Live {item['title']}") for item in data_fetcher.get_sample_news()])
+            database.store_global_stats(dict(data_fetcher.get_sample_global_data(), total_market_cap=1000.0))
+            database.store_chart_history(data_fetcher.get_sample_chart_history())
+
+        http_client.set_offline_mode(True)
+        st.cache_data.clear()
+
+    def tearDown(self):
+        st.cache_data.clear()
+        http_client.set_offline_mode(False)
+        super().tearDown()
+
+    def load(self):
+        """(exchange_data, dashboard bundle, tables read) of one dashboard rerun."""
+        stats = database.start_query_stats()
+        versions = database.get_data_versions()
+        exchange_data, _ = dashboard_cache.get_exchange_data(versions)
+        bundle = dashboard_cache.get_dashboard_data(versions)
+        database.stop_query_stats()
+        tables = {statement["statement"].split(" FROM ")[1].split()[0] for statement in stats.summary(top=100)["top"]}
+        return exchange_data, bundle, tables - {"exchange_aggregates)"}
+
+    def test_named_sources_are_loaded_alone(self):
+        """load_dashboard_data can load a subset of the sources"""
+        bundle = data_fetcher.load_dashboard_data(["prices"])
+
+        self.assertEqual(bundle["status"], {"prices": "ok"})
+        self.assertEqual(bundle["prices"]["bitcoin"]["usd"], 42.0)
+        self.assertNotIn("news", bundle)
+
+    def test_reruns_are_served_from_the_cache(self):
+        """Only the data version query runs once every dataset is cached"""
+        exchange_data, bundle, tables = self.load()
+        self.assertIn("monthly_data", tables)
+        self.assertEqual(set(bundle["status"].values()), {"ok"})
+
+        cached_exchange_data, cached_bundle, tables = self.load()
+        self.assertEqual(tables, set())
+        self.assertEqual(cached_exchange_data, exchange_data)
+        self.assertEqual(cached_bundle["prices"], bundle["prices"])
+
+    def test_written_datasets_are_reloaded(self):
+        """A write changes the dataset's data version, so only that dataset is read again"""
+        self.load()
+        with redirect_stdout(io.StringIO()):
+            database.store_crypto_prices({"bitcoin": {"usd": 43.0, "usd_24h_change": 1.0}})
+
+        _, bundle, tables = self.load()
+        self.assertEqual(tables, {"crypto_prices"})
+        self.assertEqual(bundle["prices"]["bitcoin"]["usd"], 43.0)
+
+    def test_clear_datasets(self):
+        """Only the datasets cleared are read again"""
+        self.load()
+        dashboard_cache.clear_datasets(["exchange_data", "news"])
+
+        _, _, tables = self.load()
+        self.assertEqual(tables, {"exchanges", "monthly_data", "yearly_data", "fee_structures", "exchange_aggregates", "news_items"})
+
+    def test_clear_datasets_drops_cached_responses(self):
+        """Cleared datasets are fetched again instead of served from the HTTP cache"""
+        invalidated = []
+        invalidate_endpoint = http_client.invalidate_endpoint
+        http_client.invalidate_endpoint = invalidated.append
+        try:
+            dashboard_cache.clear_datasets(["exchange_data", "global_data", "news"])
+        finally:
+            http_client.invalidate_endpoint = invalidate_endpoint
+
+        self.assertEqual(invalidated, ["global", "news"])
+
+    def test_fallback_data_is_not_kept(self):
+        """Sources showing sample data are loaded again on the next rerun"""
+        with database.engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM news_items")
+        self.load()
+
+        _, bundle, tables = self.load()
+        self.assertEqual(bundle["status"]["news"], "sample")
+        self.assertEqual(tables, {"news_items"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,287 @@
+import sys
+import os
+import time
+import unittest
+import datetime as dt
+from urllib.parse import urlsplit, parse_qs
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import pandas as pd
+from sqlalchemy import func, select
+import data_fetcher
+import database
+import http_client
+from tests.fixtures import StubApiTestCase
+
+class TestFetchDashboardData(StubApiTestCase):
+    def test_sources_are_fetched_concurrently(self):
+        """All sources are requested at once, so latency does not add up"""
+        for path in list(self.stub.routes):
+            self.stub.set_route(path, delay=0.5)
+
+        start = time.monotonic()
+        bundle = data_fetcher.fetch_dashboard_data(deadline=5)
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(set(bundle["status"].values()), {"ok"})
+        self.assertEqual(bundle["global_data"]["total_market_cap"], 1000.0)
+        self.assertEqual(bundle["prices"], {"bitcoin": {"usd": 1.0, "usd_24h_change": 0.5}})
+        self.assertEqual(bundle["news"][0]["title"], "Stub headline")
+        self.assertEqual(set(bundle["chart_history"]["market_cap_history"]["value"]), {10.0})
+
+    def test_slow_source_falls_back_at_deadline(self):
+        """A source that misses the deadline is replaced by its fallback data"""
+        self.stub.set_route("/news", delay=3)
+
+        start = time.monotonic()
+        bundle = data_fetcher.fetch_dashboard_data(deadline=0.5)
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(bundle["status"]["news"], "sample")
+        self.assertIn("timed out", bundle["errors"]["news"])
+        self.assertEqual(bundle["news"], data_fetcher.get_sample_news())
+        self.assertEqual(bundle["status"]["prices"], "ok")
+
+    def test_failing_source_falls_back(self):
+        """A fetcher that raises is replaced by its fallback data"""
+        def broken():
+            raise RuntimeError("boom")
+
+        sources = data_fetcher.get_dashboard_sources()
+        sources["prices"] = (broken, database.get_latest_crypto_prices, data_fetcher.get_sample_prices)
+        bundle = data_fetcher.fetch_dashboard_data(deadline=5, sources=sources)
+
+        self.assertEqual(bundle["status"]["prices"], "sample")
+        self.assertEqual(bundle["errors"]["prices"], "boom")
+        self.assertEqual(bundle["prices"], data_fetcher.get_sample_prices())
+
+    def test_failing_source_serves_last_known_good_data(self):
+        """Stored values are preferred over sample data and flagged as stale"""
+        database.store_crypto_prices({"bitcoin": {"usd": 42.0, "usd_24h_change": 1.0}})
+        self.stub.set_route("/simple/price", status=404)
+
+        bundle = data_fetcher.fetch_dashboard_data(deadline=5)
+
+        self.assertEqual(bundle["status"]["prices"], "stale")
+        self.assertEqual(bundle["prices"], {"bitcoin": {"usd": 42.0, "usd_24h_change": 1.0}})
+        self.assertEqual(bundle["status"]["global_data"], "ok")
+
+    def test_fetcher_queries_are_collected(self):
+        """Queries made on the fetch threads count towards the caller's query stats"""
+        sources = {"prices": (database.get_latest_crypto_prices, database.get_latest_crypto_prices, data_fetcher.get_sample_prices)}
+        stats = database.start_query_stats()
+        data_fetcher.fetch_dashboard_data(deadline=5, sources=sources)
+
+        self.assertIs(database.stop_query_stats(), stats)
+        self.assertEqual(stats.summary()["queries"], 1)
+
+    def test_stored_sample_data_is_not_stale_data(self):
+        """Sample data found in the database is still labelled as sample data"""
+        database.store_news_items(data_fetcher.get_sample_news())
+        self.stub.set_route("/news", status=404)
+
+        bundle = data_fetcher.fetch_dashboard_data(deadline=5)
+
+        self.assertEqual(bundle["status"]["news"], "sample")
+
+    def test_unreadable_database_falls_back_to_sample_data(self):
+        """An error reading the stored values does not escape the fetch"""
+        def broken(fallback=False):
+            raise RuntimeError("boom")
+
+        def unreadable():
+            raise RuntimeError("database is locked")
+
+        sources = data_fetcher.get_dashboard_sources()
+        sources["prices"] = (broken, unreadable, data_fetcher.get_sample_prices)
+        bundle = data_fetcher.fetch_dashboard_data(deadline=5, sources=sources)
+
+        self.assertEqual(bundle["status"]["prices"], "sample")
+        self.assertEqual(bundle["prices"], data_fetcher.get_sample_prices())
+
+    def test_open_circuit_fails_fast(self):
+        """Once an endpoint's circuit opens, renders stop waiting on it"""
+        self.stub.set_route("/news", status=503, delay=0.2)
+        retries = http_client.MAX_RETRIES
+        http_client.MAX_RETRIES = 0
+        try:
+            for _ in range(http_client.CIRCUIT_FAILURE_THRESHOLD):
+                data_fetcher.fetch_dashboard_data(deadline=5)
+            calls = self.stub.count("/news")
+
+            start = time.monotonic()
+            bundle = data_fetcher.fetch_dashboard_data(deadline=5)
+            elapsed = time.monotonic() - start
+        finally:
+            http_client.MAX_RETRIES = retries
+
+        self.assertEqual(self.stub.count("/news"), calls)
+        self.assertLess(elapsed, 0.2)
+        self.assertIn("open", bundle["errors"]["news"])
+        self.assertEqual(bundle["status"]["news"], "sample")
+
+class TestFetchGlobalChartHistory(StubApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.range_path = "/coins/bitcoin/market_chart/range"
+
+    def range_queries(self):
+        return [parse_qs(urlsplit(path).query) for path, _ in self.stub.requests if urlsplit(path).path == self.range_path]
+
+    def test_history_is_downloaded_once(self):
+        """The window is fetched once and then served from the database"""
+        history = data_fetcher.fetch_global_chart_history()
+        again = data_fetcher.fetch_global_chart_history()
+
+        self.assertEqual(self.stub.count(self.range_path), 1)
+        self.assertEqual(len(history["market_cap_history"]), 90 * 24)
+        self.assertEqual(set(history["volume_history"]["value"]), {5.0})
+        self.assertEqual(len(again["market_cap_history"]), len(history["market_cap_history"]))
+
+    def test_only_new_range_is_fetched(self):
+        """Later runs ask only for the time since the last covered range"""
+        now = dt.datetime(2024, 1, 10, 12, 30)
+        data_fetcher.backfill_chart_history(days=2, now=now)
+        data_fetcher.backfill_chart_history(days=2, now=now + dt.timedelta(hours=5))
+
+        queries = self.range_queries()
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(int(queries[1]["from"][0]), int(now.replace(tzinfo=dt.timezone.utc).timestamp()))
+        timestamps = list(database.get_chart_history()["market_cap_history"]["timestamp"])
+        self.assertEqual(len(timestamps), len(set(timestamps)))
+        self.assertEqual(len(timestamps), 2 * 24 + 5)
+        self.assertEqual(len(database.get_history_coverage()), 1)
+
+    def test_gaps_inside_the_window_are_found(self):
+        """Only the uncovered parts of the window are reported"""
+        day = dt.timedelta(days=1)
+        start = dt.datetime(2024, 1, 1)
+        coverage = [(start + day, start + 2 * day), (start + 4 * day, start + 6 * day)]
+
+        gaps = data_fetcher.find_history_gaps(coverage, start, start + 5 * day)
+
+        self.assertEqual(gaps, [(start, start + day), (start + 2 * day, start + 4 * day)])
+
+    def test_backfill_resumes_after_failure(self):
+        """Chunks stored before a failure are not fetched again"""
+        now = dt.datetime(2024, 3, 1)
+        # The newest chunk succeeds, the next one fails
+        self.stub.queue(self.range_path, None, 404)
+
+        with self.assertRaises(Exception):
+            data_fetcher.backfill_chart_history(days=30, now=now, chunk_days=10)
+        fetched = data_fetcher.backfill_chart_history(days=30, now=now, chunk_days=10)
+
+        self.assertEqual(fetched, 2)
+        self.assertEqual(self.stub.count(self.range_path), 4)
+        self.assertEqual(database.get_history_coverage(), [(now - dt.timedelta(days=30), now)])
+
+    def test_long_windows_read_from_storage(self):
+        """Years of stored history are read back by window without network calls"""
+        end = dt.datetime(2024, 1, 1)
+        start = end - dt.timedelta(days=3 * 365)
+        points = [(timestamp.to_pydatetime(), 10.0, 5.0) for timestamp in pd.date_range(start, end, freq="h")]
+        database.store_history_range(start, end, points)
+
+        begin = time.monotonic()
+        history = database.get_chart_history(start=end - dt.timedelta(days=2 * 365), end=end)
+        elapsed = time.monotonic() - begin
+
+        self.assertEqual(len(history["market_cap_history"]), 2 * 365 * 24 + 1)
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(len(self.stub.requests), 0)
+
+def market_pages(universe, delays=None):
+    """Build a paged /coins/markets payload over a universe of the given size."""
+    def payload(query):
+        page, per_page = int(query["page"]), int(query["per_page"])
+        if delays:
+            time.sleep(delays.get(page, 0))
+        start = (page - 1) * per_page
+        return [
+            {"id": f"coin-{rank}", "symbol": f"c{rank}", "name": f"Coin {rank}",
+             "market_cap_rank": rank, "current_price": 1.0, "market_cap": 1000.0 - rank}
+            for rank in range(start + 1, min(start + per_page, universe) + 1)
+        ]
+    return payload
+
+class TestMarketUniverse(StubApiTestCase):
+    def test_pages_stop_at_requested_size(self):
+        """Only the pages covering total_coins are requested, and extra rows are dropped"""
+        self.stub.set_route("/coins/markets", payload=market_pages(1000))
+
+        rows = list(data_fetcher.iter_market_data(total_coins=25, per_page=10))
+
+        self.assertEqual(sorted(row["market_cap_rank"] for row in rows), list(range(1, 26)))
+        self.assertEqual(self.stub.count("/coins/markets"), 3)
+
+    def test_short_page_ends_the_universe(self):
+        """A short page means there are no more coins to fetch"""
+        self.stub.set_route("/coins/markets", payload=market_pages(23))
+
+        rows = list(data_fetcher.iter_market_data(total_coins=100, per_page=10, concurrency=1))
+
+        self.assertEqual(len(rows), 23)
+        self.assertEqual(self.stub.count("/coins/markets"), 3)
+
+    def test_rows_stream_before_slow_pages_finish(self):
+        """Rows from fast pages are yielded while a slow page is still in flight"""
+        self.stub.set_route("/coins/markets", payload=market_pages(30, delays={1: 1.0}))
+
+        start = time.monotonic()
+        rows = data_fetcher.iter_market_data(total_coins=30, per_page=10, concurrency=3)
+        first = next(rows)
+        elapsed = time.monotonic() - start
+        rest = list(rows)
+
+        self.assertLess(elapsed, 0.8)
+        self.assertGreater(first["market_cap_rank"], 10)
+        self.assertEqual(len(rest), 29)
+
+    def staged_rows(self):
+        with database.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(database.CoinMarketStaging.__table__)).scalar()
+
+    def test_universe_is_stored_as_snapshot(self):
+        """All rows are written to the coin market table, replacing the old snapshot"""
+        self.stub.set_route("/coins/markets", payload=market_pages(2500))
+        database.store_coin_markets([{"id": "old", "symbol": "old", "name": "Old"}])
+
+        stored = data_fetcher.fetch_market_universe(total_coins=2500)
+        coins = database.get_coin_markets()
+
+        self.assertEqual(stored, 2500)
+        self.assertEqual(len(coins), 2500)
+        self.assertEqual(self.staged_rows(), 0)
+        self.assertEqual(coins[0]["id"], "coin-1")
+
+    def test_fetch_does_not_hold_the_write_lock(self):
+        """Other writers are not blocked while the pages are still being fetched"""
+        written = []
+
+        def rows():
+            yield {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin", "market_cap_rank": 1}
+            written.append(database.store_crypto_prices({"bitcoin": {"usd": 42.0, "usd_24h_change": 1.0}}))
+            yield {"id": "ethereum", "symbol": "eth", "name": "Ethereum", "market_cap_rank": 2}
+
+        self.assertEqual(database.store_coin_markets(rows()), 2)
+        self.assertEqual(written, [True])
+
+    def test_failed_page_keeps_previous_snapshot(self):
+        """A page error rolls back the whole snapshot"""
+        self.stub.set_route("/coins/markets", payload=market_pages(100))
+        database.store_coin_markets([{"id": "old", "symbol": "old", "name": "Old", "market_cap_rank": 1}])
+        self.stub.queue("/coins/markets", 404)
+
+        stored = data_fetcher.fetch_market_universe(total_coins=100)
+
+        self.assertIs(stored, False)
+        self.assertEqual([coin["id"] for coin in database.get_coin_markets()], ["old"])
+        self.assertEqual(self.staged_rows(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import os
+import datetime as dt
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import numpy as np
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from sqlalchemy import create_engine, func, select
+import database
+import data_generator
+
+class TestSyntheticDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmpdir, 'fixture.db')}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def make_dataset(self, **kwargs):
+        params = dict(exchanges=25, months=3, years=4, tiers=3, ticks_per_day=2,
+                      seed=7, end_date=dt.date(2024, 3, 10), chunk_size=10)
+        params.update(kwargs)
+        return data_generator.SyntheticDataset(**params)
+
+    def test_database_rows_match_table_sizes(self):
+        """Streaming into the database writes every row of every table"""
+        dataset = self.make_dataset()
+
+        counts = data_generator.write_database(dataset, self.engine, batch_size=100)
+
+        self.assertEqual(counts, dataset.table_sizes())
+        # January and February in full plus ten days of March
+        self.assertEqual(counts["daily_data"], 25 * (31 + 29 + 10))
+        with self.engine.connect() as conn:
+            for name, size in counts.items():
+                table = database.Base.metadata.tables[name]
+                self.assertEqual(conn.execute(select(func.count()).select_from(table)).scalar(), size)
+
+    def test_same_seed_gives_same_data(self):
+        """The same parameters and seed give the same dataset"""
+        first = os.path.join(self.tmpdir, "first")
+        second = os.path.join(self.tmpdir, "second")
+
+        data_generator.write_columnar(self.make_dataset(), first)
+        data_generator.write_columnar(self.make_dataset(), second)
+
+        for column in ("volume", "commission", "date"):
+            np.testing.assert_array_equal(
+                np.load(os.path.join(first, "daily_data", f"{column}.npy")),
+                np.load(os.path.join(second, "daily_data", f"{column}.npy"))
+            )
+
+    def test_monthly_rows_sum_their_days(self):
+        """Monthly volumes are rollups of the generated daily volumes"""
+        path = os.path.join(self.tmpdir, "columns")
+        data_generator.write_columnar(self.make_dataset(ticks_per_day=0), path)
+
+        daily = np.load(os.path.join(path, "daily_data", "volume.npy"), mmap_mode="r")
+        monthly = np.load(os.path.join(path, "monthly_data", "volume.npy"), mmap_mode="r")
+        months = np.load(os.path.join(path, "monthly_data", "month_date.npy"))
+
+        self.assertEqual(list(months[:3]), ["2024-01", "2024-02", "2024-03"])
+        self.assertAlmostEqual(monthly[0], daily[:31].sum(), places=1)
+        self.assertAlmostEqual(monthly[2], daily[60:70].sum(), places=1)
+        self.assertFalse(os.path.exists(os.path.join(path, "trade_ticks")))
+
+    def test_cli_writes_standard_fixture(self):
+        """The CLI produces the 1x fixture the dashboard can read"""
+        db_path = os.path.join(self.tmpdir, "cli.db")
+
+        with redirect_stdout(io.StringIO()):
+            data_generator.main(["--scale", "1x", "--months", "2", "--db", db_path, "--end-date", "2024-02-29"])
+
+        original = database.set_engine(create_engine(f"sqlite:///{db_path}"))
+        try:
+            exchange_data = database.get_all_exchange_data()
+        finally:
+            database.set_engine(original).dispose()
+
+        self.assertEqual(len(exchange_data), 9)
+        self.assertEqual(exchange_data["Binance"]["monthly_dates"], ["2024-01", "2024-02"])
+        self.assertEqual(len(exchange_data["Binance"]["vip_tiers"]), 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,585 @@
+import sys
+import os
+import contextvars
+import datetime as dt
+import io
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from sqlalchemy import delete, event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateTable
+import database
+import data_generator
+import exchange_metrics
+from tests.fixtures import DatabaseTestCase
+
+class TestGetAllExchangeData(DatabaseTestCase):
+    def count_queries(self, fn):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(database.engine, "before_cursor_execute", listener)
+        try:
+            result = fn()
+        finally:
+            event.remove(database.engine, "before_cursor_execute", listener)
+        return result, len(statements)
+
+    def test_query_count_does_not_grow_with_exchanges(self):
+        """Reading 5 or 50 exchanges takes the same number of queries"""
+        counts = []
+        for size in (5, 50):
+            dataset = data_generator.SyntheticDataset(exchanges=size, months=2, end_date=dt.date(2024, 2, 29))
+            data_generator.write_database(dataset, database.engine)
+            result, queries = self.count_queries(database.get_all_exchange_data)
+            self.assertEqual(len(result), size)
+            counts.append(queries)
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[1], 4)
+
+    def test_round_trips_init_data(self):
+        """Data stored by init_db_with_exchange_data reads back in the same format, ordered"""
+        exchange_data = data_generator.generate_exchange_data(rng=1)
+        database.init_db_with_exchange_data(exchange_data)
+
+        result = database.get_all_exchange_data()
+
+        self.assertEqual(list(result), list(exchange_data))
+        for name, data in exchange_data.items():
+            self.assertEqual(result[name]["monthly_dates"], sorted(data["monthly_dates"]))
+            self.assertEqual(result[name]["yearly_volume"], data["yearly_volume"])
+            self.assertEqual(result[name]["vip_tiers"], data["vip_tiers"])
+            self.assertEqual(result[name]["taker_fees"], data["taker_fees"])
+
+class TestInitDbWithExchangeData(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exchange_data = exchange_metrics.generate_synthetic_exchange_data(
+            [f"Exchange {i}" for i in range(40)], rng=2
+        )
+
+    def test_loads_every_row_in_batches(self):
+        """All rows are inserted, one transaction per batch, and the rate is reported"""
+        commits = []
+        event.listen(database.engine, "commit", lambda conn: commits.append(1))
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            count = database.init_db_with_exchange_data(self.exchange_data, batch_size=100)
+
+        # 40 exchanges with 12 months, 8 years and 6 fee tiers each
+        self.assertEqual(count, 40 * (1 + 12 + 8 + 6))
+        self.assertIn("rows/s", output.getvalue())
+        # Exchanges, then 480 monthly, 320 yearly and 240 fee rows in batches of 100, then the aggregates
+        self.assertEqual(len(commits), 1 + 5 + 4 + 3 + 1)
+        self.assertEqual(database.get_all_exchange_data(), self.exchange_data)
+
+    def test_existing_data_is_kept(self):
+        """A second load is skipped"""
+        with redirect_stdout(io.StringIO()):
+            database.init_db_with_exchange_data(self.exchange_data)
+            count = database.init_db_with_exchange_data(self.exchange_data)
+
+        self.assertEqual(count, 0)
+        self.assertEqual(len(database.get_all_exchange_data()), 40)
+
+    def test_refresh_writes_only_changed_rows(self):
+        """A refresh inserts new rows, updates changed ones and leaves the rest untouched"""
+        with redirect_stdout(io.StringIO()):
+            database.init_db_with_exchange_data(self.exchange_data)
+        with database.engine.connect() as conn:
+            stamps = dict(conn.exec_driver_sql("SELECT id, updated_at FROM monthly_data").all())
+
+        data = self.exchange_data["Exchange 3"]
+        data["monthly_volume"][0] += 1.0
+        data["taker_fees"][2] = 0.5
+        # Period labels are shared between exchanges, so extend copies
+        for key, value in (("monthly_dates", "2999-01"), ("monthly_volume", 1.0), ("monthly_commission", 0.1)):
+            data[key] = data[key] + [value]
+        with redirect_stdout(io.StringIO()):
+            count = database.refresh_exchange_data(self.exchange_data)
+            unchanged = database.init_db_with_exchange_data(self.exchange_data)
+
+        self.assertEqual(count, 3)
+        self.assertEqual(unchanged, 0)
+        self.assertEqual(database.get_all_exchange_data(), self.exchange_data)
+        with database.engine.connect() as conn:
+            touched = [row_id for row_id, stamp in conn.exec_driver_sql("SELECT id, updated_at FROM monthly_data").all()
+                       if stamps.get(row_id) != stamp]
+        self.assertEqual(len(touched), 2)
+
+    def test_refresh_of_some_periods_keeps_the_rest(self):
+        """A partial refresh adds new exchanges and keeps periods it does not mention"""
+        with redirect_stdout(io.StringIO()):
+            database.init_db_with_exchange_data(self.exchange_data)
+            latest = {
+                name: {key: values[-1:] for key, values in data.items()}
+                for name, data in self.exchange_data.items() if name in ("Exchange 0", "Exchange 2")
+            }
+            latest["Exchange 2"]["monthly_volume"] = [latest["Exchange 2"]["monthly_volume"][0] * 2]
+            latest["New Exchange"] = latest["Exchange 0"]
+            count = database.refresh_exchange_data(latest)
+
+        result = database.get_all_exchange_data()
+        self.assertEqual(count, 1 + 1 + 3)
+        self.assertEqual(len(result), 41)
+        self.assertEqual(result["Exchange 0"], self.exchange_data["Exchange 0"])
+        self.assertEqual(len(result["Exchange 2"]["monthly_volume"]), 12)
+
+    def test_refresh_lookups_stay_under_the_parameter_limit(self):
+        """Stored rows are looked up per batch of exchanges, each query under LOOKUP_BATCH_SIZE parameters"""
+        with redirect_stdout(io.StringIO()):
+            database.init_db_with_exchange_data(self.exchange_data)
+        self.exchange_data["Exchange 39"]["monthly_volume"][0] += 1.0
+
+        lookups = []
+        listener = lambda *args: lookups.append(args[3]) if args[2].startswith("SELECT") else None
+        event.listen(database.engine, "before_cursor_execute", listener)
+        batch_size = database.LOOKUP_BATCH_SIZE
+        database.LOOKUP_BATCH_SIZE = 16
+        try:
+            with redirect_stdout(io.StringIO()):
+                count = database.refresh_exchange_data(self.exchange_data)
+        finally:
+            database.LOOKUP_BATCH_SIZE = batch_size
+            event.remove(database.engine, "before_cursor_execute", listener)
+
+        self.assertEqual(count, 1)
+        self.assertEqual(database.get_all_exchange_data(), self.exchange_data)
+        self.assertGreater(len(lookups), 3)
+        self.assertLessEqual(max(len(parameters) for parameters in lookups), 16)
+
+    def test_aggregates_are_maintained_on_write(self):
+        """Loading and refreshing keep the aggregates in step, and they are read in one query"""
+        with redirect_stdout(io.StringIO()):
+            database.init_db_with_exchange_data(self.exchange_data)
+            data = self.exchange_data["Exchange 7"]
+            data["yearly_volume"] = [volume * 1000 for volume in data["yearly_volume"]]
+            database.refresh_exchange_data(self.exchange_data)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(database.engine, "before_cursor_execute", listener)
+        try:
+            aggregates = database.get_exchange_aggregates()
+        finally:
+            event.remove(database.engine, "before_cursor_execute", listener)
+
+        expected = exchange_metrics.compute_exchange_aggregates(exchange_metrics.get_exchange_totals(self.exchange_data))
+        self.assertEqual(len(statements), 1)
+        pd.testing.assert_frame_equal(aggregates, expected, check_dtype=False)
+        yearly = aggregates[aggregates["timeframe"] == "Yearly"].set_index("exchange")
+        self.assertEqual(yearly.loc["Exchange 7", "volume_rank"], 1)
+
+    def test_failed_load_is_rolled_back(self):
+        """A failing batch removes the rows of earlier batches"""
+        self.exchange_data["Exchange 39"]["yearly_volume"][0] = None
+
+        with redirect_stdout(io.StringIO()):
+            count = database.init_db_with_exchange_data(self.exchange_data, batch_size=100)
+
+        self.assertEqual(count, 0)
+        self.assertEqual(database.get_all_exchange_data(), {})
+
+class TestEngineAndSessions(DatabaseTestCase):
+    def make_engine(self, url):
+        return database.create_database_engine(url)
+
+    def test_pool_settings_come_from_the_environment(self):
+        """Pool size, overflow and pre-ping are applied to file databases"""
+        engine = database.create_database_engine(f"sqlite:///{os.path.join(self.tmpdir, 'pool.db')}")
+        memory_engine = database.create_database_engine("sqlite://")
+
+        self.assertEqual(engine.pool.size(), database.DB_POOL_SIZE)
+        self.assertEqual(engine.pool._max_overflow, database.DB_MAX_OVERFLOW)
+        self.assertEqual(engine.pool._pre_ping, database.DB_POOL_PRE_PING)
+        self.assertNotIsInstance(memory_engine.pool, type(engine.pool))
+        engine.dispose()
+        memory_engine.dispose()
+
+    def test_sessions_are_scoped_to_threads(self):
+        """A thread reuses its session; other threads get their own"""
+        main_session = database.get_session()
+        other = []
+        thread = threading.Thread(target=lambda: other.append(database.get_session()))
+        thread.start()
+        thread.join()
+
+        self.assertIs(database.get_session(), main_session)
+        self.assertIsNot(other[0], main_session)
+
+    def test_session_scope_commits_or_rolls_back(self):
+        """Work in the block is committed on success and discarded on error"""
+        with database.session_scope() as session:
+            session.add(database.NewsItem(title="Kept", description="", url="#", published_at="2024-01-01"))
+
+        with self.assertRaises(ValueError):
+            with database.session_scope() as session:
+                session.add(database.NewsItem(title="Dropped", description="", url="#", published_at="2024-01-01"))
+                raise ValueError("fail")
+
+        self.assertEqual([item["title"] for item in database.get_latest_news()], ["Kept"])
+
+    def test_concurrent_sessions_reuse_pooled_connections(self):
+        """Many threads reading at once never open more connections than the pool allows"""
+        database.store_crypto_prices({"bitcoin": {"usd": 1.0, "usd_24h_change": 0.5}})
+        connections = []
+        event.listen(database.engine, "connect", lambda *args: connections.append(1))
+        errors = []
+
+        def read():
+            try:
+                for _ in range(20):
+                    self.assertEqual(database.get_latest_crypto_prices()["bitcoin"]["usd"], 1.0)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                database.Session.remove()
+
+        threads = [threading.Thread(target=read) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(connections), database.DB_POOL_SIZE + database.DB_MAX_OVERFLOW)
+
+class TestSqlitePragmas(DatabaseTestCase):
+    def make_engine(self, url):
+        return database.create_database_engine(url)
+
+    def test_profile_is_applied_on_connect(self):
+        """Every pooled connection gets the pragma profile"""
+        with database.engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql("PRAGMA journal_mode").scalar(), "wal")
+            self.assertEqual(conn.exec_driver_sql("PRAGMA synchronous").scalar(), 1)  # NORMAL
+            self.assertEqual(conn.exec_driver_sql("PRAGMA temp_store").scalar(), 2)  # MEMORY
+            self.assertEqual(conn.exec_driver_sql("PRAGMA busy_timeout").scalar(), 5000)
+            self.assertEqual(conn.exec_driver_sql("PRAGMA cache_size").scalar(), -65536)
+
+    def test_writer_commits_during_open_read(self):
+        """A long dashboard read does not block the writer, and keeps its snapshot"""
+        database.store_crypto_prices({"bitcoin": {"usd": 1.0, "usd_24h_change": 0.5}})
+
+        with database.engine.connect() as reader:
+            reader.exec_driver_sql("BEGIN")
+            before = reader.exec_driver_sql("SELECT COUNT(*) FROM crypto_prices").scalar()
+
+            start = time.monotonic()
+            with database.engine.begin() as writer:
+                writer.exec_driver_sql(
+                    "INSERT INTO crypto_prices (crypto_id, name, symbol, price_usd, timestamp) "
+                    "VALUES ('ethereum', 'Ethereum', 'ETH', 2.0, '2024-01-01 00:00:00')"
+                )
+            elapsed = time.monotonic() - start
+
+            self.assertEqual(reader.exec_driver_sql("SELECT COUNT(*) FROM crypto_prices").scalar(), before)
+            reader.exec_driver_sql("COMMIT")
+
+        self.assertLess(elapsed, 1.0)
+
+    def test_readers_run_alongside_a_writer(self):
+        """One writer and many readers run together without "database is locked" errors"""
+        stop = threading.Event()
+        errors = []
+        latencies = []
+        writes = []
+
+        def write():
+            while not stop.is_set():
+                try:
+                    with database.session_scope() as session:
+                        for i in range(50):
+                            session.add(database.CryptoPrice(crypto_id=f"coin-{i}", name="Coin", symbol="C", price_usd=1.0))
+                    writes.append(1)
+                except Exception as e:
+                    errors.append(e)
+            database.Session.remove()
+
+        def read():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    with database.engine.connect() as conn:
+                        conn.exec_driver_sql("SELECT symbol, price_usd FROM crypto_prices ORDER BY id DESC LIMIT 10").all()
+                    latencies.append(time.perf_counter() - start)
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(1.0)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)]
+        self.assertEqual(errors, [])
+        self.assertGreater(len(writes), 0)
+        self.assertLess(p95, 0.5, f"p95 reader latency under write load: {p95 * 1000:.1f} ms")
+
+class TestSchemaMigrations(DatabaseTestCase):
+    create_schema = False
+
+    def explain(self, statement, parameters=()):
+        with database.engine.connect() as conn:
+            return " / ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+
+    def test_lookups_use_composite_indexes(self):
+        """Per-exchange and per-coin time range lookups search an index instead of scanning"""
+        database.create_tables()
+
+        plans = {
+            "uq_monthly_data_exchange_month": self.explain("SELECT * FROM monthly_data WHERE exchange_id = ? ORDER BY month_date", (1,)),
+            "uq_yearly_data_exchange_year": self.explain("SELECT * FROM yearly_data WHERE exchange_id = ? ORDER BY year", (1,)),
+            "ix_fee_structures_exchange_id": self.explain("SELECT * FROM fee_structures WHERE exchange_id = ? ORDER BY id", (1,)),
+            "ix_crypto_prices_crypto_timestamp": self.explain(
+                "SELECT * FROM crypto_prices WHERE crypto_id = ? AND timestamp >= ? ORDER BY timestamp", ("bitcoin", "2024-01-01")
+            )
+        }
+
+        for index, plan in plans.items():
+            self.assertIn("SEARCH", plan)
+            self.assertIn(f"USING INDEX {index}", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_bulk_reads_are_ordered_by_index(self):
+        """get_all_exchange_data reads each child table in index order, without sorting"""
+        database.create_tables()
+        statements = []
+        listener = lambda *args: statements.append((args[2], args[3]))
+        event.listen(database.engine, "before_cursor_execute", listener)
+        try:
+            database.get_all_exchange_data()
+        finally:
+            event.remove(database.engine, "before_cursor_execute", listener)
+
+        plans = [self.explain(statement, parameters) for statement, parameters in statements[1:]]
+
+        self.assertEqual(len(plans), 3)
+        for plan in plans:
+            self.assertIn("USING INDEX", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_natural_keys_are_unique(self):
+        """A second row for the same exchange and month is rejected"""
+        database.create_tables()
+        with database.engine.begin() as conn:
+            conn.execute(insert(database.Exchange.__table__).values(id=1, name="Binance", scale_factor=1.0))
+        row = {"exchange_id": 1, "month_date": "2024-01", "volume": 1.0, "commission": 0.1}
+
+        with database.engine.begin() as conn:
+            conn.execute(insert(database.MonthlyData.__table__).values(**row))
+        with self.assertRaises(IntegrityError):
+            with database.engine.begin() as conn:
+                conn.execute(insert(database.MonthlyData.__table__).values(**row))
+
+    def test_new_database_is_stamped(self):
+        """A database created from the models records every migration without running it"""
+        with redirect_stdout(io.StringIO()) as output:
+            database.create_tables()
+            database.create_tables()
+
+        self.assertEqual(database.get_schema_version(), database.MIGRATIONS[-1][0])
+        self.assertEqual(output.getvalue(), "")
+
+    def test_new_file_can_be_migrated_directly(self):
+        """migrate_database creates the schema of a new database file before recording its migrations"""
+        with redirect_stdout(io.StringIO()) as output:
+            applied = database.migrate_database()
+
+        self.assertEqual(applied, [version for version, _, _ in database.MIGRATIONS])
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(database.get_schema_version(), database.MIGRATIONS[-1][0])
+        self.assertEqual(database.get_all_exchange_data(), {})
+        self.assertIn("uq_monthly_data_exchange_month", self.explain("SELECT * FROM monthly_data WHERE exchange_id = 1"))
+
+    def test_existing_database_is_upgraded_in_place(self):
+        """An unversioned database gets its indexes, keeping the newest of any duplicate rows"""
+        with database.engine.begin() as conn:
+            # The schema before indexes were added
+            for table in database.Base.metadata.sorted_tables:
+                if table.name != "schema_version":
+                    conn.exec_driver_sql(str(CreateTable(table).compile(database.engine)))
+            conn.execute(insert(database.Exchange.__table__).values(id=1, name="Binance", scale_factor=1.0))
+            conn.execute(insert(database.MonthlyData.__table__), [
+                {"exchange_id": 1, "month_date": "2024-01", "volume": volume, "commission": 0.1}
+                for volume in (1.0, 2.0)
+            ])
+
+        with redirect_stdout(io.StringIO()) as output:
+            database.create_tables()
+
+        self.assertIn("Applied migration 1", output.getvalue())
+        self.assertIn("Migration 1 removed 1 duplicate rows from monthly_data", output.getvalue())
+        self.assertNotIn("from yearly_data", output.getvalue())
+        self.assertEqual(database.get_schema_version(), 1)
+        self.assertEqual(database.get_all_exchange_data()["Binance"]["monthly_volume"], [2.0])
+        self.assertIn("uq_monthly_data_exchange_month", self.explain("SELECT * FROM monthly_data WHERE exchange_id = 1"))
+        self.assertEqual(database.migrate_database(), [])
+
+class TestPriceHistory(DatabaseTestCase):
+    # A day boundary, so every tier's buckets line up with it
+    NOW = 1700006400
+
+    def add_points(self, points):
+        rows = [{"crypto_id": "bitcoin", "timestamp": timestamp, "price_usd": price} for timestamp, price in points]
+        with database.engine.begin() as conn:
+            conn.execute(insert(database.PriceHistory.__table__), rows)
+
+    def count(self, table):
+        with database.engine.connect() as conn:
+            return conn.exec_driver_sql(f"SELECT COUNT(*) FROM {table}").scalar()
+
+    def test_prices_are_appended(self):
+        """Each write keeps the latest prices current and adds to the history"""
+        with redirect_stdout(io.StringIO()):
+            database.store_crypto_prices({"bitcoin": {"usd": 1.0, "usd_24h_change": 0.5}})
+            database.store_crypto_prices({"bitcoin": {"usd": 2.0, "usd_24h_change": 0.5}})
+
+        self.assertEqual(database.get_latest_crypto_prices()["bitcoin"]["usd"], 2.0)
+        self.assertEqual(self.count("crypto_prices"), 1)
+        self.assertEqual(self.count("price_history"), 2)
+
+    def test_rollups_are_ohlc_buckets(self):
+        """Points are downsampled into minute, hour and day buckets with open, high, low and close"""
+        start = self.NOW - 3600
+        self.add_points([(start, 10.0), (start + 20, 30.0), (start + 40, 5.0), (start + 60, 7.0), (start + 1800, 8.0)])
+
+        written = database.rollup_price_history(self.NOW)
+        minutes = database.get_price_history("bitcoin", start, start + 120, now=self.NOW)
+        self.add_points([(start + 1810, 50.0)])
+        database.rollup_price_history(self.NOW)
+        days = database.get_price_history("bitcoin", self.NOW - 86400 * 200, now=self.NOW)
+
+        self.assertEqual(written, {"1m": 3, "1h": 1, "1d": 1})
+        self.assertEqual(minutes.attrs["tier"], "raw")
+        self.assertEqual(days.attrs["tier"], "1d")
+        day = days.iloc[0]
+        self.assertEqual((day["open"], day["high"], day["low"], day["close"]), (10.0, 50.0, 5.0, 50.0))
+        # The partial last bucket is recomputed instead of duplicated
+        self.assertEqual(self.count("price_rollups"), 3 + 1 + 1)
+
+    def test_retention_bounds_each_tier(self):
+        """Data older than a tier's retention is dropped after being rolled up"""
+        old = self.NOW - database.PRICE_RETENTION["raw"] - 3600
+        self.add_points([(old, 1.0), (self.NOW - 60, 2.0)])
+
+        database.rollup_price_history(self.NOW)
+
+        self.assertEqual(self.count("price_history"), 1)
+        minutes = database.get_price_history("bitcoin", old, old + 3600, now=self.NOW)
+        self.assertEqual(minutes.attrs["tier"], "1m")
+        self.assertEqual(list(minutes["close"]), [1.0])
+
+    def test_charts_use_the_coarsest_tier_that_fits(self):
+        """Longer ranges read coarser tiers, as long as they keep enough points"""
+        day = 86400
+        tiers = {
+            days: database.choose_price_tier(self.NOW - days * day, self.NOW, now=self.NOW)
+            for days in (1 / 48, 1, 30, 365, 20 * 365)
+        }
+
+        self.assertEqual(tiers, {1 / 48: "raw", 1: "1m", 30: "1h", 365: "1d", 20 * 365: "1d"})
+
+class TestQueryInstrumentation(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exchange_data = exchange_metrics.generate_synthetic_exchange_data(["Alpha", "Beta"], rng=0)
+        with redirect_stdout(io.StringIO()):
+            database.init_db_with_exchange_data(self.exchange_data)
+
+    def test_fingerprints_ignore_values(self):
+        """Statements differing only in literals, IN lists or VALUES rows share a fingerprint"""
+        self.assertEqual(
+            database.get_statement_fingerprint("SELECT a FROM t WHERE id IN (?, ?, ?) AND name = 'x''y'  LIMIT 10"),
+            "SELECT a FROM t WHERE id IN (...) AND name = ? LIMIT ?"
+        )
+        self.assertEqual(
+            database.get_statement_fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?)"),
+            database.get_statement_fingerprint("INSERT INTO t (a, b) VALUES (?, ?)")
+        )
+        self.assertEqual(
+            database.get_statement_fingerprint("SELECT * FROM t WHERE id = %(id_1)s"),
+            database.get_statement_fingerprint("SELECT * FROM t WHERE id = 7")
+        )
+
+    def test_summary_of_collected_queries(self):
+        """A collection counts each statement with its time and written rows"""
+        stats = database.start_query_stats()
+        database.get_all_exchange_data()
+        with database.engine.begin() as conn:
+            deleted = conn.execute(delete(database.ExchangeAggregate.__table__)).rowcount
+        self.assertIs(database.stop_query_stats(), stats)
+
+        summary = stats.summary()
+        self.assertEqual(summary["queries"], 5)
+        self.assertAlmostEqual(summary["total_ms"], sum(statement["total_ms"] for statement in summary["top"]))
+        rows = {statement["statement"].split(" FROM ")[1].split()[0]: statement["rows_written"] for statement in summary["top"]}
+        self.assertEqual(rows["exchanges"], 0)
+        self.assertGreater(deleted, 0)
+        self.assertEqual(rows["exchange_aggregates"], deleted)
+        self.assertEqual(sorted(summary["top"], key=lambda statement: -statement["total_ms"]), summary["top"])
+        self.assertEqual(len(stats.summary(top=1)["top"]), 1)
+
+        # Nothing is collected once stopped
+        database.get_all_exchange_data()
+        self.assertEqual(database.stop_query_stats().summary()["queries"], 0)
+
+    def test_worker_threads_share_the_collection(self):
+        """Queries run in a copied context on another thread are collected too"""
+        stats = database.start_query_stats()
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(database.get_all_exchange_data,))
+        worker.start()
+        worker.join()
+        # A thread started without the context collects nothing
+        worker = threading.Thread(target=database.get_all_exchange_data)
+        worker.start()
+        worker.join()
+
+        self.assertIs(database.stop_query_stats(), stats)
+        self.assertEqual(stats.summary()["queries"], 4)
+
+    def test_results_are_unchanged(self):
+        """Reads and RETURNING upserts return every row while instrumented"""
+        self.assertEqual(database.get_all_exchange_data(), self.exchange_data)
+
+        changed = {
+            name: dict(data, monthly_volume=[volume + 1 for volume in data["monthly_volume"]])
+            for name, data in self.exchange_data.items()
+        }
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(database.refresh_exchange_data(changed), sum(len(data["monthly_dates"]) for data in changed.values()))
+        self.assertEqual(database.get_all_exchange_data(), changed)
+
+    def test_slow_query_log(self):
+        """Statements at or above the threshold are appended to the slow query log"""
+        log_path = os.path.join(self.tmpdir, "slow.log")
+        threshold, log = database.SLOW_QUERY_MS, database.SLOW_QUERY_LOG
+        database.SLOW_QUERY_MS, database.SLOW_QUERY_LOG = 0, log_path
+        try:
+            database.get_exchange_aggregates()
+            database.SLOW_QUERY_MS = 60000
+            database.get_exchange_aggregates()
+        finally:
+            database.SLOW_QUERY_MS, database.SLOW_QUERY_LOG = threshold, log
+
+        with open(log_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn("Slow query: ", lines[0])
+        self.assertIn("0 rows written: SELECT exchanges.name", lines[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import sys
+import os
+import json
+import multiprocessing
+import shutil
+import tempfile
+import unittest
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import http_client
+from disk_cache import DiskCache
+from tests.stub_server import StubCoinGecko
+
+def _write_entries(path, worker):
+    cache = DiskCache(path)
+    for i in range(50):
+        cache.set(f"{worker}-{i}", "https://example.com", b"x" * 100)
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "http_cache.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_round_trip(self):
+        """Bodies are stored together with their validators"""
+        cache = DiskCache(self.path)
+        cache.set("key", "https://example.com", b'{"a": 1}', etag='"abc"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+
+        entry = DiskCache(self.path).get("key")
+        self.assertEqual(entry.body, b'{"a": 1}')
+        self.assertEqual(entry.etag, '"abc"')
+        self.assertEqual(entry.last_modified, "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.assertIsNone(cache.get("missing"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """The total body size stays under the cap"""
+        cache = DiskCache(self.path, max_bytes=250)
+        cache.set("a", "u", b"x" * 100)
+        cache.set("b", "u", b"x" * 100)
+        cache.touch("a")
+        cache.set("c", "u", b"x" * 100)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertLessEqual(cache.total_size(), 250)
+
+    def test_processes_can_share_the_file(self):
+        """Concurrent writers in separate processes do not corrupt the cache"""
+        DiskCache(self.path)
+        processes = [multiprocessing.Process(target=_write_entries, args=(self.path, w)) for w in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+        self.assertEqual(DiskCache(self.path).total_size(), 4 * 50 * 100)
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.stub = StubCoinGecko().__enter__()
+        http_client.configure_disk_cache(os.path.join(self.tmpdir, "http_cache.db"))
+        http_client.configure_rate_limiter(None)
+        http_client.clear_cache()
+
+    def tearDown(self):
+        http_client.configure_disk_cache(None)
+        http_client.clear_cache()
+        self.stub.__exit__()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_restart_revalidates_instead_of_downloading(self):
+        """After a restart the stored body is revalidated with its ETag"""
+        url = f"{self.stub.url}/global"
+        first = http_client.get_json(url, endpoint="global")
+
+        # Simulate a restart: the memory cache is gone, the disk cache is not
+        http_client.clear_cache()
+        second = http_client.get_json(url, endpoint="global")
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.stub.status_counts(), {200: 1, 304: 1})
+        _, headers = self.stub.requests[-1]
+        self.assertIn("If-None-Match", headers)
+
+    def test_invalidated_endpoint_is_downloaded_again(self):
+        """Invalidating an endpoint drops its memory and disk entries only"""
+        news_url = f"{self.stub.url}/news"
+        global_url = f"{self.stub.url}/global"
+        http_client.get_json(news_url, endpoint="news")
+        http_client.get_json(global_url, endpoint="global")
+
+        http_client.invalidate_endpoint("news")
+        http_client.get_json(news_url, endpoint="news")
+        http_client.get_json(global_url, endpoint="global")
+
+        self.assertEqual(self.stub.count("/news"), 2)
+        self.assertEqual(self.stub.count("/global"), 1)
+        self.assertNotIn("If-None-Match", self.stub.requests[-1][1])
+
+    def test_changed_body_is_downloaded(self):
+        """A changed resource replaces the stored body"""
+        url = f"{self.stub.url}/simple/price"
+        http_client.get_json(url)
+        self.stub.set_route("/simple/price", payload={"bitcoin": {"usd": 2.0}})
+
+        value = http_client.get_json(url)
+
+        self.assertEqual(value, {"bitcoin": {"usd": 2.0}})
+        entry = http_client.get_disk_cache().get(http_client.normalize_url(url))
+        self.assertEqual(json.loads(entry.body), value)
+
+    def test_uncached_reads_bypass_the_disk_cache(self):
+        """cache=False requests neither revalidate a stored body nor store their own"""
+        url = f"{self.stub.url}/global"
+        http_client.get_json(url, endpoint="global")
+        http_client.get_json(url, endpoint="global", cache=False)
+        markets_url = f"{self.stub.url}/coins/markets?page=1"
+        http_client.get_json(markets_url, endpoint="markets", cache=False)
+
+        self.assertEqual(self.stub.status_counts(), {200: 3})
+        self.assertNotIn("If-None-Match", self.stub.requests[1][1])
+        self.assertIsNone(http_client.get_disk_cache().get(http_client.normalize_url(markets_url)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import sys
+import os
+import unittest
+
+import numpy as np
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import exchange_metrics
+import data_fetcher
+
+class TestExchangeMetrics(unittest.TestCase):
+    def test_volume_matrix_shape_and_bounds(self):
+        """One call produces every exchange x period series within the noise bounds"""
+        base = np.array([100.0, 200.0, 300.0])
+        rate = np.array([0.001, 0.002, 0.003])
+
+        metrics = exchange_metrics.generate_volume_matrix(base, rate, months=12, years=8, rng=1)
+
+        self.assertEqual(metrics["monthly_volume"].shape, (3, 12))
+        self.assertEqual(metrics["yearly_volume"].shape, (3, 8))
+        # The first month has no seasonality or trend, only +/-20% noise
+        first_month = metrics["monthly_volume"][:, 0]
+        self.assertTrue(np.all(first_month >= base * 0.8 - 0.01))
+        self.assertTrue(np.all(first_month <= base * 1.2 + 0.01))
+        np.testing.assert_allclose(metrics["yearly_commission"], np.round(metrics["yearly_volume"] * rate[:, None], 2), atol=0.011)
+
+    def test_seeded_generation_is_reproducible(self):
+        """The same seed gives the same data, a different seed different data"""
+        exchanges = exchange_metrics.DEFAULT_EXCHANGES
+
+        first = exchange_metrics.generate_synthetic_metrics(exchanges, rng=42)
+        second = exchange_metrics.generate_synthetic_metrics(exchanges, rng=42)
+        other = exchange_metrics.generate_synthetic_metrics(exchanges, rng=7)
+
+        for name in first:
+            np.testing.assert_array_equal(first[name], second[name])
+        self.assertFalse(np.array_equal(first["monthly_volume"], other["monthly_volume"]))
+
+    def test_fees_descend_by_tier(self):
+        """Generated fee tiers never increase and respect the minimum fees"""
+        maker_fees, taker_fees = exchange_metrics.generate_fee_tiers(50, rng=3)
+
+        self.assertEqual(maker_fees.shape, (50, 6))
+        self.assertTrue(np.all(np.diff(maker_fees, axis=1) <= 0))
+        self.assertTrue(np.all(maker_fees >= 0.01))
+        self.assertTrue(np.all(taker_fees >= 0.02))
+
+    def test_dominance_history(self):
+        """Every day's dominance sums to 100% and stays within the noise around each coin's share"""
+        current = {"btc": 50.0, "eth": 15.0, "usdt": 5.0}
+        shares = exchange_metrics.generate_dominance_history(current, ["btc", "eth", "usdt"], 1461, rng=0)
+
+        self.assertEqual(shares.shape, (4, 1461))
+        np.testing.assert_allclose(shares.sum(axis=0), 100.0)
+        self.assertTrue(np.all(shares > 0))
+        # BTC keeps its lead, and the same seed gives the same history
+        self.assertTrue(np.all(shares[0] > shares[1]))
+        np.testing.assert_array_equal(shares, exchange_metrics.generate_dominance_history(current, ["btc", "eth", "usdt"], 1461, rng=0))
+
+    def test_exchange_data_format(self):
+        """Fallback and fetched exchange data keep the dashboard's structure"""
+        market_data = data_fetcher.create_sample_market_data()
+
+        fallback = data_fetcher.generate_fallback_data(rng=0)
+        fetched = data_fetcher.fetch_exchange_infos(exchange_metrics.DEFAULT_EXCHANGES, market_data, rng=0)
+
+        self.assertEqual(list(fallback), exchange_metrics.DEFAULT_EXCHANGES)
+        self.assertEqual(len(fallback["Binance"]["monthly_dates"]), 12)
+        self.assertEqual(len(fallback["Binance"]["yearly_volume"]), 8)
+        self.assertIsInstance(fallback["Binance"]["monthly_volume"][0], float)
+        self.assertEqual(fetched["Binance"]["vip_tiers"][-1], "VIP 9")
+        self.assertEqual(len(fetched["Binance"]["monthly_commission"]), 12)
+        self.assertEqual(
+            data_fetcher.fetch_exchange_info("Kraken", market_data, rng=5),
+            data_fetcher.fetch_exchange_infos(["Kraken"], market_data, rng=5)["Kraken"]
+        )
+
+    def test_exchange_aggregates(self):
+        """Totals, averages, shares, ranks and market comparisons per exchange and timeframe"""
+        exchange_data = {
+            "A": {"monthly_volume": [100.0, 300.0], "monthly_commission": [1.0, 3.0],
+                  "yearly_volume": [1000.0], "yearly_commission": [10.0]},
+            "B": {"monthly_volume": [600.0, 0.0], "monthly_commission": [2.0, 0.0],
+                  "yearly_volume": [3000.0], "yearly_commission": [20.0]}
+        }
+
+        aggregates = exchange_metrics.compute_exchange_aggregates(exchange_metrics.get_exchange_totals(exchange_data))
+        monthly = aggregates[aggregates["timeframe"] == "Monthly"].set_index("exchange")
+        yearly = aggregates[aggregates["timeframe"] == "Yearly"].set_index("exchange")
+
+        self.assertEqual(list(aggregates.columns), exchange_metrics.AGGREGATE_COLUMNS)
+        self.assertEqual(list(monthly["total_volume"]), [400.0, 600.0])
+        self.assertEqual(list(monthly["average_commission"]), [2.0, 1.0])
+        self.assertEqual(list(monthly["commission_rate"]), [1.0, 2.0 / 600 * 100])
+        self.assertEqual(list(monthly["volume_share"]), [40.0, 60.0])
+        self.assertEqual(list(monthly["volume_rank"]), [2, 1])
+        self.assertEqual(list(monthly["commission_rank"]), [1, 2])
+        self.assertEqual(list(yearly["volume_vs_market"]), [-50.0, 50.0])
+
+if __name__ == '__main__':
+    unittest.main()
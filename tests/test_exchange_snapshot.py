@@ -0,0 +1,152 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+import data_fetcher
+import database
+import exchange_metrics
+import exchange_snapshot
+import utils
+
+class TestExchangeSnapshot(unittest.TestCase):
+    """Test cases for the memory-mapped exchange snapshot"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "exchanges.snapshot")
+        self.exchange_data = exchange_metrics.generate_synthetic_exchange_data(
+            ["Alpha", "Beta", "Gamma"], rng=np.random.default_rng(0)
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def assertExchangeDataEqual(self, actual, expected):
+        self.assertEqual(list(actual), list(expected))
+        for name, data in expected.items():
+            self.assertEqual({key: list(np.asarray(values).tolist()) for key, values in actual[name].items()}, data)
+
+    def test_round_trip(self):
+        """Exchange data, aggregates, prices and chart history read back as written"""
+        prices = {"bitcoin": {"usd": 65000.0, "usd_24h_change": 1.5}, "ethereum": {"usd": 3500.0, "usd_24h_change": -0.5}}
+        chart_history = data_fetcher.get_sample_chart_history()
+        exchange_snapshot.write_exchange_snapshot(self.path, self.exchange_data, prices=prices, chart_history=chart_history)
+
+        snapshot = exchange_snapshot.load_exchange_snapshot(self.path)
+        self.assertExchangeDataEqual(snapshot.exchange_data, self.exchange_data)
+        pd.testing.assert_frame_equal(
+            snapshot.aggregates,
+            exchange_metrics.compute_exchange_aggregates(exchange_metrics.get_exchange_totals(self.exchange_data)),
+            check_dtype=False
+        )
+        self.assertEqual(snapshot.prices, prices)
+        for name in ("market_cap_history", "volume_history"):
+            np.testing.assert_array_equal(snapshot.chart_history[name]["value"], chart_history[name]["value"])
+
+    def test_columns_are_read_only_memory_maps(self):
+        """Series are views into memory-mapped files that cannot be written through"""
+        exchange_snapshot.write_exchange_snapshot(self.path, self.exchange_data)
+        volumes = exchange_snapshot.load_exchange_snapshot(self.path).exchange_data["Beta"]["monthly_volume"]
+
+        self.assertIsInstance(volumes, np.memmap)
+        with self.assertRaises(ValueError):
+            volumes[0] = 0.0
+
+    def test_dashboard_helpers_accept_snapshot_arrays(self):
+        """Totals and fee tables built from the mapped arrays match those built from lists"""
+        exchange_snapshot.write_exchange_snapshot(self.path, self.exchange_data)
+        snapshot = exchange_snapshot.load_exchange_snapshot(self.path)
+
+        pd.testing.assert_frame_equal(
+            exchange_metrics.get_exchange_totals(snapshot.exchange_data),
+            exchange_metrics.get_exchange_totals(self.exchange_data)
+        )
+        data = snapshot.exchange_data["Gamma"]
+        expected = self.exchange_data["Gamma"]
+        pd.testing.assert_frame_equal(
+            utils.create_fees_table(data["vip_tiers"], data["maker_fees"], data["taker_fees"]),
+            utils.create_fees_table(expected["vip_tiers"], expected["maker_fees"], expected["taker_fees"]),
+            check_dtype=False
+        )
+
+    def test_replace_keeps_previous_version(self):
+        """Writing publishes the new version and keeps only it and the previous one"""
+        first = exchange_snapshot.write_exchange_snapshot(self.path, self.exchange_data)
+        opened = exchange_snapshot.load_exchange_snapshot(self.path)
+        second = exchange_snapshot.write_exchange_snapshot(self.path, {"Alpha": self.exchange_data["Alpha"]})
+
+        self.assertEqual(exchange_snapshot.get_snapshot_version(self.path), second)
+        self.assertEqual(list(exchange_snapshot.load_exchange_snapshot(self.path).exchange_data), ["Alpha"])
+        # A reader that opened the previous version keeps reading it
+        self.assertExchangeDataEqual(opened.exchange_data, self.exchange_data)
+        self.assertTrue(os.path.isdir(first))
+
+        third = exchange_snapshot.write_exchange_snapshot(self.path, self.exchange_data)
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.isdir(second))
+        self.assertEqual(exchange_snapshot.get_snapshot_version(self.path), third)
+
+    def test_published_through_a_pointer_file(self):
+        """The snapshot path is a plain file naming the version, and symlinks are still read"""
+        version = exchange_snapshot.write_exchange_snapshot(self.path, self.exchange_data)
+
+        self.assertFalse(os.path.islink(self.path))
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), os.path.basename(version))
+
+        link = os.path.join(self.tmpdir, "linked.snapshot")
+        os.symlink(version, link)
+        self.assertEqual(exchange_snapshot.get_snapshot_version(link), version)
+
+    def test_cleanup_only_removes_finished_versions(self):
+        """Directories that merely share the prefix and in-progress writes are left alone"""
+        unrelated = [f"{self.path}.backup", f"{self.path}.1.tmp", f"{self.path}.2.old"]
+        for directory in unrelated:
+            os.makedirs(directory)
+        stale = f"{self.path}.1"
+        os.makedirs(stale)
+
+        exchange_snapshot.write_exchange_snapshot(self.path, self.exchange_data)
+        exchange_snapshot.write_exchange_snapshot(self.path, self.exchange_data)
+
+        self.assertFalse(os.path.exists(stale))
+        for directory in unrelated:
+            self.assertTrue(os.path.isdir(directory))
+
+    def test_missing_snapshot(self):
+        """A missing snapshot loads as None, and a plain file is never overwritten"""
+        self.assertIsNone(exchange_snapshot.get_snapshot_version(self.path))
+        self.assertIsNone(exchange_snapshot.load_exchange_snapshot(self.path))
+
+        with open(self.path, "w") as f:
+            f.write("not a snapshot")
+        with self.assertRaises(ValueError):
+            exchange_snapshot.write_exchange_snapshot(self.path, self.exchange_data)
+
+    def test_write_snapshot_from_database(self):
+        """The stored exchange data and aggregates are exported"""
+        self._engine = database.set_engine(create_engine(f"sqlite:///{self.tmpdir}/crypto_exchange.db"))
+        try:
+            database.create_tables()
+            self.assertIsNone(exchange_snapshot.write_snapshot_from_database(self.path))
+
+            database.init_db_with_exchange_data(self.exchange_data)
+            version = exchange_snapshot.write_snapshot_from_database(self.path)
+            snapshot = exchange_snapshot.load_exchange_snapshot(self.path)
+
+            self.assertEqual(snapshot.path, version)
+            self.assertExchangeDataEqual(snapshot.exchange_data, database.get_all_exchange_data())
+            pd.testing.assert_frame_equal(snapshot.aggregates, database.get_exchange_aggregates(), check_dtype=False)
+        finally:
+            database.set_engine(self._engine).dispose()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import sys
+import os
+import threading
+import unittest
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import requests
+import http_client
+from single_flight import SingleFlight, normalize_url
+from tests.stub_server import StubCoinGecko
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubCoinGecko().__enter__()
+        http_client.configure_disk_cache(None)
+        http_client.configure_rate_limiter(None)
+        self._backoff_base = http_client.BACKOFF_BASE
+        http_client.BACKOFF_BASE = 0.01
+        http_client.close_http_session()
+
+    def tearDown(self):
+        http_client.BACKOFF_BASE = self._backoff_base
+        http_client.close_http_session()
+        self.stub.__exit__()
+
+    def test_connections_are_reused(self):
+        """Sequential requests share one keep-alive connection"""
+        for _ in range(5):
+            response = http_client.get(f"{self.stub.url}/global")
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(set(self.stub.clients)), 1)
+
+    def test_gzip_is_requested(self):
+        """Requests advertise gzip support"""
+        http_client.get(f"{self.stub.url}/global")
+        _, headers = self.stub.requests[-1]
+        self.assertIn("gzip", headers["Accept-Encoding"])
+
+    def test_retries_server_errors(self):
+        """5xx and 429 responses are retried until a good response arrives"""
+        self.stub.queue("/global", 503, 429)
+        response = http_client.get(f"{self.stub.url}/global", retries=3)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stub.count("/global"), 3)
+
+    def test_gives_up_after_max_retries(self):
+        """The last error response is returned once retries are exhausted"""
+        self.stub.queue("/global", 500, 500, 500)
+        response = http_client.get(f"{self.stub.url}/global", retries=1)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.stub.count("/global"), 2)
+
+    def test_client_errors_are_not_retried(self):
+        """A 404 is returned straight away"""
+        response = http_client.get(f"{self.stub.url}/missing")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.stub.count("/missing"), 1)
+
+    def test_backoff_is_capped(self):
+        """Backoff delays stay within the configured maximum"""
+        for attempt in range(20):
+            self.assertLessEqual(http_client.backoff_delay(attempt), http_client.BACKOFF_MAX)
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubCoinGecko().__enter__()
+        http_client.configure_disk_cache(None)
+        http_client.configure_rate_limiter(None)
+        http_client.close_http_session()
+
+    def tearDown(self):
+        http_client.close_http_session()
+        self.stub.__exit__()
+
+    def _fetch_concurrently(self, urls):
+        results = [None] * len(urls)
+        barrier = threading.Barrier(len(urls))
+
+        def worker(i):
+            barrier.wait()
+            try:
+                results[i] = http_client.get_json(urls[i])
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(urls))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_identical_requests_share_one_call(self):
+        """Identical in-flight requests wait on a single upstream call"""
+        self.stub.set_route("/simple/price", delay=0.5)
+        before = http_client.single_flight_stats()
+
+        urls = [
+            f"{self.stub.url}/simple/price?ids=bitcoin&vs_currencies=usd",
+            f"{self.stub.url}/simple/price?vs_currencies=usd&ids=bitcoin"
+        ] * 5
+        results = self._fetch_concurrently(urls)
+
+        self.assertEqual(self.stub.count("/simple/price"), 1)
+        self.assertTrue(all(result == {"bitcoin": {"usd": 1.0, "usd_24h_change": 0.5}} for result in results))
+        after = http_client.single_flight_stats()
+        self.assertEqual(after["executed"] - before["executed"], 1)
+        self.assertEqual(after["shared"] - before["shared"], 9)
+
+    def test_errors_are_shared(self):
+        """Waiting callers receive the leader's error"""
+        self.stub.set_route("/news", status=404, delay=0.3)
+        results = self._fetch_concurrently([f"{self.stub.url}/news"] * 4)
+
+        self.assertEqual(self.stub.count("/news"), 1)
+        self.assertTrue(all(isinstance(result, requests.HTTPError) for result in results))
+
+    def test_sequential_requests_are_not_coalesced(self):
+        """Only requests that overlap in time are shared"""
+        http_client.get_json(f"{self.stub.url}/global")
+        http_client.get_json(f"{self.stub.url}/global")
+
+        self.assertEqual(self.stub.count("/global"), 2)
+
+    def test_normalize_url(self):
+        """Equivalent URLs normalize to the same key"""
+        self.assertEqual(
+            normalize_url("HTTPS://API.Example.com/v3/x?b=2&a=1#frag"),
+            normalize_url("https://api.example.com/v3/x?a=1&b=2")
+        )
+        self.assertNotEqual(normalize_url("https://a/x?a=1"), normalize_url("https://a/x?a=2"))
+
+    def test_group_counts_calls(self):
+        """A fresh group starts with zero counts"""
+        self.assertEqual(SingleFlight().stats(), {"executed": 0, "shared": 0})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import database
+import data_fetcher
+import http_client
+import ingest
+import init_db
+from tests.fixtures import StubApiTestCase
+
+class TestIngestionService(StubApiTestCase):
+    def test_run_once_stores_every_source(self):
+        """A single pass writes prices, global stats, history, news and the coin universe"""
+        results = ingest.run_once()
+
+        self.assertEqual(set(results.values()), {True})
+        self.assertEqual(database.get_latest_crypto_prices()["bitcoin"]["usd"], 1.0)
+        self.assertEqual(database.get_latest_global_stats()["total_market_cap"], 1000.0)
+        self.assertEqual(database.get_latest_news()[0]["title"], "Stub headline")
+        history = database.get_chart_history()
+        self.assertEqual(len(history["market_cap_history"]), 90 * 24)
+        self.assertEqual(set(history["volume_history"]["value"]), {5.0})
+        self.assertEqual([coin["id"] for coin in database.get_coin_markets()], ["bitcoin", "ethereum"])
+
+    def test_failed_fetch_does_not_store_sample_data(self):
+        """Upstream errors leave the database untouched"""
+        self.stub.set_route("/news", status=404)
+        results = ingest.run_once()
+
+        self.assertFalse(results["news"])
+        self.assertEqual(database.get_latest_news(), [])
+
+    def test_failed_store_is_reported(self):
+        """A store function that catches its own error fails the ingest"""
+        jobs = {"global": (lambda fallback: {}, database.store_global_stats)}
+
+        self.assertFalse(ingest.ingest_source("global", jobs))
+        self.assertEqual(database.get_latest_global_stats(), {})
+
+    def test_bootstrap_does_not_store_sample_data(self):
+        """init_db skips the sources it could not fetch"""
+        self.stub.set_route("/news", status=404)
+        self.stub.set_route("/global", status=404)
+        init_db.main()
+
+        self.assertEqual(database.get_latest_news(), [])
+        self.assertEqual(database.get_latest_global_stats(), {})
+        self.assertEqual(database.get_latest_crypto_prices()["bitcoin"]["usd"], 1.0)
+
+    def test_dashboard_reads_only_from_the_database(self):
+        """In database mode the dashboard bundle is built without network calls"""
+        ingest.run_once()
+        requests_before = len(self.stub.requests)
+
+        bundle = data_fetcher.get_stored_dashboard_data()
+
+        self.assertEqual(len(self.stub.requests), requests_before)
+        self.assertEqual(set(bundle["status"].values()), {"ok"})
+        self.assertEqual(bundle["prices"]["bitcoin"]["usd"], 1.0)
+        self.assertEqual(bundle["global_data"]["market_cap_percentage"]["btc"], 60.0)
+
+    def test_empty_database_uses_fallbacks(self):
+        """Sources that were never ingested fall back to sample data"""
+        bundle = data_fetcher.get_stored_dashboard_data()
+
+        self.assertEqual(set(bundle["status"].values()), {"sample"})
+        self.assertEqual(bundle["prices"], data_fetcher.get_sample_prices())
+
+    def test_stored_sample_rows_are_not_shown_as_live(self):
+        """Sample data left in the database and unreadable sources are marked as sample"""
+        database.store_news_items(data_fetcher.get_sample_news())
+        sources = data_fetcher.get_dashboard_sources()
+        sources["prices"] = (None, lambda: 1 / 0, data_fetcher.get_sample_prices)
+
+        bundle = data_fetcher.get_stored_dashboard_data(sources)
+
+        self.assertEqual(bundle["status"]["news"], "sample")
+        self.assertEqual(bundle["status"]["prices"], "sample")
+        self.assertEqual(bundle["prices"], data_fetcher.get_sample_prices())
+
+    def test_sources_are_polled_on_their_intervals(self):
+        """The service keeps polling each source until stopped"""
+        stop_event = threading.Event()
+        intervals = {"prices": 0.1, "global": 60, "chart_history": 60, "news": 60, "markets": 60, "price_rollups": 60}
+        # Skip the response cache so every poll reaches the stub
+        ttls = dict(http_client.ENDPOINT_TTLS)
+        http_client.ENDPOINT_TTLS.pop("prices")
+        try:
+            thread = threading.Thread(target=ingest.run, args=(intervals, stop_event, False))
+            thread.start()
+            time.sleep(0.6)
+            stop_event.set()
+            thread.join(timeout=5)
+        finally:
+            http_client.ENDPOINT_TTLS.update(ttls)
+
+        self.assertFalse(thread.is_alive())
+        self.assertGreaterEqual(self.stub.count("/simple/price"), 3)
+        self.assertEqual(self.stub.count("/news"), 1)
+
+if __name__ == '__main__':
+    unittest.main()
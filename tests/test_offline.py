@@ -0,0 +1,130 @@
+import sys
+import os
+import json
+import socket
+import time
+import unittest
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import data_fetcher
+import database
+import http_client
+from tests.fixtures import DatabaseTestCase
+
+class NoNetwork:
+    """Context manager that records and refuses every attempt to open a network connection."""
+
+    def __enter__(self):
+        self.attempts = []
+        self._connect = socket.socket.connect
+        self._getaddrinfo = socket.getaddrinfo
+        guard = self
+
+        def connect(sock, address):
+            if sock.family in (socket.AF_INET, socket.AF_INET6):
+                guard.attempts.append(address)
+                raise OSError("network access is disabled")
+            return guard._connect(sock, address)
+
+        def getaddrinfo(host, *args, **kwargs):
+            guard.attempts.append(host)
+            raise OSError("network access is disabled")
+
+        socket.socket.connect = connect
+        socket.getaddrinfo = getaddrinfo
+        return self
+
+    def __exit__(self, *exc):
+        socket.socket.connect = self._connect
+        socket.getaddrinfo = self._getaddrinfo
+
+class TestOfflineMode(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        http_client.configure_disk_cache(None)
+        http_client.configure_rate_limiter(None)
+        http_client.clear_cache()
+        http_client.set_offline_mode(True)
+        self._snapshot_path = data_fetcher.DASHBOARD_SNAPSHOT_PATH
+
+    def tearDown(self):
+        http_client.set_offline_mode(False)
+        data_fetcher.DASHBOARD_SNAPSHOT_PATH = self._snapshot_path
+        super().tearDown()
+
+    def test_requests_are_refused(self):
+        """No request is sent while offline"""
+        with NoNetwork() as network:
+            with self.assertRaises(http_client.OfflineError):
+                http_client.get("https://api.coingecko.com/api/v3/global")
+            self.assertEqual(data_fetcher.fetch_current_prices(), data_fetcher.get_sample_prices())
+
+        self.assertEqual(network.attempts, [])
+
+    def test_dashboard_data_comes_from_the_database(self):
+        """Offline, every dataset a render needs loads in under a second without network access"""
+        database.store_crypto_prices({"bitcoin": {"usd": 42.0, "usd_24h_change": 1.0}})
+
+        with NoNetwork() as network:
+            start = time.monotonic()
+            bundle = data_fetcher.load_dashboard_data()
+            data_fetcher.fetch_real_time_data()
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(network.attempts, [])
+        # The one-second target covers the data a render loads, which is what
+        # offline mode controls. A full render also builds about 45 Plotly
+        # figures, which takes 2.5-3.5 s of CPU with or without a network
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(bundle["status"]["prices"], "ok")
+        self.assertEqual(bundle["prices"]["bitcoin"]["usd"], 42.0)
+        self.assertEqual(bundle["status"]["news"], "sample")
+
+    def test_snapshot_is_preferred_when_configured(self):
+        """A local snapshot round-trips every source and is used before the database"""
+        path = os.path.join(self.tmpdir, "snapshot.json")
+        bundle = {
+            "global_data": data_fetcher.get_sample_global_data(),
+            "chart_history": data_fetcher.chart_history_from_points([[1700000000000, 10.0]], [[1700000000000, 5.0]]),
+            "prices": {"bitcoin": {"usd": 7.0, "usd_24h_change": 0.0}},
+            "news": data_fetcher.get_sample_news()
+        }
+        data_fetcher.write_dashboard_snapshot(bundle, path)
+        data_fetcher.DASHBOARD_SNAPSHOT_PATH = path
+
+        with NoNetwork() as network:
+            loaded = data_fetcher.load_dashboard_data()
+
+        self.assertEqual(network.attempts, [])
+        self.assertEqual(set(loaded["status"].values()), {"ok"})
+        self.assertEqual(loaded["prices"], bundle["prices"])
+        self.assertEqual(list(loaded["chart_history"]["market_cap_history"]["value"]), [10.0])
+        self.assertEqual(loaded["chart_history"]["volume_history"]["timestamp"][0], bundle["chart_history"]["volume_history"]["timestamp"][0])
+
+    def test_incomplete_snapshot_falls_back_to_the_database(self):
+        """A snapshot missing a source is ignored like a missing snapshot file"""
+        path = os.path.join(self.tmpdir, "snapshot.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"prices": {"bitcoin": {"usd": 7.0, "usd_24h_change": 0.0}}}, f)
+        data_fetcher.DASHBOARD_SNAPSHOT_PATH = path
+        database.store_crypto_prices({"bitcoin": {"usd": 42.0, "usd_24h_change": 1.0}})
+
+        self.assertIsNone(data_fetcher.read_dashboard_snapshot(path))
+        loaded = data_fetcher.load_dashboard_data()
+        self.assertEqual(loaded["prices"]["bitcoin"]["usd"], 42.0)
+
+    def test_full_render_opens_no_sockets(self):
+        """The whole dashboard renders offline without opening a socket"""
+        from streamlit.testing.v1 import AppTest
+
+        app = AppTest.from_file(os.path.join(os.path.dirname(__file__), '../src/app.py'), default_timeout=120)
+        with NoNetwork() as network:
+            app.run()
+
+        self.assertEqual(network.attempts, [])
+        self.assertFalse(app.exception)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import sys
+import os
+import multiprocessing
+import shutil
+import tempfile
+import time
+import unittest
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import http_client
+from rate_limiter import TokenBucketLimiter, RateLimitExceeded
+from tests.stub_server import StubCoinGecko
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def _take_tokens(path, results):
+    limiter = TokenBucketLimiter(path, {"prices": 20}, max_wait=0)
+    taken = 0
+    for _ in range(20):
+        try:
+            limiter.acquire("prices")
+            taken += 1
+        except RateLimitExceeded:
+            pass
+    results.put(taken)
+
+class TestTokenBucketLimiter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "rate_limits.db")
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _limiter(self, budgets, max_wait=5):
+        return TokenBucketLimiter(self.path, budgets, max_wait=max_wait, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_budget_allows_a_burst_then_queues(self):
+        """A full bucket serves its budget at once, then callers wait for refills"""
+        limiter = self._limiter({"news": 6})
+        for _ in range(6):
+            self.assertEqual(limiter.acquire("news"), 0)
+
+        # 6 calls per minute refill one token every 10 seconds
+        self.assertAlmostEqual(limiter.acquire("news", max_wait=15), 10, places=3)
+
+    def test_waits_longer_than_max_wait_raise(self):
+        """Callers give up instead of queueing indefinitely"""
+        limiter = self._limiter({"news": 1}, max_wait=5)
+        limiter.acquire("news")
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire("news")
+
+    def test_budgets_are_per_endpoint(self):
+        """Exhausting one endpoint does not affect another"""
+        limiter = self._limiter({"news": 1, "prices": 1}, max_wait=0)
+        limiter.acquire("news")
+        self.assertEqual(limiter.acquire("prices"), 0)
+
+    def test_block_applies_to_every_bucket(self):
+        """A Retry-After block holds back all endpoints until it expires"""
+        limiter = self._limiter({"news": 10, "prices": 10})
+        limiter.block(3)
+
+        self.assertAlmostEqual(limiter.acquire("prices"), 3, places=3)
+        self.assertEqual(limiter.acquire("news"), 0)
+
+    def test_state_is_shared_between_processes(self):
+        """Processes draw from one budget"""
+        TokenBucketLimiter(self.path, {"prices": 20})
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_take_tokens, args=(self.path, results)) for _ in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        # Allow for the few tokens refilled while the processes ran
+        taken = sum(results.get() for _ in processes)
+        self.assertGreaterEqual(taken, 20)
+        self.assertLessEqual(taken, 22)
+
+class TestRetryAfter(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.stub = StubCoinGecko().__enter__()
+        http_client.configure_disk_cache(None)
+        http_client.configure_rate_limiter(os.path.join(self.tmpdir, "rate_limits.db"))
+        http_client.close_http_session()
+
+    def tearDown(self):
+        http_client.configure_rate_limiter(None)
+        http_client.close_http_session()
+        self.stub.__exit__()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_429_waits_for_retry_after(self):
+        """A 429 is retried once its Retry-After time has passed"""
+        self.stub.queue("/global", 429, headers={"Retry-After": "1"})
+
+        start = time.monotonic()
+        response = http_client.get(f"{self.stub.url}/global", endpoint="global")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+        self.assertEqual(self.stub.count("/global"), 2)
+
+    def test_long_retry_after_is_not_waited_out(self):
+        """A Retry-After beyond the queueing limit returns the 429 and blocks other calls"""
+        self.stub.queue("/global", 429, headers={"Retry-After": "120"})
+
+        response = http_client.get(f"{self.stub.url}/global", endpoint="global")
+
+        self.assertEqual(response.status_code, 429)
+        with self.assertRaises(RateLimitExceeded):
+            http_client.get(f"{self.stub.url}/news", endpoint="news")
+        self.assertEqual(self.stub.count("/news"), 0)
+
+    def test_retry_after_respects_the_callers_max_wait(self):
+        """A Retry-After within the default limit but beyond the caller's max_wait is not waited out"""
+        self.stub.queue("/global", 429, headers={"Retry-After": "1"})
+
+        start = time.monotonic()
+        response = http_client.get(f"{self.stub.url}/global", endpoint="global", max_wait=0.5)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(self.stub.count("/global"), 1)
+
+    def test_parse_retry_after(self):
+        """Retry-After accepts seconds and HTTP dates"""
+        self.assertEqual(http_client.parse_retry_after("7"), 7.0)
+        self.assertIsNone(http_client.parse_retry_after(None))
+        self.assertIsNone(http_client.parse_retry_after("soon"))
+        self.assertEqual(http_client.parse_retry_after("Mon, 01 Jan 2001 00:00:00 GMT"), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
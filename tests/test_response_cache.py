@@ -0,0 +1,123 @@
+import sys
+import os
+import time
+import unittest
+
+# Add the src directory to the path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import http_client
+from response_cache import ResponseCache
+from tests.stub_server import StubCoinGecko
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(max_entries=3, max_stale=100, clock=self.clock)
+
+    def test_fresh_then_stale_then_expired(self):
+        """Entries are fresh until their TTL, stale for max_stale, then gone"""
+        self.cache.set("a", 1, ttl=10)
+        self.assertEqual(self.cache.get("a"), (1, True))
+
+        self.clock.now = 50
+        self.assertEqual(self.cache.get("a"), (1, False))
+
+        self.clock.now = 111
+        self.assertIsNone(self.cache.get("a"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """The cache never holds more than max_entries"""
+        for key in ["a", "b", "c"]:
+            self.cache.set(key, key, ttl=10)
+        self.cache.get("a")
+        self.cache.set("d", "d", ttl=10)
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), ("a", True))
+        self.assertEqual(self.cache.stats()["entries"], 3)
+
+    def test_invalidate(self):
+        """Entries can be dropped one at a time or all at once"""
+        self.cache.set("a", 1, ttl=10)
+        self.cache.set("b", 2, ttl=10)
+        self.cache.invalidate("a")
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.get("b"))
+
+    def test_invalidate_by_tag(self):
+        """Entries sharing a tag are dropped together and their keys returned"""
+        self.cache.set("a", 1, ttl=10, tag="news")
+        self.cache.set("b", 2, ttl=10, tag="prices")
+        self.cache.set("c", 3, ttl=10, tag="news")
+
+        self.assertEqual(self.cache.invalidate(tag="news"), ["a", "c"])
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("b"), (2, True))
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubCoinGecko().__enter__()
+        http_client.configure_disk_cache(None)
+        http_client.configure_rate_limiter(None)
+        self._ttls = dict(http_client.ENDPOINT_TTLS)
+        http_client.clear_cache()
+
+    def tearDown(self):
+        http_client.ENDPOINT_TTLS.clear()
+        http_client.ENDPOINT_TTLS.update(self._ttls)
+        http_client.clear_cache()
+        self.stub.__exit__()
+
+    def test_fresh_entries_skip_the_network(self):
+        """Repeated calls within the TTL are served from memory"""
+        url = f"{self.stub.url}/global"
+        first = http_client.get_json(url, endpoint="global")
+        second = http_client.get_json(url, endpoint="global")
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.stub.count("/global"), 1)
+
+    def test_stale_entry_is_served_while_refreshing(self):
+        """An expired entry is returned at once and refreshed in the background"""
+        http_client.ENDPOINT_TTLS["prices"] = 0.1
+        url = f"{self.stub.url}/simple/price"
+        http_client.get_json(url, endpoint="prices")
+
+        time.sleep(0.2)
+        self.stub.set_route("/simple/price", payload={"bitcoin": {"usd": 2.0}}, delay=0.5)
+
+        start = time.monotonic()
+        stale = http_client.get_json(url, endpoint="prices")
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual(stale["bitcoin"]["usd"], 1.0)
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            cached = http_client.get_json(url, endpoint="prices")
+            if cached["bitcoin"]["usd"] == 2.0:
+                break
+            time.sleep(0.05)
+        self.assertEqual(cached["bitcoin"]["usd"], 2.0)
+        self.assertEqual(self.stub.count("/simple/price"), 2)
+
+    def test_failed_responses_are_not_cached(self):
+        """Errors propagate and the next call goes back to the network"""
+        self.stub.set_route("/news", status=404)
+        url = f"{self.stub.url}/news"
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                http_client.get_json(url, endpoint="news")
+
+        self.assertEqual(self.stub.count("/news"), 2)
+
+if __name__ == '__main__':
+    unittest.main()
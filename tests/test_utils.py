@@ -5,7 +5,10 @@ import unittest
 # Add the src directory to the path so we can import modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
-from utils import format_large_number
+import numpy as np
+import pandas as pd
+
+from utils import create_dominance_chart, format_large_number
 
 class TestUtils(unittest.TestCase):
     def test_format_large_number(self):
@@ -18,5 +21,20 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(format_large_number(1500000000), "1.50B")
         self.assertEqual(format_large_number(123), "123.00")
 
+    def test_create_dominance_chart(self):
+        """One stacked area per category and a single hover trace carrying every share"""
+        dates = pd.date_range("2024-01-01", periods=1461, freq="D")
+        shares = np.array([np.full(1461, 60.0), np.full(1461, 30.0), np.full(1461, 10.0)])
+
+        fig = create_dominance_chart(dates, shares, ["BTC", "ETH", "Others"], ["#F7931A", "#627EEA", "#CCCCCC"], ["Others", "BTC"])
+
+        self.assertEqual(len(fig.data), 4)
+        np.testing.assert_allclose(fig.data[1].y, 90.0)
+        np.testing.assert_allclose(fig.data[2].y, 100.0)
+        hover = fig.data[3]
+        self.assertEqual(hover.customdata.shape, (1461, 2))
+        np.testing.assert_allclose(hover.customdata[0], [10.0, 60.0])
+        self.assertIn("Others: %{customdata[0]:.2f}%<br>BTC: %{customdata[1]:.2f}%", hover.hovertemplate)
+
 if __name__ == '__main__':
     unittest.main()
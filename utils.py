@@ -1,5 +1,6 @@
 import plotly.graph_objects as go
 import plotly.express as px
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -323,3 +324,55 @@ def create_fee_comparison_chart(exchange_data):
     )
 
     return fig
+
+def create_dominance_chart(dates, shares, categories, colors, hover_order=None):
+    """
+    Create a stacked area chart of market cap dominance. shares holds one row
+    of percentages per category, bottom to top. A single invisible trace along
+    the top carries every category's share of each date in its hover label,
+    listed in hover_order (default top to bottom).
+    """
+    if hover_order is None:
+        hover_order = categories[::-1]
+
+    # Evenly spaced dates are sent once as a start and step (in ms) rather
+    # than as a date string array in every trace; shares are sent as float32
+    dates = pd.DatetimeIndex(dates)
+    steps = np.diff(dates.asi8)
+    if len(steps) and np.all(steps == steps[0]):
+        x = dict(x0=dates[0], dx=steps[0] / 1e6)
+    else:
+        x = dict(x=dates)
+    shares = np.asarray(shares, dtype=np.float32)
+
+    fig = go.Figure()
+
+    # Stacked areas, bottom to top
+    stacked = np.cumsum(shares, axis=0)
+    for i, category in enumerate(categories):
+        fig.add_trace(go.Scatter(
+            **x,
+            y=stacked[i],
+            mode='lines',
+            line=dict(width=0, color=colors[i]),
+            fill='tonexty',
+            name=category
+        ))
+
+    # One hover trace for all dates; each point's shares are in customdata
+    rows = [categories.index(category) for category in hover_order]
+    hover_lines = "".join(
+        f"{category}: %{{customdata[{i}]:.2f}}%<br>" for i, category in enumerate(hover_order)
+    )
+    fig.add_trace(go.Scatter(
+        **x,
+        y=np.full(len(dates), 100, dtype=np.int8),  # Position at the top of the chart
+        mode='markers',
+        marker=dict(opacity=0),  # Make the markers invisible
+        customdata=shares[rows].T,
+        hovertemplate="<b>%{x|%b %d, %Y, %H:%M:%S} GMT+5:30</b><br><br>" + hover_lines + "<extra></extra>",
+        showlegend=False
+    ))
+    fig.update_xaxes(type="date")
+
+    return fig